@@ -2,693 +2,594 @@
 # IMPORTS
 #==========================================================================#
 
+import io
 import json
-import dateutil.parser
-import babel
-from datetime import datetime
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 import logging
-from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
-
-#==========================================================================#
-# APP CONFIG
-#==========================================================================#
-
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object("config")
-db = SQLAlchemy(app)
-
-migrate = Migrate(app, db)
+import os
+import weakref
+from datetime import datetime
+from heapq import merge
+from itertools import islice
+from logging import FileHandler, Formatter
 
-# Set a variable that all routes can access.
-current_time = datetime.utcnow()
+import click
+from flask import (Blueprint, Flask, Response, abort, current_app, jsonify,
+                   render_template, request, stream_with_context)
+from flask_moment import Moment
+from werkzeug.local import LocalProxy
+
+import artists
+import assets
+import common
+import instrumentation
+import shows
+import templating
+import venues
+from common import (api_error, artist_cards, artist_facets, artist_search,
+                    artist_stats, cached, current_time, decode_cursor,
+                    encode_cursor, invalidate_show, refresh_show_stats,
+                    replica_router, response_cache, show_counts_select,
+                    show_rows_select, venue_cards, venue_facets, venue_search,
+                    venue_stats)
+from exporter import FORMATS as EXPORT_FORMATS, export
+from facets import FacetFilters
+from filters import format_datetime
+from importer import (READERS, Checkpoint, Importer, ShowImporter,
+                      format_from_filename, read_records)
+from metrics import InstrumentedQueuePool, render_metrics
+from models import Artist, Deletion, Show, Venue, db
+from shows import schedule_shows, show_scheduler
 
 #==========================================================================#
-# MODELS
+# APP FACTORY
 #==========================================================================#
 
-
-class Venue(db.Model):
-    __tablename__ = "venues"
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    address = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120), nullable=False)
-    image_link = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120))
-    genres = db.Column(db.ARRAY(db.String(120)), nullable=False)
-    website = db.Column(db.String(120))
-    seeking_talent = db.Column(db.Boolean)
-    seeking_description = db.Column(db.String())
-    created_at = db.Column(
-        db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(
-        db.DateTime, default=datetime.utcnow, nullable=False)
-
-
-class Artist(db.Model):
-    __tablename__ = "artists"
-
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    city = db.Column(db.String(120), nullable=False)
-    state = db.Column(db.String(120), nullable=False)
-    phone = db.Column(db.String(120), nullable=False)
-    genres = db.Column(db.ARRAY(db.String(120)), nullable=False)
-    image_link = db.Column(db.String(500))
-    facebook_link = db.Column(db.String(120))
-    website = db.Column(db.String(120))
-    seeking_venue = db.Column(db.Boolean)
-    seeking_description = db.Column(db.String())
-    created_at = db.Column(
-        db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(
-        db.DateTime, default=datetime.utcnow, nullable=False)
-
-
-class Show(db.Model):
-    __tablename__ = "shows"
-    id = db.Column(db.Integer, primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey(
-        "venues.id"), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey(
-        "artists.id"), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
-    venue = db.relationship("Venue", backref="shows", lazy="joined")
-    artist = db.relationship("Artist", backref="shows", lazy="joined")
-
-#==========================================================================#
-# FILTERS
-#==========================================================================#
-
-
-def format_datetime(value, format="medium"):
-    date = dateutil.parser.parse(value)
-    if format == "full":
-        format = "EEEE, MMMM d, y 'at' h:mma"
-    elif format == "medium":
-        format = "EE, MM dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
-
-
-app.jinja_env.filters["datetime"] = format_datetime
+moment = Moment()
+asset_manifest = LocalProxy(lambda: current_app.extensions["assets"])
+main = Blueprint("main", __name__, cli_group=None)
+
+
+def create_app(config="config"):
+    """Build the app from `config`, an import path or a config object.
+
+    Each app gets its own caches, search indexes, facets, replica router
+    and asset manifest (see common.Services), so several can live in one
+    process. Modules only some requests need (the forms, Babel,
+    Flask-Migrate and with it Alembic) are imported on first use rather
+    than here.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if "pool_size" in app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"].setdefault(
+            "poolclass", InstrumentedQueuePool)
+    db.init_app(app)
+    moment.init_app(app)
+    common.init_app(app)
+    if click.get_current_context(silent=True) is not None:
+        # Loaded by the flask command, which is the only place `flask db`
+        # and so Flask-Migrate are needed.
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    if app.config.get("QUERY_INSTRUMENTATION", True):
+        instrumentation.init_app(app)
+
+    app.register_blueprint(main)
+    app.register_blueprint(venues.bp)
+    app.register_blueprint(artists.bp)
+    app.register_blueprint(shows.bp)
+
+    app.jinja_env.filters["datetime"] = format_datetime
+    assets.AssetManifest("main.asset").init_app(
+        app, os.path.join(app.static_folder, "dist"))
+    app.jinja_env.bytecode_cache = templating.make_bytecode_cache(app.config)
+    if app.config.get("TEMPLATE_WARM_UP"):
+        templating.warm_up(app.jinja_env)
+
+    dispose_engine_after_fork(app)
+    if not app.debug:
+        file_handler = FileHandler("error.log")
+        file_handler.setFormatter(
+            Formatter(
+                "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
+        )
+        app.logger.setLevel(logging.INFO)
+        file_handler.setLevel(logging.INFO)
+        app.logger.addHandler(file_handler)
+        app.logger.info("errors")
+    return app
+
+
+# Engines of the apps built in this process, for the child of a fork.
+fork_engines = weakref.WeakSet()
+
+
+def dispose_engine_after_fork(app):
+    # Under `gunicorn --preload` workers are forked from a process that has
+    # already built the app. Each child starts a fresh pool, leaving any
+    # connection the parent opened to the parent (close=False).
+    with app.app_context():
+        fork_engines.update(db.engines.values())
+
+
+def dispose_fork_engines():
+    for engine in list(fork_engines):
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=dispose_fork_engines)
+
+
+def __getattr__(name):
+    # `app.app` (flask run, gunicorn app:app, asgi.py) builds the default
+    # app on first use.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 #==========================================================================#
 # CONTROLLERS
 #==========================================================================#
 
 
-@app.route("/")
+@main.route("/")
+@cached("index")
 def index():
     return render_template("pages/home.html")
 
 #  ----------------------------------------------------------------
-#  Venues
+#  JSON API
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues")
-def venues():
-    data = []
-
-    locations = Venue.query.distinct(Venue.city, Venue.state)
-
-    for location in locations:
-        locations = Venue.query.filter_by(city=location.city).outerjoin(
-            Show, Venue.id == Show.venue_id).all()
-
-        venues = []
-        for venue in locations:
-            upcoming_shows = []
-            shows = venue.shows
-            for show in shows:
-                if show.start_time > current_time:
-                    upcoming_shows.append(show)
-
-            venues.append({
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": len(upcoming_shows)
-            })
-
-        data.append({
-            "city": location.city,
-            "state": location.state,
-            "venues": venues
-        })
-
-    return render_template("pages/venues.html", areas=data)
+@main.route("/api/v1/changes")
+def api_changes():
+    # Rows created, edited or deleted since `since`; deletes come from the
+    # tombstones in the deletions table and are marked "deleted".
+    try:
+        since = datetime.fromisoformat(request.args.get("since", ""))
+    except ValueError:
+        return api_error(400)
+    after = decode_cursor(request.args.get("after"), datetime.fromisoformat,
+                          change_key)
+    limit = min(max(request.args.get("limit", CHANGES_LIMIT, type=int), 1),
+                CHANGES_MAX_LIMIT)
+
+    changes = changes_since(since, limit, after)
+    cursor = None
+    if len(changes) == limit:
+        last = changes[-1]
+        cursor = encode_cursor((last["updated_at"], [last["type"], last["id"]]))
+    return jsonify({"data": changes, "next": cursor})
+
+
+CHANGES_LIMIT = 500
+CHANGES_MAX_LIMIT = 5000
+CHANGE_TYPES = (("artist", Artist), ("show", Show), ("venue", Venue))
+
+
+def changes_since(since, limit=CHANGES_LIMIT, after=None):
+    # Venues, artists and shows updated or deleted after `since`, oldest
+    # first, keyed on (updated_at, type, id) so a feed can be paged without
+    # skipping rows that share a timestamp. Each table is read through its
+    # updated_at index, the tombstones through theirs, and the sorted streams
+    # are merged.
+    streams = []
+    for kind, model in CHANGE_TYPES:
+        query = db.session.query(model.updated_at, model.id).filter(
+            model.updated_at > since)
+        if after is not None:
+            updated_at, (after_kind, after_id) = after
+            if kind < after_kind:
+                condition = model.updated_at > updated_at
+            elif kind == after_kind:
+                condition = db.or_(model.updated_at > updated_at, db.and_(
+                    model.updated_at == updated_at, model.id > after_id))
+            else:
+                condition = model.updated_at >= updated_at
+            query = query.filter(condition)
+        rows = query.order_by(model.updated_at, model.id).limit(limit)
+        streams.append([(updated_at, kind, row_id, False)
+                        for updated_at, row_id in rows])
+
+    key = (Deletion.deleted_at, Deletion.kind, Deletion.record_id)
+    query = db.session.query(*key).filter(Deletion.deleted_at > since)
+    if after is not None:
+        updated_at, (after_kind, after_id) = after
+        query = query.filter(db.tuple_(*key) > (updated_at, after_kind, after_id))
+    rows = query.order_by(*key).limit(limit)
+    streams.append([(deleted_at, kind, row_id, True)
+                    for deleted_at, kind, row_id in rows])
+
+    return [{"type": kind, "id": row_id, "updated_at": updated_at.isoformat(),
+             "deleted": deleted}
+            for updated_at, kind, row_id, deleted in islice(merge(*streams), limit)]
+
+
+def change_key(value):
+    # The (type, id) half of a change feed cursor.
+    kind, row_id = value
+    return str(kind), int(row_id)
 
 #  ----------------------------------------------------------------
-#  Venues Search
+#  Static assets
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues/search", methods=["POST"])
-def search_venues():
-    search = request.form.get("search_term", "")
-    venues = Venue.query.filter(Venue.name.ilike(f"%{search}%")).outerjoin(
-        Show, Venue.id == Show.venue_id).all()
-    data = []
-
-    for venue in venues:
-        upcoming_shows = []
-        shows = venue.shows
-        for show in shows:
-            if show.start_time > current_time:
-                upcoming_shows.append(show)
-
-        data.append({
-            "id": venue.id,
-            "name": venue.name,
-            "num_upcoming_shows": len(upcoming_shows)
-        })
-
-    response = {
-        "count": len(venues),
-        "data": data
-    }
-
-    return render_template("pages/search_venues.html", results=response, search_term=search)
+@main.route("/assets/<path:filename>")
+def asset(filename):
+    # Built by `flask build-assets`; every name carries a content hash.
+    return asset_manifest.send(filename)
 
 #  ----------------------------------------------------------------
-#  Venue
+#  Metrics
 #  ----------------------------------------------------------------
 
 
-@app.route("/venues/<int:venue_id>")
-def show_venue(venue_id):
-    venue = Venue.query.filter_by(id=venue_id).outerjoin(
-        Show, Venue.id == Show.venue_id).all()
-
-    for venue in venue:
-        shows = venue.shows
-        past_shows = []
-        upcoming_shows = []
-
-        for show in shows:
-            show_data = {
-                "artist_id": show.artist.id,
-                "artist_name": show.artist.name,
-                "artist_image_link": show.artist.image_link,
-                "start_time": format_datetime(str(show.start_time))
-            }
-
-            if show.start_time < current_time:
-                past_shows.append(show_data)
-            else:
-                upcoming_shows.append(show_data)
-
-        data = {
-            "id": venue.id,
-            "name": venue.name,
-            "genres": venue.genres,
-            "address": venue.address,
-            "city": venue.city,
-            "state": venue.state,
-            "website": venue.website,
-            "facebook_link": venue.facebook_link,
-            "seeking_talent": venue.seeking_talent,
-            "seeking_description": venue.seeking_description,
-            "image_link": venue.image_link,
-            "past_shows": past_shows,
-            "upcoming_shows": upcoming_shows,
-            "past_shows_count": len(past_shows),
-            "upcoming_shows_count": len(upcoming_shows)
-        }
-
-    return render_template("pages/show_venue.html", venue=data)
+@main.route("/metrics")
+def metrics():
+    stats = response_cache.stats()
+    extra = [
+        ("fyyur_page_cache_hits_total", "counter", "Page cache hits.",
+         stats["hits"]),
+        ("fyyur_page_cache_misses_total", "counter", "Page cache misses.",
+         stats["misses"]),
+    ]
+    for name, cards in (("venue", venue_cards), ("artist", artist_cards)):
+        extra += [
+            ("fyyur_{}_card_cache_hits_total".format(name), "counter",
+             "{} card cache hits.".format(name.title()), cards.hits),
+            ("fyyur_{}_card_cache_misses_total".format(name), "counter",
+             "{} card cache misses.".format(name.title()), cards.misses),
+            ("fyyur_{}_card_cache_evictions_total".format(name), "counter",
+             "{} cards evicted to stay under the size limit.".format(name.title()),
+             cards.evictions),
+        ]
+    extra += [
+        ("fyyur_db_replica_reads_total", "counter",
+         "Read-only requests served from a replica.",
+         sum(replica_router.reads.values())),
+        ("fyyur_db_replica_pinned_total", "counter",
+         "Read-only requests kept on the primary after the client wrote.",
+         replica_router.pinned),
+        ("fyyur_db_replica_fallbacks_total", "counter",
+         "Read-only requests sent to the primary as no replica was usable.",
+         replica_router.fallbacks),
+    ]
+    return Response(render_metrics(db.engine.pool, extra),
+                    mimetype="text/plain; version=0.0.4")
 
 #  ----------------------------------------------------------------
-#  Create Venue
+#  Bulk Import
 #  ----------------------------------------------------------------
 
-
-@app.route("/venues/create", methods=["GET"])
-def create_venue_form():
-    form = VenueForm()
-    return render_template("forms/new_venue.html", form=form)
-
-
-@app.route("/venues/create", methods=["POST"])
-def create_venue_submission():
-    error = False
-    try:
-        name = request.form["name"]
-        city = request.form["city"]
-        state = request.form["state"]
-        address = request.form["address"]
-        phone = request.form["phone"]
-        genres = request.form.getlist("genres")
-        image_link = request.form["image_link"]
-        facebook_link = request.form["facebook_link"]
-        website = request.form["website"]
-        if "seeking_talent" in request.form:
-            seeking_talent = True
+# kind: (model, name of its form in forms.py); shows go through the
+# scheduler, which also checks their venue, artist and bookings.
+IMPORTS = {
+    "venues": (Venue, "VenueForm"),
+    "artists": (Artist, "ArtistForm"),
+    "shows": (Show, None),
+}
+
+
+def run_import(kind, stream, format, checkpoint, batch_size=1000, on_error=None):
+    import forms
+    model, form_name = IMPORTS[kind]
+    if form_name is None:
+        importer = ShowImporter(db, show_scheduler(), batch_size=batch_size)
+    else:
+        importer = Importer(db, model, getattr(forms, form_name),
+                            batch_size=batch_size)
+    return importer.run(read_records(stream, format), checkpoint=checkpoint,
+                        on_error=on_error, on_insert=imported_rows(kind))
+
+
+def imported_rows(kind):
+    def on_insert(rows):
+        if kind == "venues":
+            venue_search.reset()
+            venue_facets.reset()
+            response_cache.invalidate("venues")
+        elif kind == "artists":
+            artist_search.reset()
+            artist_facets.reset()
+            response_cache.invalidate("artists")
         else:
-            seeking_talent = False
-        seeking_description = request.form["seeking_description"]
-        venue = Venue(name=name, city=city, state=state, address=address,
-                      phone=phone, genres=genres, image_link=image_link, facebook_link=facebook_link, website=website, seeking_talent=seeking_talent, seeking_description=seeking_description)
-        db.session.add(venue)
-        db.session.commit()
-        flash("Venue " + request.form["name"] + " was successfully listed!")
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-        error = True
-        flash("Venue could not be saved.")
-    finally:
-        db.session.close()
-
-    return render_template("pages/home.html")
-
-#  ----------------------------------------------------------------
-#  Edit Venue
-#  ----------------------------------------------------------------
-
-
-@app.route("/venues/<int:venue_id>/edit", methods=["GET"])
-def edit_venue(venue_id):
-    venue_data = Venue.query.get(venue_id)
-    form = VenueForm(obj=venue_data)
-
-    venue = {
-        "id": venue_data.id,
-        "name": venue_data.name,
-        "address": venue_data.address,
-        "city": venue_data.city,
-        "state": venue_data.state,
-        "phone": venue_data.phone,
-        "genres": venue_data.genres,
-        "image_link": venue_data.image_link,
-        "facebook_link": venue_data.facebook_link,
-        "website": venue_data.website,
-        "seeking_talent": venue_data.seeking_talent,
-        "seeking_description": venue_data.seeking_description
-    }
-
-    return render_template("forms/edit_venue.html", form=form, venue=venue)
-
-
-@app.route("/venues/<int:venue_id>/edit", methods=["POST"])
-def edit_venue_submission(venue_id):
-    error = False
+            pairs = {(row["venue_id"], row["artist_id"]) for row in rows}
+            refresh_show_stats({venue_id for venue_id, _ in pairs},
+                               {artist_id for _, artist_id in pairs})
+            db.session.commit()
+            for venue_id, artist_id in pairs:
+                invalidate_show(venue_id, artist_id)
+    return on_insert
+
+
+@main.route("/import/<kind>", methods=["POST"])
+def import_data(kind):
+    if kind not in IMPORTS:
+        abort(404)
+
+    upload = request.files.get("file")
+    if upload is not None:
+        raw = upload.stream
+        default_format = format_from_filename(upload.filename)
+    else:
+        raw = request.stream
+        default_format = "csv" if request.mimetype == "text/csv" else "jsonl"
+    format = request.args.get("format", default_format)
+    if format not in READERS:
+        abort(400)
+
+    checkpoint = Checkpoint(line=request.args.get("resume_from", 0, type=int))
+    stream = io.TextIOWrapper(raw, encoding="utf-8", newline="")
     try:
-        name = request.form["name"]
-        city = request.form["city"]
-        state = request.form["state"]
-        address = request.form["address"]
-        phone = request.form["phone"]
-        genres = request.form.getlist("genres")
-        image_link = request.form["image_link"]
-        facebook_link = request.form["facebook_link"]
-        website = request.form["website"]
-        if "seeking_talent" in request.form:
-            seeking_talent = True
-        else:
-            seeking_talent = False
-        seeking_description = request.form["seeking_description"]
-        venue = Venue.query.get(venue_id)
-        venue.name = name
-        venue.city = city
-        venue.state = state
-        venue.address = address
-        venue.phone = phone
-        venue.genres = genres
-        venue.image_link = image_link
-        venue.facebook_link = facebook_link
-        venue.website = website
-        venue.seeking_talent = seeking_talent
-        venue.seeking_description = seeking_description
-        db.session.commit()
-        flash("Venue " + request.form["name"] + " was successfully updated!")
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-        error = True
-        flash("Venue could not be updated.")
+        result = run_import(kind, stream, format, checkpoint)
     finally:
         db.session.close()
 
-    return redirect(url_for("show_venue", venue_id=venue_id))
+    return jsonify(result.to_dict())
 
 #  ----------------------------------------------------------------
-#  Delete Venue
+#  Bulk Export
 #  ----------------------------------------------------------------
 
-
-@app.route("/venues/<venue_id>", methods=["DELETE"])
-def delete_venue(venue_id):
-    error = False
+EXPORTS = {
+    "venues": Venue,
+    "artists": Artist,
+    "shows": Show,
+}
+
+
+@main.route("/export/<kind>")
+def export_data(kind):
+    if kind not in EXPORTS:
+        abort(404)
+    format = request.args.get("format", "jsonl")
+    if format not in EXPORT_FORMATS:
+        abort(400)
+    since = request.args.get("since")
     try:
-        venue = Venue.query.get(venue_id)
-        db.session.delete(venue)
-        db.session.commit()
-        flash("Venue successfully deleted.")
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-        flash("Venue could not be deleted.")
-    finally:
-        db.session.close()
-
-    return render_template("pages/home.html")
-
-#  ----------------------------------------------------------------
-#  Artists
-#  ----------------------------------------------------------------
-
-
-@app.route("/artists")
-def artists():
-    artists = Artist.query.all()
-    data = []
-
-    for artist in artists:
-        data.append({
-            "id": artist.id,
-            "name": artist.name
-        })
-
-    return render_template("pages/artists.html", artists=data)
-
-#  ----------------------------------------------------------------
-#  Artists Search
-#  ----------------------------------------------------------------
+        since = datetime.fromisoformat(since) if since else None
+        chunks = export(db, EXPORTS[kind], format, since)
+    except ValueError:
+        abort(400)
 
+    extension = "csv" if format == "csv" else "jsonl"
+    return Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[format][1],
+                    headers={"Content-Disposition": "attachment; filename={}.{}".format(
+                        kind, extension)})
 
-@app.route("/artists/search", methods=["POST"])
-def search_artists():
-    search = request.form.get("search_term", "")
-    artists = Artist.query.filter(Artist.name.ilike(f"%{search}%")).outerjoin(
-        Show, Venue.id == Show.venue_id).all()
-    data = []
-
-    for artist in artists:
-        shows = artist.shows
-        upcoming_shows = []
-
-        for show in shows:
-            if show.start_time > current_time:
-                upcoming_shows.append(show)
-
-        data.append({
-            "id": artist.id,
-            "name": artist.name,
-            "num_upcoming_shows": len(upcoming_shows)
-        })
-
-    response = {
-        "count": len(artists),
-        "data": data
-    }
-
-    return render_template("pages/search_artists.html", results=response, search_term=search)
-
-#  ----------------------------------------------------------------
-#  Artist
-#  ----------------------------------------------------------------
-
+#==========================================================================#
+#  COMMANDS
+#==========================================================================#
 
-@app.route("/artists/<int:artist_id>")
-def show_artist(artist_id):
-    artist = Artist.query.filter_by(id=artist_id).outerjoin(
-        Show, Artist.id == Show.venue_id).all()
-
-    for artist in artist:
-        shows = artist.shows
-        past_shows = []
-        upcoming_shows = []
-
-        for show in shows:
-            show_data = {
-                "venue_id": show.venue.id,
-                "venue_name": show.venue.name,
-                "venue_image_link": show.venue.image_link,
-                "start_time": format_datetime(str(show.start_time))
-            }
-            if show.start_time < current_time:
-                past_shows.append(show_data)
+def hot_queries():
+    # The statements behind the venue and artist pages, the show listing and
+    # the area filters, built by the code the views run. Each one must be
+    # answerable from an index: `flask explain-hot-queries` and
+    # tests/test_query_plans.py fail if the planner picks a sequential scan
+    # of a table filled with a generated catalogue.
+    area = FacetFilters(state="CA", city="San Francisco")
+    queries = {}
+    for kind, owner_key, other_key in (("venue", Show.venue_id, Show.artist_id),
+                                       ("artist", Show.artist_id, Show.venue_id)):
+        queries[kind + " show counts"] = show_counts_select(owner_key, 1)
+        queries[kind + " upcoming shows"] = show_rows_select(
+            owner_key, 1, other_key, True)
+        queries[kind + " past shows"] = show_rows_select(
+            owner_key, 1, other_key, False)
+        queries[kind + " past shows after a cursor"] = show_rows_select(
+            owner_key, 1, other_key, False, (datetime(2020, 1, 1), 1))
+    queries["upcoming shows"] = shows.show_listing_query("upcoming").order_by(
+        Show.start_time, Show.id).limit(shows.SHOWS_PER_PAGE)
+    queries["venues in area"] = venues.venue_areas_query(area)
+    queries["artists in area"] = artists.artist_listing_query(area).order_by(
+        artists.ARTIST_SORT_KEY, Artist.id).limit(artists.ARTISTS_PER_PAGE)
+    return {name: getattr(query, "statement", query)
+            for name, query in queries.items()}
+
+
+def explain_hot_queries():
+    dialect = db.engine.dialect
+    plans = {}
+    with db.engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            # Default planner settings: the plans are only meaningful on a
+            # realistically sized, analyzed catalogue (generate_data.py), on
+            # which a small table scan would be the planner's real choice.
+            if dialect.name == "postgresql":
+                prefix = "EXPLAIN "
             else:
-                upcoming_shows.append(show_data)
-
-        data = {
-            "id": artist.id,
-            "name": artist.name,
-            "genres": artist.genres,
-            "city": artist.city,
-            "state": artist.state,
-            "phone": artist.phone,
-            "website": artist.website,
-            "facebook_link": artist.facebook_link,
-            "seeking_venue": artist.seeking_venue,
-            "seeking_description": artist.seeking_description,
-            "image_link": artist.image_link,
-            "past_shows": past_shows,
-            "upcoming_shows": upcoming_shows,
-            "past_shows_count": len(past_shows),
-            "upcoming_shows_count": len(upcoming_shows)
-        }
-
-    return render_template("pages/show_artist.html", artist=data)
-
-#  ----------------------------------------------------------------
-#  Create Artist
-#  ----------------------------------------------------------------
-
-
-@app.route("/artists/create", methods=["GET"])
-def create_artist_form():
-    form = ArtistForm()
-    return render_template("forms/new_artist.html", form=form)
-
-
-@app.route("/artists/create", methods=["POST"])
-def create_artist_submission():
-    error = False
-    try:
-        name = request.form["name"]
-        city = request.form["city"]
-        state = request.form["state"]
-        phone = request.form["phone"]
-        genres = request.form.getlist("genres")
-        image_link = request.form["image_link"]
-        facebook_link = request.form["facebook_link"]
-        website = request.form["website"]
-        if "seeking_venue" in request.form:
-            seeking_venue = True
+                prefix = "EXPLAIN QUERY PLAN "
+            for name, statement in hot_queries().items():
+                # Values are inlined: EXPLAIN is sent as plain SQL.
+                sql = statement.compile(dialect=dialect,
+                                        compile_kwargs={"literal_binds": True})
+                rows = connection.exec_driver_sql(prefix + str(sql))
+                plans[name] = "\n".join(str(row[-1]) for row in rows)
+        finally:
+            transaction.rollback()
+    return plans
+
+
+def is_sequential_scan(plan):
+    return any(line.strip().lstrip("-> ").startswith(("Seq Scan", "SCAN "))
+               and "USING" not in line and "INDEX" not in line
+               for line in plan.splitlines())
+
+
+@main.cli.command("import-data")
+@click.argument("kind", type=click.Choice(sorted(IMPORTS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", type=click.Choice(sorted(READERS)),
+              help="Input format (defaults to the file extension).")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--checkpoint", "checkpoint_path", type=click.Path(dir_okay=False),
+              help="Resume from and record progress in this file.")
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False),
+              help="Write rejected rows to this JSONL file.")
+def import_data_command(kind, path, format, batch_size, checkpoint_path, errors_path):
+    """Bulk import venues, artists or shows from CSV or JSONL."""
+    errors_file = open(errors_path, "a") if errors_path else None
+
+    def on_error(line, errors):
+        if errors_file is not None:
+            errors_file.write(json.dumps({"line": line, "errors": errors}) + "\n")
         else:
-            seeking_venue = False
-        seeking_description = request.form["seeking_description"]
-        artist = Artist(name=name, city=city, state=state, phone=phone, genres=genres, image_link=image_link,
-                        facebook_link=facebook_link, seeking_venue=seeking_venue, seeking_description=seeking_description)
-        db.session.add(artist)
-        db.session.commit()
-        flash("Artist " + request.form["name"] + " was successfully listed!")
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-        error = True
-        flash("Artist could not be saved.")
-    finally:
-        db.session.close()
-
-    return render_template("pages/home.html")
+            click.echo("line {}: {}".format(line, json.dumps(errors)), err=True)
 
-#  ----------------------------------------------------------------
-#  Update Artist
-#  ----------------------------------------------------------------
-
-
-@app.route("/artists/<int:artist_id>/edit", methods=["GET"])
-def edit_artist(artist_id):
-    artist_data = Artist.query.get(artist_id)
-    form = ArtistForm(obj=artist_data)
-    artist = {
-        "id": artist_data.id,
-        "name": artist_data.name,
-        "genres": artist_data.genres,
-        "city": artist_data.city,
-        "state": artist_data.state,
-        "phone": artist_data.phone,
-        "website": artist_data.website,
-        "facebook_link": artist_data.facebook_link,
-        "seeking_venue": artist_data.seeking_venue,
-        "seeking_description": artist_data.seeking_description,
-        "image_link": artist_data.image_link
-    }
-
-    return render_template("forms/edit_artist.html", form=form, artist=artist)
-
-
-@app.route("/artists/<int:artist_id>/edit", methods=["POST"])
-def edit_artist_submission(artist_id):
-    error = False
     try:
-        name = request.form["name"]
-        city = request.form["city"]
-        state = request.form["state"]
-        phone = request.form["phone"]
-        genres = request.form.getlist("genres")
-        image_link = request.form["image_link"]
-        facebook_link = request.form["facebook_link"]
-        website = request.form["website"]
-        if "seeking_venue" in request.form:
-            seeking_venue = True
-        else:
-            seeking_venue = False
-        seeking_description = request.form["seeking_description"]
-        artist = Artist(name=name, city=city, state=state, phone=phone, genres=genres, image_link=image_link,
-                        facebook_link=facebook_link, seeking_venue=seeking_venue, seeking_description=seeking_description)
-        artist = Artist.query.get(artist_id)
-        artist.name = name
-        artist.city = city
-        artist.state = state
-        artist.phone = phone
-        artist.genres = genres
-        artist.image_link = image_link
-        artist.facebook_link = facebook_link
-        artist.website = website
-        artist.seeking_venue = seeking_venue
-        artist.seeking_description = seeking_description
-        db.session.commit()
-        flash("Artist " + request.form["name"] + " was successfully updated!")
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-        error = True
-        flash("Artist could not be updated.")
+        with open(path, newline="", encoding="utf-8") as stream:
+            result = run_import(kind, stream, format or format_from_filename(path),
+                                Checkpoint(checkpoint_path), batch_size, on_error)
     finally:
-        db.session.close()
-
-    return redirect(url_for("show_artist", artist_id=artist_id))
-
-#  ----------------------------------------------------------------
-#  Delete Artist
-#  ----------------------------------------------------------------
-
-
-@app.route("/artists/<artist_id>", methods=["DELETE"])
-def delete_artist(artist_id):
-    error = False
-    try:
-        artist = Artist.query.get(artist_id)
-        db.session.delete(artist)
-        db.session.commit()
-        flash("Artist successfully deleted.")
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-        flash("Artist could not be deleted.")
-    finally:
-        db.session.close()
-
-    return render_template("pages/home.html")
-
-#  ----------------------------------------------------------------
-#  Shows
-#  ----------------------------------------------------------------
-
-
-@app.route("/shows")
-def shows():
-    shows = Show.query.all()
-    data = []
-
-    for show in shows:
-        show_data = {
-            "venue_id": show.venue_id,
-            "venue_name": show.venue.name,
-            "artist_id": show.artist_id,
-            "artist_name": show.artist.name,
-            "artist_image_link": show.artist.image_link,
-            "start_time": format_datetime(str(show.start_time))
-        }
-
-        data.append(show_data)
-
-    return render_template("pages/shows.html", shows=data)
-
-#  ----------------------------------------------------------------
-#  Create Show
-#  ----------------------------------------------------------------
-
-
-@app.route("/shows/create")
-def create_shows():
-    # renders form. do not touch.
-    form = ShowForm()
-    return render_template("forms/new_show.html", form=form)
-
-
-@app.route("/shows/create", methods=["POST"])
-def create_show_submission():
-    error = False
+        if errors_file is not None:
+            errors_file.close()
+
+    click.echo("inserted {inserted}, failed {failed}, skipped {skipped} "
+               "(last line {line})".format(**result.to_dict()))
+
+
+@main.cli.command("export-data")
+@click.argument("kind", type=click.Choice(sorted(EXPORTS)))
+@click.option("--format", default="jsonl", show_default=True,
+              type=click.Choice(sorted(EXPORT_FORMATS)))
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S",
+                                                      "%Y-%m-%dT%H:%M:%S.%f"]),
+              help="Only rows updated after this time.")
+@click.option("--output", type=click.File("w"), default="-",
+              help="Write to this file instead of stdout.")
+def export_data_command(kind, format, since, output):
+    """Stream venues, artists or shows as CSV, JSONL or columnar JSONL."""
     try:
-        venue_id = request.form["venue_id"]
-        artist_id = request.form["artist_id"]
-        start_time = request.form["start_time"]
-        show = Show(venue_id=venue_id, artist_id=artist_id,
-                    start_time=start_time)
-        db.session.add(show)
-        db.session.commit()
-        flash("Show was successfully listed!")
-    except Exception as e:
-        print(e)
-        db.session.rollback()
-        flash("Show could not be listed.")
-    finally:
-        db.session.close()
-
-    return render_template("pages/home.html")
+        chunks = export(db, EXPORTS[kind], format, since)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    for chunk in chunks:
+        output.write(chunk)
+
+
+@main.cli.command("schedule-shows")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", type=click.Choice(sorted(READERS)),
+              help="Input format (defaults to the file extension).")
+def schedule_shows_command(path, format):
+    """Book a batch of shows from CSV or JSONL, all or nothing.
+
+    Rows have venue_id, artist_id, start_time and optionally duration in
+    minutes. Nothing is written if any row is invalid or double-booked.
+    """
+    with open(path, newline="", encoding="utf-8") as stream:
+        lines, items = [], []
+        for line, record in read_records(stream, format or format_from_filename(path)):
+            lines.append(line)
+            items.append(record)
+
+    result = schedule_shows(items)
+    for error in result.errors:
+        line = lines[error["index"]] if error["index"] is not None else "-"
+        click.echo("line {}: {}".format(line, json.dumps(error["errors"])), err=True)
+    if not result.inserted:
+        raise SystemExit("no shows booked: {} errors, {} conflicts".format(
+            len(result.errors), result.conflicts))
+    click.echo("booked {} shows".format(result.inserted))
+
+
+@main.cli.command("refresh-show-stats")
+@click.option("--full", is_flag=True,
+              help="Recompute every venue and artist, not just those due.")
+def refresh_show_stats_command(full):
+    """Move started shows from upcoming to past in the show stats tables.
+
+    Run every CLOCK_GRANULARITY seconds (e.g. from cron); --full rebuilds
+    both tables from the shows table.
+    """
+    now = current_time()
+    if full:
+        venue_stats.refresh(now=now)
+        artist_stats.refresh(now=now)
+        click.echo("rebuilt show stats")
+    else:
+        venues = venue_stats.refresh_due(now)
+        artists = artist_stats.refresh_due(now)
+        click.echo("refreshed {} venues, {} artists".format(venues, artists))
+    db.session.commit()
+
+
+@main.cli.command("build-assets")
+@click.option("--prune", is_flag=True,
+              help="Delete the files of earlier builds first.")
+def build_assets_command(prune):
+    """Bundle, fingerprint and precompress the static assets."""
+    manifest = assets.build(current_app.static_folder, asset_manifest.directory,
+                            prune=prune)
+    for name, built in sorted(manifest.items()):
+        click.echo("{} -> {}".format(name, built))
+
+
+@main.cli.command("replicas")
+def replicas_command():
+    """Check the lag of each read replica; fail if one is unusable."""
+    unusable = []
+    for name in replica_router.names:
+        if not replica_router.usable(name):
+            unusable.append(name)
+        lag = replica_router.lags[name][1]
+        click.echo("{}  {}  {}".format(
+            name, db.engines[name].url.render_as_string(hide_password=True),
+            "unreachable" if lag is None else "{:.1f}s behind".format(lag)))
+
+    if unusable:
+        raise SystemExit("Not usable (max lag {}s): {}".format(
+            replica_router.max_lag, ", ".join(unusable)))
+
+
+@main.cli.command("explain-hot-queries")
+def explain_hot_queries_command():
+    """Fail if a hot query falls back to a sequential scan.
+
+    Run it against an analyzed database of realistic size (see
+    benchmarks/generate_data.py): on a nearly empty one the planner rightly
+    prefers scanning tables of a few pages.
+    """
+    failures = []
+    for name, plan in explain_hot_queries().items():
+        if is_sequential_scan(plan):
+            failures.append(name)
+        click.echo("-- {}\n{}\n".format(name, plan))
+
+    if failures:
+        raise SystemExit("Sequential scan in: " + ", ".join(failures))
 
 #==========================================================================#
 #  ERROR HANDLERS
 #==========================================================================#
 
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template("errors/404.html"), 404
 
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template("errors/500.html"), 500
 
-
-if not app.debug:
-    file_handler = FileHandler("error.log")
-    file_handler.setFormatter(
-        Formatter(
-            "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]")
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info("errors")
-
 #==========================================================================#
 # LAUNCH
 #==========================================================================#
 
 # Default port:
 if __name__ == "__main__":
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
+    create_app().run(host="0.0.0.0", port=port)
 '''
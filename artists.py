@@ -0,0 +1,375 @@
+import json
+from datetime import datetime
+
+from flask import (Blueprint, abort, flash, make_response, redirect,
+                   render_template, request, url_for)
+
+from common import (KeysetPage, api_error, artist_facets, artist_search,
+                    artist_stats, cached, catalogue_version, conditional_json,
+                    decode_cursor, entity_version, invalidate_artist,
+                    past_show_page, replica_router, response_cache,
+                    search_response, show_counts, show_rows, venue_cards)
+from facets import FacetFilters
+from models import Artist, Show, Venue, db
+from replicas import read_replica
+
+bp = Blueprint("artists", __name__)
+
+#  ----------------------------------------------------------------
+#  Artists
+#  ----------------------------------------------------------------
+
+
+@bp.route("/artists")
+@read_replica
+@cached("artists")
+def index():
+    filters = FacetFilters.from_args(request.args)
+    page = artist_listing(request.args, filters)
+    page.rows = list(page.rows)
+
+    return render_template("pages/artists.html", artists=page,
+                           letters=artist_letters(filters), per_page=page.per_page,
+                           filters=filters, facets=artist_facets.counts(filters))
+
+
+def artist_listing(args, filters=FacetFilters()):
+    per_page = min(max(args.get("per_page", ARTISTS_PER_PAGE, type=int), 1),
+                   ARTISTS_MAX_PER_PAGE)
+    letter = args.get("letter", "").lower()[:1]
+    after = decode_cursor(args.get("after"), str)
+    before = decode_cursor(args.get("before"), str)
+    if letter and after is None and before is None:
+        # Jumping to a letter starts right before the first name with it.
+        after = (letter, 0)
+
+    return KeysetPage(artist_listing_query(filters), (ARTIST_SORT_KEY, Artist.id),
+                      None, per_page, after=after, before=before)
+
+
+# Case-insensitive, like the A-Z index, so "dj shadow" is listed under D.
+# ix_artists_lower_name_id serves the order.
+ARTIST_SORT_KEY = db.func.lower(Artist.name)
+
+
+def artist_listing_query(filters=FacetFilters()):
+    # Plain (sort key, id, name) rows: no ORM objects, no unused columns.
+    return filters.apply(db.session.query(
+        ARTIST_SORT_KEY.label("sort_name"), Artist.id, Artist.name), Artist)
+
+
+ARTISTS_PER_PAGE = 50
+ARTISTS_MAX_PER_PAGE = 200
+
+
+def artist_letters(filters=FacetFilters()):
+    # First-letter counts for the A-Z index of the filtered listing, computed
+    # once per set of filters and kept alongside the cached artists pages,
+    # so they are dropped by the same invalidation.
+    variant = "letters|" + json.dumps(filters.args(), sort_keys=True)
+    letters, token = response_cache.get("artists", variant)
+    if letters is None:
+        initial = db.func.upper(db.func.substr(Artist.name, 1, 1))
+        query = filters.apply(db.session.query(initial, db.func.count(Artist.id)),
+                              Artist)
+        rows = query.group_by(initial).order_by(initial)
+        letters = json.dumps([[letter, count] for letter, count in rows])
+        response_cache.set("artists", letters, token, variant,
+                           min_age=replica_router.staleness())
+    return json.loads(letters)
+
+#  ----------------------------------------------------------------
+#  Artists Search
+#  ----------------------------------------------------------------
+
+
+@bp.route("/artists/search", methods=["POST"])
+@read_replica
+def search_artists():
+    search = request.form.get("search_term", "")
+    page = max(request.form.get("page", 1, type=int), 1)
+    response = search_response(artist_search, Artist, artist_stats, search, page)
+
+    return render_template("pages/search_artists.html", results=response, search_term=search)
+
+#  ----------------------------------------------------------------
+#  Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route("/artists/<int:artist_id>")
+@read_replica
+@cached("artist:{artist_id}")
+def show_artist(artist_id):
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        abort(404)
+
+    return render_template("pages/show_artist.html", artist=artist_detail(artist))
+
+
+def artist_detail(artist, counts=None, past_rows=None, upcoming_rows=None):
+    artist_id = artist.id
+    if counts is None:
+        counts = show_counts(Show.artist_id, artist_id)
+        past_rows = artist_show_rows(artist_id, upcoming=False)
+        upcoming_rows = artist_show_rows(artist_id, upcoming=True)
+    upcoming_shows_count, past_shows_count = counts
+    past_rows, past_shows_next = past_show_page(past_rows)
+
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genres,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "past_shows": artist_show_items(past_rows),
+        "upcoming_shows": artist_show_items(upcoming_rows),
+        "past_shows_count": past_shows_count,
+        "upcoming_shows_count": upcoming_shows_count,
+        "past_shows_next": past_shows_next
+    }
+
+
+@bp.route("/artists/<int:artist_id>/past_shows")
+@read_replica
+def artist_past_shows(artist_id):
+    shows, next_cursor = artist_past_shows_page(artist_id, request.args.get("after"))
+    response = make_response(render_template("pages/artist_show_tiles.html",
+                                             shows=shows))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def artist_past_shows_page(artist_id, cursor):
+    after = decode_cursor(cursor, datetime.fromisoformat)
+    rows, next_cursor = past_show_page(artist_show_rows(artist_id, False, after))
+    return artist_show_items(rows), next_cursor
+
+
+def artist_show_rows(artist_id, upcoming, after=None):
+    return show_rows(Show.artist_id, artist_id, Show.venue_id, upcoming, after)
+
+
+def artist_show_items(rows):
+    cards = venue_cards.get_many({venue_id for _, _, venue_id in rows})
+    return [{
+        "id": show_id,
+        "venue_id": venue_id,
+        "venue_name": cards[venue_id].name,
+        "venue_image_link": cards[venue_id].image_link,
+        "start_time": start_time
+    } for start_time, show_id, venue_id in rows if venue_id in cards]
+
+#  ----------------------------------------------------------------
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route("/artists/create", methods=["GET"])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template("forms/new_artist.html", form=form)
+
+
+@bp.route("/artists/create", methods=["POST"])
+def create_artist_submission():
+    error = False
+    try:
+        name = request.form["name"]
+        city = request.form["city"]
+        state = request.form["state"]
+        phone = request.form["phone"]
+        genres = request.form.getlist("genres")
+        image_link = request.form["image_link"]
+        facebook_link = request.form["facebook_link"]
+        website = request.form["website"]
+        if "seeking_venue" in request.form:
+            seeking_venue = True
+        else:
+            seeking_venue = False
+        seeking_description = request.form["seeking_description"]
+        artist = Artist(name=name, city=city, state=state, phone=phone, genres=genres, image_link=image_link,
+                        facebook_link=facebook_link, seeking_venue=seeking_venue, seeking_description=seeking_description)
+        db.session.add(artist)
+        db.session.commit()
+        artist_search.update(artist)
+        artist_facets.update(artist)
+        response_cache.invalidate("artists")
+        flash("Artist " + request.form["name"] + " was successfully listed!")
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        error = True
+        flash("Artist could not be saved.")
+    finally:
+        db.session.close()
+
+    return render_template("pages/home.html")
+
+#  ----------------------------------------------------------------
+#  Update Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route("/artists/<int:artist_id>/edit", methods=["GET"])
+def edit_artist(artist_id):
+    from forms import ArtistForm
+    artist_data = Artist.query.get(artist_id)
+    form = ArtistForm(obj=artist_data)
+    artist = {
+        "id": artist_data.id,
+        "name": artist_data.name,
+        "genres": artist_data.genres,
+        "city": artist_data.city,
+        "state": artist_data.state,
+        "phone": artist_data.phone,
+        "website": artist_data.website,
+        "facebook_link": artist_data.facebook_link,
+        "seeking_venue": artist_data.seeking_venue,
+        "seeking_description": artist_data.seeking_description,
+        "image_link": artist_data.image_link
+    }
+
+    return render_template("forms/edit_artist.html", form=form, artist=artist)
+
+
+@bp.route("/artists/<int:artist_id>/edit", methods=["POST"])
+def edit_artist_submission(artist_id):
+    error = False
+    try:
+        name = request.form["name"]
+        city = request.form["city"]
+        state = request.form["state"]
+        phone = request.form["phone"]
+        genres = request.form.getlist("genres")
+        image_link = request.form["image_link"]
+        facebook_link = request.form["facebook_link"]
+        website = request.form["website"]
+        if "seeking_venue" in request.form:
+            seeking_venue = True
+        else:
+            seeking_venue = False
+        seeking_description = request.form["seeking_description"]
+        artist = Artist(name=name, city=city, state=state, phone=phone, genres=genres, image_link=image_link,
+                        facebook_link=facebook_link, seeking_venue=seeking_venue, seeking_description=seeking_description)
+        artist = Artist.query.get(artist_id)
+        artist.name = name
+        artist.city = city
+        artist.state = state
+        artist.phone = phone
+        artist.genres = genres
+        artist.image_link = image_link
+        artist.facebook_link = facebook_link
+        artist.website = website
+        artist.seeking_venue = seeking_venue
+        artist.seeking_description = seeking_description
+        db.session.commit()
+        artist_search.update(artist)
+        artist_facets.update(artist)
+        invalidate_artist(artist_id)
+        flash("Artist " + request.form["name"] + " was successfully updated!")
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        error = True
+        flash("Artist could not be updated.")
+    finally:
+        db.session.close()
+
+    return redirect(url_for("artists.show_artist", artist_id=artist_id))
+
+#  ----------------------------------------------------------------
+#  Delete Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route("/artists/<artist_id>", methods=["DELETE"])
+def delete_artist(artist_id):
+    error = False
+    try:
+        artist = Artist.query.get(artist_id)
+        db.session.delete(artist)
+        db.session.commit()
+        artist_search.remove(artist_id)
+        artist_facets.remove(artist_id)
+        invalidate_artist(int(artist_id))
+        flash("Artist successfully deleted.")
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        flash("Artist could not be deleted.")
+    finally:
+        db.session.close()
+
+    return render_template("pages/home.html")
+
+#  ----------------------------------------------------------------
+#  JSON API
+#  ----------------------------------------------------------------
+
+
+@bp.route("/api/v1/artists")
+@read_replica
+def api_artists():
+    def build():
+        page = artist_listing(request.args, FacetFilters.from_args(request.args))
+        data = [{"id": artist.id, "name": artist.name} for artist in page]
+        return {"data": data, "prev": page.prev_cursor, "next": page.next_cursor}
+
+    return conditional_json(build, *catalogue_version())
+
+
+@bp.route("/api/v1/artists/facets")
+@read_replica
+def api_artist_facets():
+    filters = FacetFilters.from_args(request.args)
+    validators, last_modified = catalogue_version()
+    return conditional_json(lambda: artist_facets.counts(filters, validators),
+                            validators, last_modified)
+
+
+@bp.route("/api/v1/artists/search")
+@read_replica
+def api_search_artists():
+    search = request.args.get("q", "")
+    page = max(request.args.get("page", 1, type=int), 1)
+    validators, last_modified = catalogue_version()
+    return conditional_json(
+        lambda: search_response(artist_search, Artist, artist_stats, search, page, validators),
+        validators, last_modified)
+
+
+@bp.route("/api/v1/artists/<int:artist_id>")
+@read_replica
+def api_artist(artist_id):
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return api_error(404)
+    return conditional_json(lambda: artist_detail(artist),
+                            *entity_version(artist, Show.artist_id, Venue, Show.venue_id))
+
+
+@bp.route("/api/v1/artists/<int:artist_id>/past_shows")
+@read_replica
+def api_artist_past_shows(artist_id):
+    artist = Artist.query.get(artist_id)
+    if artist is None:
+        return api_error(404)
+    cursor = request.args.get("after")
+
+    def body():
+        shows, next_cursor = artist_past_shows_page(artist_id, cursor)
+        return {"data": shows, "next": next_cursor}
+
+    return conditional_json(body, *entity_version(artist, Show.artist_id, Venue,
+                                                  Show.venue_id))
+
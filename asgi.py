@@ -0,0 +1,178 @@
+"""ASGI entry point.
+
+The venue and artist detail endpoints of the JSON API are served here with
+the async database driver (ASYNC_DATABASE_URI): the record, its show counts,
+its past and upcoming shows and the cache validators are fetched
+concurrently on separate connections, at most ASYNC_QUERY_PARALLELISM at a
+time per request. Every other request (HTML pages,
+writes, imports) is handed to the Flask app through asgiref's WSGI adapter,
+which runs it on a worker thread as before.
+
+Needs asgiref plus asyncpg (Postgres) or aiosqlite (SQLite):
+
+    uvicorn asgi:application --workers 4
+"""
+import asyncio
+import io
+import re
+import sys
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import request
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from app import app
+from artists import artist_detail, artist_show_items
+from common import (api_error, artist_cards, conditional_json, decode_cursor,
+                    entity_validators, entity_version_select, past_show_page,
+                    show_counts_select, show_rows_select, venue_cards)
+from models import Artist, Show, Venue
+from venues import venue_detail, venue_show_items
+
+engine = create_async_engine(app.config["ASYNC_DATABASE_URI"],
+                             **app.config.get("ASYNC_ENGINE_OPTIONS", {}))
+sync_application = WsgiToAsgi(app)
+
+# kind: (model, show key, other side, other side's show key, other side's
+# cards, detail, show items)
+ENTITIES = {
+    "venues": (Venue, Show.venue_id, Artist, Show.artist_id, artist_cards,
+               venue_detail, venue_show_items),
+    "artists": (Artist, Show.artist_id, Venue, Show.venue_id, venue_cards,
+                artist_detail, artist_show_items),
+}
+ROUTE = re.compile(r"^/api/v1/(venues|artists)/(\d+)(/past_shows)?$")
+
+
+async def fetch(statement):
+    # One connection per statement so independent queries overlap.
+    async with engine.connect() as connection:
+        return (await connection.execute(statement)).all()
+
+
+async def fetch_all(*statements):
+    # Run the statements concurrently, but hold no more than
+    # ASYNC_QUERY_PARALLELISM connections at once, so one request cannot
+    # take most of the pool.
+    limit = asyncio.Semaphore(app.config.get("ASYNC_QUERY_PARALLELISM", 2))
+
+    async def run(statement):
+        async with limit:
+            return await fetch(statement)
+
+    return await asyncio.gather(*(run(statement) for statement in statements))
+
+
+async def prime(cards, *row_lists):
+    # Load the cards the show rows need that are not cached yet, so building
+    # the items below never falls back to a synchronous query.
+    generation = cards.generation
+    _, missing = cards.cached({row[2] for rows in row_lists for row in rows})
+    if missing:
+        cards.fill(await fetch(cards.select(missing)), generation)
+
+
+async def detail(kind, record_id):
+    model, show_key, other, other_key, cards, build, _ = ENTITIES[kind]
+    records, counts, past, upcoming, version = await fetch_all(
+        model.__table__.select().where(model.id == record_id),
+        show_counts_select(show_key, record_id),
+        show_rows_select(show_key, record_id, other_key, False),
+        show_rows_select(show_key, record_id, other_key, True),
+        entity_version_select(record_id, show_key, other, other_key))
+    if not records:
+        return api_error(404)
+
+    await prime(cards, past, upcoming)
+    record = records[0]
+    return conditional_json(
+        lambda: build(record, counts[0], past, upcoming),
+        *entity_validators(record.updated_at, version[0]))
+
+
+async def past_shows(kind, record_id):
+    model, show_key, other, other_key, cards, _, show_items = ENTITIES[kind]
+    after = decode_cursor(request.args.get("after"), datetime.fromisoformat)
+    records, rows, version = await fetch_all(
+        model.__table__.select().where(model.id == record_id),
+        show_rows_select(show_key, record_id, other_key, False, after),
+        entity_version_select(record_id, show_key, other, other_key))
+    if not records:
+        return api_error(404)
+
+    await prime(cards, rows)
+    rows, next_cursor = past_show_page(rows)
+    return conditional_json(lambda: {"data": show_items(rows), "next": next_cursor},
+                            *entity_validators(records[0].updated_at, version[0]))
+
+
+def wsgi_environ(scope):
+    # Enough of a WSGI environ for Flask to build its request (arguments,
+    # conditional and Accept-Encoding headers) around an async view.
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[name] = environ[name] + "," + value if name in environ else value
+    return environ
+
+
+async def serve(scope, send, match):
+    kind, record_id, past = match.groups()
+    view = past_shows if past else detail
+    environ = wsgi_environ(scope)
+    with app.request_context(environ):
+        try:
+            response = app.make_response(await view(kind, int(record_id)))
+        except HTTPException as error:
+            response = error.get_response(environ)
+        headers = response.get_wsgi_headers(environ)
+        body = b"" if scope["method"] == "HEAD" else response.get_data()
+
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in headers.items()],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await engine.dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+        match = ROUTE.match(scope["path"])
+        if match:
+            return await serve(scope, send, match)
+    await sync_application(scope, receive, send)
@@ -0,0 +1,233 @@
+"""Fingerprinted, bundled and precompressed static assets.
+
+``build`` concatenates each bundle in BUNDLES (minifying the CSS), copies
+the standalone FILES and every local file a stylesheet references, names
+each output after a hash of its content and writes gzip (and, with the
+brotli package, brotli) variants next to it. A manifest maps logical names
+to the built files:
+
+    flask build-assets
+
+``AssetManifest`` turns logical names into URLs for the templates and
+serves the built files with year-long immutable caching, picking the
+precompressed variant the client accepts. Until the first build the
+templates fall back to the individual files under /static.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import abort, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+BUNDLES = {
+    "css/site.css": [
+        "css/bootstrap.min.css",
+        "css/layout.main.css",
+        "css/main.css",
+        "css/main.responsive.css",
+        "css/main.quickfix.css",
+    ],
+    # Loaded synchronously in <head>.
+    "js/head.js": [
+        "js/libs/modernizr-2.8.2.min.js",
+        "js/libs/moment.min.js",
+    ],
+    # Deferred; kept in the order the separate tags ran in.
+    "js/site.js": [
+        "js/script.js",
+        "js/libs/bootstrap-3.1.1.min.js",
+        "js/plugins.js",
+    ],
+}
+FILES = ["img/front-splash.jpg"]
+
+MANIFEST = "manifest.json"
+HASH_LENGTH = 12
+COMPRESSIBLE = {".css", ".js", ".svg", ".ttf", ".otf", ".eot", ".json"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    # Spaces around ":" are left alone: "a :hover" and "a:hover" differ.
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text):
+    return rjsmin.jsmin(text) if rjsmin is not None else text
+
+
+def fingerprint(name, data):
+    root, ext = posixpath.splitext(name)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return "{}.{}{}".format(root, digest, ext)
+
+
+class Build:
+    def __init__(self, static_folder, output):
+        self.static_folder = static_folder
+        self.output = output
+        self.manifest = {}
+
+    def read(self, name):
+        with open(os.path.join(self.static_folder, name), "rb") as f:
+            return f.read()
+
+    def write(self, name, data):
+        built = fingerprint(name, data)
+        path = os.path.join(self.output, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        if posixpath.splitext(name)[1] in COMPRESSIBLE:
+            variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(data, quality=11)))
+            for suffix, compressed in variants:
+                if len(compressed) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+        self.manifest[name] = built
+        return built
+
+    def file(self, name):
+        return self.manifest.get(name) or self.write(name, self.read(name))
+
+    def rewrite_urls(self, css, source, bundle):
+        # Point url(...) references of a source stylesheet at the built
+        # copies, relative to where the bundle itself is written.
+        def replace(match):
+            quote, url = match.groups()
+            if re.match(r"^(data:|[a-z]+:|/|#)", url):
+                return match.group(0)
+            path, suffix = re.match(r"^([^?#]*)(.*)$", url).groups()
+            name = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+            if not os.path.isfile(os.path.join(self.static_folder, name)):
+                return "url({0}/static/{1}{2}{0})".format(quote, name, suffix)
+            target = posixpath.relpath(self.file(name), posixpath.dirname(bundle))
+            return "url({0}{1}{2}{0})".format(quote, target, suffix)
+        return CSS_URL.sub(replace, css)
+
+    def bundle(self, name, sources):
+        parts = []
+        for source in sources:
+            text = self.read(source).decode("utf-8")
+            if name.endswith(".css"):
+                parts.append(minify_css(self.rewrite_urls(text, source, name)))
+            else:
+                # A separating ";" keeps a file without a trailing semicolon
+                # from running into the next one.
+                parts.append(minify_js(text).rstrip() + "\n;")
+        return self.write(name, "\n".join(parts).encode("utf-8"))
+
+
+def build(static_folder, output, prune=False):
+    """Build every bundle and file into `output` and write its manifest.
+
+    Files from earlier builds are kept unless `prune` is set, so pages
+    rendered by workers still running the previous release keep loading.
+    """
+    if prune and os.path.isdir(output):
+        shutil.rmtree(output)
+    builder = Build(static_folder, output)
+    for name in FILES:
+        builder.file(name)
+    for name, sources in BUNDLES.items():
+        builder.bundle(name, sources)
+
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, MANIFEST), "w") as f:
+        json.dump(builder.manifest, f, indent=2, sort_keys=True)
+    return builder.manifest
+
+
+class AssetManifest:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.directory = None
+        self.path = None
+        self.auto_reload = False
+        self.mtime = None
+        self.entries = {}
+
+    def init_app(self, app, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST)
+        self.auto_reload = app.debug
+        self.mtime = None
+        self.load()
+        app.jinja_env.globals["asset_url"] = self.url
+        app.jinja_env.globals["asset_urls"] = self.urls
+        app.extensions["assets"] = self
+
+    def load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.mtime, self.entries = None, {}
+            return
+        if mtime != self.mtime:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+            self.mtime = mtime
+
+    def url(self, name):
+        if self.auto_reload:
+            self.load()
+        built = self.entries.get(name)
+        if built is None:
+            return url_for("static", filename=name)
+        return url_for(self.endpoint, filename=built)
+
+    def urls(self, name):
+        # One URL for a built bundle, or its sources before the first build.
+        if self.auto_reload:
+            self.load()
+        if name in self.entries or name not in BUNDLES:
+            return [self.url(name)]
+        return [self.url(source) for source in BUNDLES[name]]
+
+    def send(self, filename):
+        path = safe_join(self.directory, filename)
+        if path is None or filename == MANIFEST or not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+        encodings = request.accept_encodings
+        choices = [(encodings[encoding], encoding, suffix)
+                   for encoding, suffix in (("br", ".br"), ("gzip", ".gz"))
+                   if os.path.isfile(path + suffix)]
+        # Brotli wins a tie, as it is listed first.
+        quality, encoding, suffix = max(choices, key=lambda choice: choice[0],
+                                        default=(0, None, ""))
+        if not quality:
+            encoding, suffix = None, ""
+
+        response = send_file(path + suffix, mimetype=mimetype,
+                             max_age=IMMUTABLE_MAX_AGE)
+        if encoding is not None:
+            response.content_encoding = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
@@ -0,0 +1,97 @@
+"""Throughput of the async detail endpoints against the sync WSGI path.
+
+Starts the Flask app under werkzeug's threaded WSGI server and asgi.py under
+uvicorn, each in its own process, then requests venue and artist detail
+pages from the JSON API at increasing concurrency. Both servers read the
+database configured by DATABASE_URL (fill it with generate_data.py first).
+
+    python benchmarks/bench_asgi.py [--concurrency 1 16 64 256] [--requests 2000]
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import run_http, sample_ids  # noqa: E402
+
+SYNC_SERVER = ("from werkzeug.serving import run_simple; from app import app; "
+               "run_simple('127.0.0.1', {port}, app, threaded=True)")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start(command, port, timeout=30):
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("server exited: {}".format(" ".join(command)))
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit("server did not start: {}".format(" ".join(command)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--requests", type=int, default=2000,
+                        help="requests per concurrency level")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="uvicorn worker processes")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    import app as app_module
+    rng = random.Random(args.seed)
+    with app_module.app.app_context():
+        venue_ids = sample_ids(app_module, app_module.Venue, args.requests, rng)
+        artist_ids = sample_ids(app_module, app_module.Artist, args.requests, rng)
+    if not venue_ids or not artist_ids:
+        raise SystemExit("no venues or artists: run generate_data.py first")
+    requests = [("GET", "/api/v1/venues/{}".format(venue_id), None)
+                if i % 2 else ("GET", "/api/v1/artists/{}".format(artist_id), None)
+                for i, (venue_id, artist_id) in enumerate(zip(venue_ids, artist_ids))]
+
+    sync_port, async_port = free_port(), free_port()
+    servers = {
+        "sync": (start([sys.executable, "-c", SYNC_SERVER.format(port=sync_port)],
+                       sync_port), sync_port),
+        "async": (start([sys.executable, "-m", "uvicorn", "asgi:application",
+                         "--port", str(async_port), "--workers", str(args.workers),
+                         "--log-level", "warning", "--no-access-log"],
+                        async_port), async_port),
+    }
+    try:
+        print("{:>11}  {:>6}  {:>9}  {:>8}  {:>8}  {:>5}".format(
+            "concurrency", "server", "req/s", "p50 ms", "p95 ms", "5xx"))
+        for concurrency in args.concurrency:
+            for name, (_, port) in servers.items():
+                run_http(port, requests[:concurrency * 2], concurrency)
+                stats = run_http(port, requests, concurrency)
+                print("{:>11}  {:>6}  {:>9.1f}  {:>8.2f}  {:>8.2f}  {:>5}".format(
+                    concurrency, name, stats["rps"], stats["p50_ms"],
+                    stats["p95_ms"], stats["errors"]))
+    finally:
+        for process, _ in servers.values():
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
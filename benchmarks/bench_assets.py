@@ -0,0 +1,63 @@
+"""Asset requests and bytes for a first and a repeat page load.
+
+Renders a page with the Flask test client, fetches every stylesheet, script
+and image it references from this app the way a browser would, then
+replays the load against that "browser cache": fresh responses are not
+requested again and stale ones are revalidated with If-None-Match. Run
+it before and after `flask build-assets` to compare the two serving paths.
+
+    python benchmarks/bench_assets.py [--page /]
+"""
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ASSET = re.compile(r"""<(?:link|script|img)\b[^>]*?(?:href|src)=["'](/[^/"'][^"']*)["']""")
+ACCEPT_ENCODING = "br, gzip"
+
+
+def fresh(response):
+    cache_control = response.cache_control
+    return bool(cache_control.immutable or cache_control.max_age)
+
+
+def load(client, urls, cache):
+    requests = transferred = 0
+    for url in urls:
+        cached = cache.get(url)
+        if cached is not None and fresh(cached):
+            continue
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if cached is not None and cached.headers.get("ETag"):
+            headers["If-None-Match"] = cached.headers["ETag"]
+        response = client.get(url, headers=headers)
+        requests += 1
+        transferred += len(response.get_data())
+        if response.status_code == 200:
+            cache[url] = response
+        response.close()
+    return requests, transferred
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", default="/")
+    args = parser.parse_args()
+
+    import app as app_module
+    client = app_module.app.test_client()
+    html = client.get(args.page).get_data(as_text=True)
+    urls = list(dict.fromkeys(ASSET.findall(html)))
+
+    cache = {}
+    print("{:>7}  {:>8}  {:>10}".format("load", "requests", "bytes"))
+    for name in ("first", "repeat"):
+        requests, transferred = load(client, urls, cache)
+        print("{:>7}  {:>8}  {:>10}".format(name, requests, transferred))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Datetime filter cost per show row.
+
+Compares the cached formatter in filters.py with the original
+str() -> dateutil -> babel round trip over a set of show start times.
+
+    python benchmarks/bench_datetime.py [--rows 100000] [--distinct 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filters import format_cached, format_datetime  # noqa: E402
+
+
+def format_datetime_original(value, format="medium"):
+    date = dateutil.parser.parse(value)
+    if format == "full":
+        format = "EEEE, MMMM d, y 'at' h:mma"
+    elif format == "medium":
+        format = "EE, MM dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--distinct", type=int, default=5000,
+                        help="distinct start times among the rows")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    base = datetime(2020, 1, 1, 20)
+    times = [base + timedelta(days=rng.randrange(3650), minutes=30 * rng.randrange(8))
+             for _ in range(args.distinct)]
+    rows = [rng.choice(times) for _ in range(args.rows)]
+
+    start = time.perf_counter()
+    expected = [format_datetime_original(str(row), "full") for row in rows]
+    original = time.perf_counter() - start
+
+    format_cached.cache_clear()
+    start = time.perf_counter()
+    result = [format_datetime(row, "full") for row in rows]
+    cached = time.perf_counter() - start
+
+    assert result == expected, "formatters disagree"
+    print("rows: {}  distinct start times: {}".format(args.rows, args.distinct))
+    print("original: {:8.3f} s  ({:.2f} us/row)".format(
+        original, original / args.rows * 1e6))
+    print("cached:   {:8.3f} s  ({:.2f} us/row)".format(
+        cached, cached / args.rows * 1e6))
+    print("speedup:  {:8.1f}x".format(original / cached))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Facet count latency against catalogue size.
+
+Compares the bitmap index behind the venue and artist facets with counting
+the same options by scanning every row, for a handful of filter mixes, on
+rows drawn like generate_data.py's artists.
+
+    python benchmarks/bench_facets.py [--sizes 10000 100000 300000]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from facets import FacetFilters, FacetIndex  # noqa: E402
+from generate_data import Generator  # noqa: E402
+
+FILTERS = [
+    FacetFilters(),
+    FacetFilters(["Jazz"]),
+    FacetFilters(["Rock n Roll", "Pop"]),
+    FacetFilters(["Jazz", "Blues"], "CA"),
+    FacetFilters(["Pop"], "CA", "Oakland"),
+    FacetFilters(["Folk", "Soul", "Funk"], "TN"),
+]
+
+
+def make_rows(size, seed):
+    generator = Generator(seed)
+    for row_id in range(1, size + 1):
+        artist = generator.artist()
+        yield row_id, artist["genres"], artist["state"], artist["city"]
+
+
+def linear_counts(rows, filters):
+    genres, states, cities = Counter(), Counter(), Counter()
+    count = 0
+    wanted = set(filters.genres)
+    for _, row_genres, state, city in rows:
+        if not wanted.issubset(row_genres):
+            continue
+        states[state] += 1
+        if filters.state and state != filters.state:
+            continue
+        cities[city] += 1
+        if filters.city and city != filters.city:
+            continue
+        count += 1
+        genres.update(row_genres)
+    return count, genres, states, cities
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10000, 100000, 300000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print("{:>8}  {:>9}  {:<40}  {:>7}  {:>10}  {:>9}".format(
+        "rows", "build (s)", "filters", "matches", "index (ms)", "scan (ms)"))
+    for size in args.sizes:
+        rows = list(make_rows(size, args.seed))
+        index = FacetIndex()
+        start = time.perf_counter()
+        index.load(rows)
+        build = time.perf_counter() - start
+
+        for filters in FILTERS:
+            indexed, counts = timed(lambda: index.counts(filters), args.repeat)
+            scanned, (count, *_) = timed(lambda: linear_counts(rows, filters),
+                                         max(args.repeat // 10, 1))
+            assert counts["count"] == count
+            label = "+".join(filters.genres) or "-"
+            if filters.state:
+                label += " in " + ", ".join(filter(None, (filters.city, filters.state)))
+            print("{:>8}  {:>9.2f}  {:<40}  {:>7}  {:>10.3f}  {:>9.3f}".format(
+                size, build, label, count, indexed, scanned))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""How read-only requests spread over the read replicas.
+
+Replays every read-only route (the views marked read_replica) from
+--concurrency threads, once with the replicas switched off and once per
+selection policy, and reports the queries each database ran and the
+latency. Then checks the consistency rules against the live setup:
+
+    read-your-writes   a client that edits a venue reads the edit back
+    lag tolerance      a replica reporting more than REPLICA_MAX_LAG is skipped
+
+Needs DATABASE_REPLICA_URLS. Copies of the primary taken before the run
+stand in for replicas on a laptop (two SQLite files, or
+`createdb -T fyyur fyyur_replica` twice); they never receive the edit, so
+the second client below sees the old name, which is exactly what pinning
+the writer to the primary protects against.
+
+    DATABASE_REPLICA_URLS=postgresql:///fyyur_r1,postgresql:///fyyur_r2 \\
+        python benchmarks/bench_replicas.py [--requests 20] [--concurrency 8]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import build_routes, percentile  # noqa: E402
+
+
+def count_queries(app_module):
+    # Queries run per bind ("primary" or the replica's bind key).
+    counts = Counter()
+    with app_module.app.app_context():
+        for key, engine in app_module.db.engines.items():
+            def count(*args, name=key or "primary"):
+                counts[name] += 1
+            event.listen(engine, "before_cursor_execute", count)
+    return counts
+
+
+def clear_caches(services):
+    # Every run starts cold, so each one reaches the databases alike.
+    if hasattr(services.response_cache.backend, "clear"):
+        services.response_cache.backend.clear()
+    services.venue_cards.clear()
+    services.artist_cards.clear()
+
+
+def replay(app, requests, concurrency):
+    def worker(batch):
+        client = app.test_client()
+        latencies = []
+        for method, path, data in batch:
+            began = time.perf_counter()
+            client.open(path, method=method, data=data).get_data()
+            latencies.append(time.perf_counter() - began)
+        return latencies
+
+    batches = [requests[i::concurrency] for i in range(concurrency)]
+    with ThreadPoolExecutor(concurrency) as pool:
+        return [latency for latencies in pool.map(worker, batches)
+                for latency in latencies]
+
+
+def read_your_writes(app_module):
+    app = app_module.app
+    with app.app_context():
+        venue = app_module.Venue.query.order_by(app_module.Venue.id).first()
+        form = {field: getattr(venue, field) or "" for field in (
+            "name", "city", "state", "address", "phone", "image_link",
+            "facebook_link", "website", "seeking_description")}
+        form["genres"] = list(venue.genres)
+        venue_id = venue.id
+    original = form["name"]
+    edited = dict(form, name=original + " (edited)")
+
+    writer = app.test_client()
+    writer.post("/venues/{}/edit".format(venue_id), data=edited)
+    seen_by_writer = writer.get("/api/v1/venues/{}".format(venue_id)).get_json()["name"]
+    seen_by_other = app.test_client().get(
+        "/api/v1/venues/{}".format(venue_id)).get_json()["name"]
+    writer.post("/venues/{}/edit".format(venue_id), data=form)
+    return edited["name"], seen_by_writer, seen_by_other
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20,
+                        help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    import app as app_module
+    from replicas import SELECTIONS
+
+    app = app_module.app
+    services = app.extensions["fyyur"]
+    replica_router = services.replica_router
+    if not replica_router.names:
+        raise SystemExit("No replicas configured: set DATABASE_REPLICA_URLS.")
+
+    routes = build_routes(app_module, args.requests, random.Random(args.seed))
+    read_only = {rule.rule for rule in app.url_map.iter_rules()
+                 if getattr(app.view_functions[rule.endpoint], "read_replica", False)}
+    requests = [request for name, batch in routes.items()
+                if name.split(" ", 1)[1] in read_only for request in batch]
+    random.Random(args.seed).shuffle(requests)
+
+    counts = count_queries(app_module)
+    names = ["primary"] + replica_router.names
+    replicas = replica_router.names
+    print("{} requests over {} routes, {} threads\n".format(
+        len(requests), len(read_only), args.concurrency))
+    print("{:<14}  {:>8}  {:>8}  {}".format(
+        "selection", "p50 ms", "p95 ms", "  ".join("{:>9}".format(n) for n in names)))
+    for selection in ("off",) + SELECTIONS:
+        replica_router.names = [] if selection == "off" else replicas
+        replica_router.selection = selection if selection != "off" else SELECTIONS[0]
+        counts.clear()
+        clear_caches(services)
+        latencies = replay(app, requests, args.concurrency)
+        print("{:<14}  {:>8.2f}  {:>8.2f}  {}".format(
+            selection, percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000,
+            "  ".join("{:>9}".format(counts[n]) for n in names)))
+    replica_router.names = replicas
+
+    edited, seen_by_writer, seen_by_other = read_your_writes(app_module)
+    print("\nread-your-writes: wrote {!r}, writer read {!r} ({}), another client read {!r}"
+          .format(edited, seen_by_writer, "ok" if seen_by_writer == edited else "STALE",
+                  seen_by_other))
+
+    replica_router.lag_query = "SELECT {}".format(replica_router.max_lag + 1)
+    replica_router.lags.clear()
+    fallbacks = replica_router.fallbacks
+    counts.clear()
+    clear_caches(services)
+    app.test_client().get(next(path for method, path, _ in requests if method == "GET"))
+    print("lag tolerance: replicas {}s behind, {} request(s) fell back, queries {}".format(
+        replica_router.max_lag + 1, replica_router.fallbacks - fallbacks, dict(counts)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Latency and throughput of every read route.
+
+Drives each GET route in app.py (plus the two search forms) either through
+the Flask test client, or over HTTP against a threaded WSGI server running
+the app in this process. Reports p50/p95/p99 latency and requests per second
+per route, and the process's peak RSS. Routes are timed with the page cache
+off, so every request runs the view's queries; routes behind @cached are
+timed again with it on and reported as "<route> [cached]". Any 4xx or 5xx
+response counts as an error. Results can be saved as a baseline and later
+runs compared against it; --compare exits non-zero when a route's p95
+regresses by more than --threshold percent.
+
+Run against a database filled by generate_data.py:
+
+    python benchmarks/bench_routes.py --mode wsgi --concurrency 16 --save benchmarks/baselines/wsgi.json
+    python benchmarks/bench_routes.py --mode wsgi --concurrency 16 --compare benchmarks/baselines/wsgi.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import NullCache  # noqa: E402
+
+# Routes that write, stream whole tables or need an upload are left out.
+SKIP_ENDPOINTS = {"static", "main.asset", "main.export_data", "main.import_data"}
+SEARCH_TERMS = ["the", "jazz", "hall", "new", "band", "rock", "xyzzy"]
+# Query arguments a route needs to get past its 400 response.
+ROUTE_ARGS = {"/api/v1/changes": {"since": "2000-01-01T00:00:00"}}
+
+
+def sample_ids(app_module, model, count, rng):
+    ids = [row_id for row_id, in app_module.db.session.query(model.id).limit(10000)]
+    return [rng.choice(ids) for _ in range(count)] if ids else []
+
+
+def build_routes(app_module, count, rng):
+    """Map each route name to ``count`` (method, path, form data) requests."""
+    with app_module.app.app_context():
+        ids = {
+            "venue_id": sample_ids(app_module, app_module.Venue, count, rng),
+            "artist_id": sample_ids(app_module, app_module.Artist, count, rng),
+        }
+
+    routes = {}
+    for rule in app_module.app.url_map.iter_rules():
+        if rule.endpoint in SKIP_ENDPOINTS:
+            continue
+        if "GET" in rule.methods:
+            method = "GET"
+        elif rule.endpoint in ("venues.search_venues", "artists.search_artists"):
+            method = "POST"
+        else:
+            continue
+        if any(not ids.get(arg) for arg in rule.arguments):
+            continue
+
+        requests = []
+        for i in range(count):
+            path = rule.rule
+            for arg in rule.arguments:
+                path = path.replace("<int:{}>".format(arg), str(ids[arg][i]))
+            term = rng.choice(SEARCH_TERMS)
+            data = None
+            if method == "POST":
+                data = {"search_term": term}
+            elif path.endswith("/search"):
+                path += "?" + urlencode({"q": term})
+            elif rule.rule in ROUTE_ARGS:
+                path += "?" + urlencode(ROUTE_ARGS[rule.rule])
+            requests.append((method, path, data))
+        routes["{} {}".format(method, rule.rule)] = requests
+    return routes
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(int(round(pct / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(latencies, elapsed, errors):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+def run_test_client(app, requests):
+    client = app.test_client()
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for method, path, data in requests:
+        began = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        response.get_data()
+        latencies.append(time.perf_counter() - began)
+        errors += response.status_code >= 400
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+class WSGIServer:
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        # One access log line per request would dominate the timings.
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+
+
+def run_http(port, requests, concurrency):
+    local = threading.local()
+
+    def fetch(request):
+        method, path, data = request
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection("127.0.0.1", port)
+        body = urlencode(data) if data else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if data else {}
+        began = time.perf_counter()
+        try:
+            local.connection.request(method, path, body=body, headers=headers)
+            response = local.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            local.connection.close()
+            del local.connection
+            status = 599
+        return time.perf_counter() - began, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(fetch, requests))
+    elapsed = time.perf_counter() - start
+    return summarize([latency for latency, _ in results], elapsed,
+                     sum(status >= 400 for _, status in results))
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    if (results["mode"], results["concurrency"]) != (baseline["mode"], baseline["concurrency"]):
+        print("warning: baseline was {} mode at concurrency {}".format(
+            baseline["mode"], baseline["concurrency"]), file=sys.stderr)
+    print("\n{:<45} {:>10} {:>10} {:>8}".format("route", "base p95", "p95", "change"))
+    for name, stats in results["routes"].items():
+        base = baseline["routes"].get(name)
+        if base is None or not base["p95_ms"]:
+            continue
+        change = (stats["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("{:<45} {:>10.2f} {:>10.2f} {:>+7.1f}%{}".format(
+            name, base["p95_ms"], stats["p95_ms"], change, flag))
+    print("peak RSS: {:.1f} MB (baseline {:.1f} MB)".format(
+        results["peak_rss_mb"], baseline["peak_rss_mb"]))
+    return regressions
+
+
+def cached_routes(app_module, routes):
+    cached = set()
+    for rule in app_module.app.url_map.iter_rules():
+        view = app_module.app.view_functions[rule.endpoint]
+        if hasattr(view, "cached_as"):
+            cached.add("GET " + rule.rule)
+    return [name for name in routes if name in cached]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["test", "wsgi"], default="test")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="client threads (wsgi mode)")
+    parser.add_argument("--warmup", type=int, default=10,
+                        help="untimed requests per route first")
+    parser.add_argument("--route", action="append", default=[],
+                        help="only routes containing this text (repeatable)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="p95 increase (percent) counted as a regression")
+    args = parser.parse_args()
+
+    import app as app_module
+    rng = random.Random(args.seed)
+    routes = build_routes(app_module, args.warmup + args.requests, rng)
+    if args.route:
+        routes = {name: requests for name, requests in routes.items()
+                  if any(text in name for text in args.route)}
+
+    results = {
+        "mode": args.mode,
+        "concurrency": args.concurrency if args.mode == "wsgi" else 1,
+        "requests_per_route": args.requests,
+        "python": platform.python_version(),
+        "date": datetime.utcnow().isoformat(timespec="seconds"),
+        "routes": {},
+    }
+
+    print("{:<45} {:>8} {:>8} {:>8} {:>9} {:>6}".format(
+        "route", "p50 ms", "p95 ms", "p99 ms", "req/s", "errors"))
+    server = WSGIServer(app_module.app) if args.mode == "wsgi" else None
+    response_cache = app_module.app.extensions["fyyur"].response_cache
+    page_cache = response_cache.backend
+    runs = [(name, name, False) for name in sorted(routes)]
+    runs += [(name + " [cached]", name, True)
+             for name in sorted(cached_routes(app_module, routes))]
+    try:
+        if server is not None:
+            server.__enter__()
+        for label, name, cache in runs:
+            response_cache.backend = page_cache if cache else NullCache()
+            requests = routes[name]
+            warmup, timed = requests[:args.warmup], requests[args.warmup:]
+            if server is not None:
+                run_http(server.port, warmup, args.concurrency)
+                stats = run_http(server.port, timed, args.concurrency)
+            else:
+                run_test_client(app_module.app, warmup)
+                stats = run_test_client(app_module.app, timed)
+            results["routes"][label] = stats
+            print("{:<45} {:>8.2f} {:>8.2f} {:>8.2f} {:>9.1f} {:>6}".format(
+                label, stats["p50_ms"], stats["p95_ms"], stats["p99_ms"],
+                stats["rps"], stats["errors"]))
+    finally:
+        response_cache.backend = page_cache
+        if server is not None:
+            server.__exit__(None, None, None)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    print("peak RSS: {:.1f} MB".format(results["peak_rss_mb"]))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            raise SystemExit("p95 regressed by more than {}% in: {}".format(
+                args.threshold, ", ".join(regressions)))
+
+
+if __name__ == "__main__":
+    main()
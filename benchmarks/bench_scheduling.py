@@ -0,0 +1,142 @@
+"""Double-booking check for a batch of shows.
+
+Books a synthetic festival (one stage per venue, back-to-back sets) through
+the per-venue and per-artist interval indexes used by scheduling.Scheduler,
+and, for smaller batches, through a pairwise scan of the shows already
+accepted. Then times the whole Scheduler.run (validating the items as
+strings, checking ids, loading stored shows, booking, inserting) on the
+database configured by DATABASE_URL, filled with generate_data.py, rolling
+each batch back afterwards.
+
+    python benchmarks/bench_scheduling.py [--shows 50000] [--venues 200] [--artists 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_routes import sample_ids  # noqa: E402
+from scheduling import IntervalIndex  # noqa: E402
+
+# Pairwise checking is quadratic; skip it above this many shows.
+PAIRWISE_LIMIT = 10000
+
+
+def festival(shows, venues, artists, rng, base=datetime(2030, 7, 1, 12)):
+    slots = defaultdict(int)
+    rows = []
+    for _ in range(shows):
+        venue = rng.randrange(venues)
+        start = base + timedelta(minutes=45 * slots[venue])
+        slots[venue] += 1
+        duration = timedelta(minutes=rng.choice([30, 45, 60]))
+        rows.append((venue, rng.randrange(artists), start, start + duration))
+    rng.shuffle(rows)
+    return rows
+
+
+def indexed(rows):
+    venues = defaultdict(IntervalIndex)
+    artists = defaultdict(IntervalIndex)
+    conflicts = 0
+    for number, (venue, artist, start, end) in enumerate(rows):
+        if venues[venue].overlapping(start, end) or artists[artist].overlapping(start, end):
+            conflicts += 1
+            continue
+        venues[venue].add(start, end, number)
+        artists[artist].add(start, end, number)
+    return conflicts
+
+
+def pairwise(rows):
+    accepted = []
+    conflicts = 0
+    for venue, artist, start, end in rows:
+        if any((venue == other_venue or artist == other_artist)
+               and start < other_end and other_start < end
+               for other_venue, other_artist, other_start, other_end in accepted):
+            conflicts += 1
+            continue
+        accepted.append((venue, artist, start, end))
+    return conflicts
+
+
+def scheduler_items(rows, venue_ids, artist_ids):
+    # The festival as Scheduler.run receives it from the batch API, mapped
+    # onto stored venues and artists.
+    return [{"venue_id": str(venue_ids[venue % len(venue_ids)]),
+             "artist_id": str(artist_ids[artist % len(artist_ids)]),
+             "start_time": start.strftime("%Y-%m-%d %H:%M"),
+             "duration": str((end - start) // timedelta(minutes=1))}
+            for venue, artist, start, end in rows]
+
+
+def time_scheduler(sizes, args):
+    import app as app_module
+    from shows import show_scheduler
+
+    db = app_module.db
+    rng = random.Random(args.seed)
+    with app_module.app.app_context():
+        venue_ids = sorted(set(sample_ids(app_module, app_module.Venue, args.venues, rng)))
+        artist_ids = sorted(set(sample_ids(app_module, app_module.Artist, args.artists, rng)))
+        if not venue_ids or not artist_ids:
+            print("\nno venues or artists: run generate_data.py to time Scheduler.run")
+            return
+
+        print("\n{:>8}  {:>10}  {:>12}  {:>12}".format(
+            "shows", "conflicts", "validate (s)", "run (s)"))
+        scheduler = show_scheduler()
+        for shows in sizes:
+            # A century out, clear of the generated shows.
+            rows = festival(shows, len(venue_ids), len(artist_ids),
+                            random.Random(args.seed), base=datetime(2130, 7, 1, 12))
+            items = scheduler_items(rows, venue_ids, artist_ids)
+            start = time.perf_counter()
+            for item in items:
+                scheduler.validate(item)
+            validate_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = scheduler.run(items)
+            run_time = time.perf_counter() - start
+            db.session.rollback()
+            print("{:>8}  {:>10}  {:>12.3f}  {:>12.3f}".format(
+                shows, result.conflicts, validate_time, run_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--venues", type=int, default=200)
+    parser.add_argument("--artists", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print("{:>8}  {:>10}  {:>12}  {:>12}".format(
+        "shows", "conflicts", "index (s)", "pairwise (s)"))
+    for shows in args.shows:
+        rows = festival(shows, args.venues, args.artists, random.Random(args.seed))
+        start = time.perf_counter()
+        conflicts = indexed(rows)
+        index_time = time.perf_counter() - start
+
+        pairwise_time = float("nan")
+        if shows <= PAIRWISE_LIMIT:
+            start = time.perf_counter()
+            assert pairwise(rows) == conflicts, "checks disagree"
+            pairwise_time = time.perf_counter() - start
+        print("{:>8}  {:>10}  {:>12.3f}  {:>12.3f}".format(
+            shows, conflicts, index_time, pairwise_time))
+
+    time_scheduler(args.shows, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Search latency against table size.
+
+Compares the in-process n-gram index used by the "index" search backend with
+the linear substring scan it replaces.
+
+    python benchmarks/bench_search.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import NgramIndex, field_text  # noqa: E402
+
+CITIES = ["San Francisco", "New York", "Austin", "Chicago", "Seattle",
+          "New Orleans", "Nashville", "Portland", "Denver", "Boston"]
+STATES = ["CA", "NY", "TX", "IL", "WA", "LA", "TN", "OR", "CO", "MA"]
+GENRES = ["Alternative", "Blues", "Classical", "Country", "Electronic",
+          "Folk", "Funk", "Hip-Hop", "Jazz", "Pop", "Punk", "Soul"]
+TERMS = ["the", "jazz", "club", "san", "hall", "musical", "xyzzy"]
+
+
+def make_rows(size, rng):
+    for row_id in range(1, size + 1):
+        city = rng.randrange(len(CITIES))
+        name = "The {} {}".format(
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(6)),
+            rng.choice(["Hall", "Club", "Room", "Musical Hop", "Lounge"]))
+        yield row_id, {
+            "name": name,
+            "city": CITIES[city],
+            "state": STATES[city],
+            "genres": rng.sample(GENRES, 2),
+        }
+
+
+def linear_scan(rows, term):
+    term = term.lower()
+    return [row_id for row_id, values in rows
+            if any(term in field_text(value) for value in values.values())]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print("{:>8}  {:>10}  {:>12}  {:>12}".format(
+        "rows", "build (s)", "index (ms)", "scan (ms)"))
+    for size in args.sizes:
+        rows = list(make_rows(size, random.Random(args.seed)))
+        index = NgramIndex()
+        start = time.perf_counter()
+        for row_id, values in rows:
+            index.add(row_id, **values)
+        build = time.perf_counter() - start
+
+        indexed = sum(timed(lambda: index.search(term), args.repeat)
+                      for term in TERMS) / len(TERMS)
+        scanned = sum(timed(lambda: linear_scan(rows, term), args.repeat)
+                      for term in TERMS) / len(TERMS)
+        print("{:>8}  {:>10.2f}  {:>12.3f}  {:>12.3f}".format(
+            size, build, indexed, scanned))
+
+
+if __name__ == "__main__":
+    main()
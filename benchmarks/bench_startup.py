@@ -0,0 +1,97 @@
+"""Worker boot time: importing the app, building it and serving a request.
+
+Each run starts a fresh interpreter that imports app.py, calls create_app()
+and serves one request with the test client, timing each step. A second
+set of runs builds the app once and forks, as `gunicorn --preload` does,
+timing the first request of the child. The slowest imports (self time,
+from ``python -X importtime``) of one more interpreter are listed last.
+
+    python benchmarks/bench_startup.py [--runs 5] [--page /] [--top 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = """
+import json, sys
+from time import perf_counter
+started = perf_counter()
+import app
+imported = perf_counter()
+application = app.create_app()
+created = perf_counter()
+application.test_client().get(sys.argv[1])
+done = perf_counter()
+print(json.dumps({"import": imported - started, "create_app": created - imported,
+                  "first_request": done - created, "total": done - started}))
+"""
+
+FORKED = """
+import json, os, sys
+from time import perf_counter
+import app
+application = app.create_app()
+read_end, write_end = os.pipe()
+pid = os.fork()
+if pid == 0:
+    started = perf_counter()
+    application.test_client().get(sys.argv[1])
+    os.write(write_end, json.dumps({"first_request": perf_counter() - started}).encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+os.close(write_end)
+print(os.read(read_end, 4096).decode())
+"""
+
+
+def run(script, page, *options):
+    output = subprocess.run([sys.executable, *options, "-c", script, page], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return output
+
+
+def slowest_imports(page, top):
+    # -X importtime lines: "import time: self [us] | cumulative | name".
+    rows = []
+    for line in run("import app", page, "-X", "importtime").stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[0].split(":")[-1].strip().isdigit():
+            rows.append((int(parts[0].split(":")[-1]), int(parts[1]), parts[2].rstrip()))
+    total = sum(row[0] for row in rows)
+    return total, sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--page", default="/")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    boots = [json.loads(run(BOOT, args.page).stdout.splitlines()[-1])
+             for _ in range(args.runs)]
+    print("{:<14}  {:>9}".format("fresh process", "median ms"))
+    for step in ("import", "create_app", "first_request", "total"):
+        print("{:<14}  {:>9.1f}".format(
+            step, statistics.median(boot[step] for boot in boots) * 1000))
+
+    if hasattr(os, "fork"):
+        forked = [json.loads(run(FORKED, args.page).stdout.splitlines()[-1])
+                  for _ in range(args.runs)]
+        print("{:<14}  {:>9.1f}\n".format("forked worker", statistics.median(
+            run_["first_request"] for run_ in forked) * 1000))
+
+    total, rows = slowest_imports(args.page, args.top)
+    print("import app: {:.1f} ms of module imports (self time)".format(total / 1000))
+    print("{:>8}  {:>8}  {}".format("self ms", "cum ms", "module"))
+    for self_us, cumulative_us, name in rows:
+        print("{:>8.1f}  {:>8.1f}  {}".format(self_us / 1000, cumulative_us / 1000, name))
+
+
+if __name__ == "__main__":
+    main()
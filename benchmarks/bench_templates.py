@@ -0,0 +1,100 @@
+"""Template compile times and cold versus warm first-request latency.
+
+Compiles every template under templates/ from source and loads it back from
+a bytecode cache, then starts the app in fresh processes and times its boot
+and its first request:
+
+    cold       no warm-up, empty bytecode cache
+    bytecode   no warm-up, bytecode cache filled by an earlier process
+    warm       warm-up at boot from the filled bytecode cache
+
+    python benchmarks/bench_templates.py [--page /] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIRST_REQUEST = """
+import json, sys
+from time import perf_counter
+started = perf_counter()
+import app
+booted = perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+done = perf_counter()
+print(json.dumps({"status": response.status_code, "boot": booted - started,
+                  "first": done - booted}))
+"""
+
+
+def compile_times(app):
+    from jinja2 import FileSystemBytecodeCache
+
+    from templating import html_template
+
+    env = app.jinja_env
+    with tempfile.TemporaryDirectory() as directory:
+        bytecode_cache = FileSystemBytecodeCache(directory)
+        fill = env.overlay(bytecode_cache=bytecode_cache, cache_size=0)
+        load = env.overlay(bytecode_cache=bytecode_cache, cache_size=0)
+        rows = []
+        for name in env.list_templates(filter_func=html_template):
+            source, filename, _ = env.loader.get_source(env, name)
+            started = perf_counter()
+            env.compile(source, name, filename)
+            compiled = perf_counter() - started
+            fill.get_template(name)
+            started = perf_counter()
+            load.get_template(name)
+            rows.append((name, compiled, perf_counter() - started))
+    return rows
+
+
+def first_request(page, warm_up, cache_dir):
+    environ = dict(os.environ, TEMPLATE_BYTECODE_CACHE="filesystem",
+                   TEMPLATE_BYTECODE_CACHE_DIR=cache_dir,
+                   TEMPLATE_WARM_UP="1" if warm_up else "0")
+    output = subprocess.run([sys.executable, "-c", FIRST_REQUEST, page], cwd=ROOT,
+                            env=environ, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", default="/")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    import app as app_module
+    rows = compile_times(app_module.app)
+    print("{:<32}  {:>10}  {:>10}".format("template", "compile ms", "cached ms"))
+    for name, compiled, loaded in sorted(rows, key=lambda row: -row[1]):
+        print("{:<32}  {:>10.2f}  {:>10.2f}".format(name, compiled * 1000, loaded * 1000))
+    print("{:<32}  {:>10.2f}  {:>10.2f}\n".format(
+        "total", sum(row[1] for row in rows) * 1000, sum(row[2] for row in rows) * 1000))
+
+    results = {"cold": [], "bytecode": [], "warm": []}
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results["cold"].append(first_request(args.page, False, cache_dir))
+            results["bytecode"].append(first_request(args.page, False, cache_dir))
+            results["warm"].append(first_request(args.page, True, cache_dir))
+
+    print("{:<10}  {:>8}  {:>9}  {:>6}".format("start", "boot ms", "first ms", "status"))
+    for name, runs in results.items():
+        print("{:<10}  {:>8.1f}  {:>9.1f}  {:>6}".format(
+            name, statistics.median(run["boot"] for run in runs) * 1000,
+            statistics.median(run["first"] for run in runs) * 1000,
+            runs[-1]["status"]))
+
+
+if __name__ == "__main__":
+    main()
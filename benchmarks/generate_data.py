@@ -0,0 +1,230 @@
+"""Seeded synthetic catalogue for load tests.
+
+Fills the configured database (DATABASE_URL) with venues, artists and shows.
+Cities follow a Zipf-like popularity curve, genres are weighted towards the
+common ones, popular venues host more shows, and shows fill two-hour evening
+slots around the current date without double-booking anyone, so query plans
+and page sizes look like a real catalogue rather than a uniform grid. The
+same --seed always produces the same rows.
+
+    python benchmarks/generate_data.py --venues 10000 --artists 100000 --shows 5000000
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (city, state, relative popularity)
+CITIES = [
+    ("New York", "NY", 100), ("Los Angeles", "CA", 70), ("Chicago", "IL", 50),
+    ("San Francisco", "CA", 45), ("Austin", "TX", 40), ("Nashville", "TN", 38),
+    ("Seattle", "WA", 30), ("New Orleans", "LA", 28), ("Boston", "MA", 25),
+    ("Portland", "OR", 22), ("Denver", "CO", 20), ("Atlanta", "GA", 18),
+    ("Philadelphia", "PA", 16), ("Minneapolis", "MN", 12), ("Detroit", "MI", 10),
+    ("Memphis", "TN", 9), ("Miami", "FL", 9), ("Oakland", "CA", 8),
+    ("Brooklyn", "NY", 8), ("Kansas City", "MO", 6), ("Asheville", "NC", 4),
+    ("Boise", "ID", 3), ("Burlington", "VT", 2), ("Missoula", "MT", 1),
+]
+# (genre, relative popularity), the same names the forms offer.
+GENRES = [
+    ("Rock n Roll", 30), ("Pop", 25), ("Hip-Hop", 22), ("Alternative", 20),
+    ("Electronic", 18), ("Jazz", 15), ("R&B", 14), ("Country", 12),
+    ("Folk", 10), ("Punk", 9), ("Soul", 8), ("Blues", 8), ("Funk", 6),
+    ("Heavy Metal", 6), ("Reggae", 5), ("Classical", 4), ("Instrumental", 3),
+    ("Musical Theatre", 2), ("Other", 2),
+]
+VENUE_WORDS = ["Hall", "Club", "Room", "Lounge", "Theatre", "Ballroom",
+               "Tavern", "Cellar", "Garden", "Hop", "Stage", "Warehouse"]
+ARTIST_WORDS = ["Band", "Collective", "Trio", "Quartet", "Orchestra",
+                "Project", "Ensemble", "Brothers", "Sisters", "Kids"]
+
+BATCH_SIZE = 10000
+PAST_DAYS = 730
+FUTURE_DAYS = 180
+SLOT_HOURS = (18, 20, 22)
+SHOW_LENGTH = timedelta(hours=2)
+
+
+class Generator:
+    def __init__(self, seed=1, now=None):
+        self.rng = random.Random(seed)
+        self.now = now or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        self.city_weights = list(accumulate(weight for _, _, weight in CITIES))
+        self.genre_weights = list(accumulate(weight for _, weight in GENRES))
+
+    def word(self, length=6):
+        return "".join(self.rng.choice(string.ascii_lowercase)
+                       for _ in range(length)).capitalize()
+
+    def city(self):
+        city, state, _ = self.rng.choices(CITIES, cum_weights=self.city_weights)[0]
+        return city, state
+
+    def genres(self):
+        count = self.rng.choices([1, 2, 3, 4], weights=[35, 40, 20, 5])[0]
+        picked = set()
+        while len(picked) < count:
+            picked.add(self.rng.choices(GENRES, cum_weights=self.genre_weights)[0][0])
+        return sorted(picked)
+
+    def phone(self):
+        return "{:03d}-{:03d}-{:04d}".format(self.rng.randrange(200, 1000),
+                                             self.rng.randrange(1000),
+                                             self.rng.randrange(10000))
+
+    def venue(self):
+        city, state = self.city()
+        name = "The {} {}".format(self.word(), self.rng.choice(VENUE_WORDS))
+        return {
+            "name": name,
+            "city": city,
+            "state": state,
+            "address": "{} {} St".format(self.rng.randrange(1, 2000), self.word()),
+            "phone": self.phone(),
+            "genres": self.genres(),
+            "image_link": "https://picsum.photos/seed/{}/400".format(self.rng.randrange(10 ** 6)),
+            "facebook_link": None,
+            "website": None,
+            "seeking_talent": self.rng.random() < 0.3,
+            "seeking_description": None,
+            "created_at": self.now,
+            "updated_at": self.now,
+        }
+
+    def artist(self):
+        city, state = self.city()
+        name = "{} {}".format(self.word(self.rng.randrange(4, 9)),
+                              self.rng.choice(ARTIST_WORDS))
+        return {
+            "name": name,
+            "city": city,
+            "state": state,
+            "phone": self.phone(),
+            "genres": self.genres(),
+            "image_link": "https://picsum.photos/seed/{}/400".format(self.rng.randrange(10 ** 6)),
+            "facebook_link": None,
+            "website": None,
+            "seeking_venue": self.rng.random() < 0.2,
+            "seeking_description": None,
+            "created_at": self.now,
+            "updated_at": self.now,
+        }
+
+    def slots(self):
+        # Two-hour evening slots, two years back and six months ahead: a
+        # venue or artist holds at most one show per slot, so the rows
+        # never trip the double-booking constraints.
+        first = (self.now - timedelta(days=PAST_DAYS)).replace(hour=0)
+        return [first + timedelta(days=day, hours=hour)
+                for day in range(PAST_DAYS + FUTURE_DAYS) for hour in SLOT_HOURS]
+
+    def shows(self, venue_ids, artist_ids, count):
+        # Venue popularity is heavy tailed (a few venues host most shows),
+        # capped at one show per slot; artists are drawn uniformly, without
+        # repeats inside a slot.
+        slots = self.slots()
+        count = min(count, len(venue_ids) * len(slots))
+        weights = list(accumulate(self.rng.paretovariate(1.2) for _ in venue_ids))
+        counts = [0] * len(venue_ids)
+        for position in self.rng.choices(range(len(venue_ids)), cum_weights=weights, k=count):
+            counts[position] += 1
+        overflow = sum(max(n - len(slots), 0) for n in counts)
+        counts = [min(n, len(slots)) for n in counts]
+        while overflow:
+            position = self.rng.randrange(len(venue_ids))
+            if counts[position] < len(slots):
+                counts[position] += 1
+                overflow -= 1
+
+        booked = [[] for _ in slots]
+        for venue_id, n in zip(venue_ids, counts):
+            for slot in self.rng.sample(range(len(slots)), n):
+                booked[slot].append(venue_id)
+
+        for slot, venues in zip(slots, booked):
+            artists = self.rng.sample(artist_ids, min(len(venues), len(artist_ids)))
+            for venue_id, artist_id in zip(venues, artists):
+                yield {
+                    "venue_id": venue_id,
+                    "artist_id": artist_id,
+                    "start_time": slot,
+                    "end_time": slot + SHOW_LENGTH,
+                    "created_at": self.now,
+                    "updated_at": self.now,
+                }
+
+
+def insert(db, model, rows, total, label):
+    table = model.__table__
+    batch = []
+    inserted = 0
+    start = time.perf_counter()
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            inserted += len(batch)
+            batch = []
+            print("\r{}: {}/{} ({:.0f} rows/s)".format(
+                label, inserted, total, inserted / (time.perf_counter() - start)),
+                end="", file=sys.stderr)
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        inserted += len(batch)
+    print("\r{}: {} rows in {:.1f} s".format(label, inserted, time.perf_counter() - start),
+          file=sys.stderr)
+
+
+def generate(app_module, venues, artists, shows, seed=1):
+    """Insert the synthetic catalogue through the app's models."""
+    db = app_module.db
+    generator = Generator(seed)
+    insert(db, app_module.Venue, (generator.venue() for _ in range(venues)),
+           venues, "venues")
+    insert(db, app_module.Artist, (generator.artist() for _ in range(artists)),
+           artists, "artists")
+
+    venue_ids = [row_id for row_id, in db.session.query(app_module.Venue.id).order_by(
+        app_module.Venue.id)]
+    artist_ids = [row_id for row_id, in db.session.query(app_module.Artist.id).order_by(
+        app_module.Artist.id)]
+    insert(db, app_module.Show, generator.shows(venue_ids, artist_ids, shows),
+           shows, "shows")
+
+    now = app_module.current_time()
+    app_module.venue_stats.refresh(now=now)
+    app_module.artist_stats.refresh(now=now)
+    db.session.commit()
+
+    app_module.venue_search.reset()
+    app_module.artist_search.reset()
+    app_module.response_cache.invalidate("venues", "artists", "shows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--venues", type=int, default=10000)
+    parser.add_argument("--artists", type=int, default=100000)
+    parser.add_argument("--shows", type=int, default=5000000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--create-tables", action="store_true",
+                        help="create missing tables first (for scratch databases)")
+    args = parser.parse_args()
+
+    import app as app_module
+    with app_module.app.app_context():
+        if args.create_tables:
+            app_module.db.create_all()
+        generate(app_module, args.venues, args.artists, args.shows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, time
+from uuid import uuid4
+
+
+class LRUCache:
+    """In-process cache backend with per-entry TTL.
+
+    Entries are evicted least recently used first once either ``max_entries``
+    or ``max_bytes`` (measured on the stored strings) is exceeded.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 default_timeout=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_timeout = default_timeout
+        self.entries = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, _, value = entry
+            if expires is not None and expires <= monotonic():
+                self._pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        expires = monotonic() + timeout if timeout else None
+        size = len(value)
+        with self.lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (expires, size, value)
+            self.size += size
+            while (len(self.entries) > self.max_entries
+                   or self.size > self.max_bytes):
+                self._pop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+class NullCache:
+    """Stores nothing, so every page is rendered (for benchmarks and debugging)."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+
+class RedisCache:
+    """Shared cache backend for anything speaking the Redis get/set/delete API."""
+
+    def __init__(self, client, prefix="fyyur:", default_timeout=300):
+        self.client = client
+        self.prefix = prefix
+        self.default_timeout = default_timeout
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        self.client.set(self.prefix + key, value, ex=timeout or None)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+
+class LocalRedis:
+    """Minimal in-memory stand-in for a Redis client, for tests and dev."""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = Lock()
+
+    def get(self, name):
+        with self.lock:
+            value, expires = self.values.get(name, (None, None))
+            if expires is not None and expires <= monotonic():
+                del self.values[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        with self.lock:
+            self.values[name] = (value, monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *names):
+        with self.lock:
+            return sum(self.values.pop(name, None) is not None
+                       for name in names)
+
+
+class ResponseCache:
+    """Caches rendered pages under named groups that writes can invalidate.
+
+    Every name has a generation token stored alongside the entries. A page is
+    stored under ``name``, the token and a request variant (query string,
+    clock bucket), so invalidating a name only needs to drop its token: every
+    variant cached under the old token becomes unreachable and ages out.
+    Tokens carry the time they were issued, so a page read from data that
+    may predate the last invalidation (a lagging replica) can be kept out.
+    """
+
+    def __init__(self, backend=None, timeout=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.backend = make_cache_backend(app.config)
+        self.timeout = app.config.get("CACHE_DEFAULT_TIMEOUT", 300)
+
+    def generation(self, name):
+        key = "generation:" + name
+        token = self.backend.get(key)
+        if token is None:
+            token = "{:x}.{}".format(int(time()), uuid4().hex)
+            self.backend.set(key, token, timeout=0)
+        return token
+
+    def key(self, name, token, variant):
+        return "page:{}:{}:{}".format(name, token, variant)
+
+    def get(self, name, variant=""):
+        # The page (None on a miss) and the generation token it was looked
+        # up under, which `set` takes back.
+        token = self.generation(name)
+        value = self.backend.get(self.key(name, token, variant))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value, token
+
+    def set(self, name, value, token, variant="", min_age=0):
+        # Store only if `name` has not been invalidated since `token` was
+        # read: the page may have been rendered from data a write has
+        # changed since. With `min_age`, only if the token is at least that
+        # many seconds old.
+        if self.backend.get("generation:" + name) != token:
+            return
+        if min_age and token_age(token) < min_age:
+            return
+        self.backend.set(self.key(name, token, variant), value, timeout=self.timeout)
+
+    def invalidate(self, *names):
+        self.backend.delete(*("generation:" + name for name in names))
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": getattr(self.backend, "evictions", None)
+        }
+
+
+def token_age(token):
+    issued, _, _ = token.partition(".")
+    try:
+        return time() - int(issued, 16)
+    except ValueError:
+        return float("inf")
+
+
+def make_cache_backend(config):
+    backend = config.get("CACHE_BACKEND", "lru")
+    timeout = config.get("CACHE_DEFAULT_TIMEOUT", 300)
+    if backend == "lru":
+        return LRUCache(max_entries=config.get("CACHE_MAX_ENTRIES", 1024),
+                        max_bytes=config.get("CACHE_MAX_BYTES", 64 * 1024 * 1024),
+                        default_timeout=timeout)
+    if backend == "redis":
+        import redis
+        return RedisCache(redis.Redis.from_url(config["CACHE_REDIS_URL"]),
+                          default_timeout=timeout)
+    if backend == "local":
+        return RedisCache(LocalRedis(), default_timeout=timeout)
+    if backend == "null":
+        return NullCache()
+    raise ValueError("Unknown cache backend: {}".format(backend))
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+
+class Card:
+    """The fields a show tile renders for a venue or artist."""
+
+    __slots__ = ("id", "name", "image_link", "expires")
+
+    def __init__(self, id, name, image_link, expires):
+        self.id = id
+        self.name = name
+        self.image_link = image_link
+        self.expires = expires
+
+
+class CardCache:
+    """Process-local LRU of venue or artist cards keyed by id.
+
+    Lookups take a set of ids and load every miss with one ``IN (...)``
+    query, so show listings can select only foreign keys. Writes in this
+    process invalidate their cards directly; ``timeout`` bounds how long a
+    card edited by another worker can be served stale. A lookup that
+    overlaps an invalidation returns what it loaded but keeps none of it,
+    as it may have read the rows before the write.
+    """
+
+    def __init__(self, db, model, max_entries=10000, timeout=60):
+        self.db = db
+        self.model = model
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation; `fill` compares it with the value
+        # read before the rows were queried.
+        self.generation = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get("CARD_CACHE_MAX_ENTRIES", self.max_entries)
+        self.timeout = app.config.get("CARD_CACHE_TIMEOUT", self.timeout)
+        self.clear()
+
+    def cached(self, ids):
+        found = {}
+        missing = set()
+        now = monotonic()
+        with self.lock:
+            for card_id in ids:
+                card = self.entries.get(card_id)
+                if card is None or card.expires <= now:
+                    missing.add(card_id)
+                else:
+                    self.entries.move_to_end(card_id)
+                    found[card_id] = card
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def select(self, ids):
+        model = self.model
+        return self.db.select(model.id, model.name, model.image_link).where(
+            model.id.in_(sorted(ids)))
+
+    def fill(self, rows, generation=None):
+        expires = monotonic() + self.timeout
+        cards = {row[0]: Card(row[0], row[1], row[2], expires) for row in rows}
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return cards
+            for card_id, card in cards.items():
+                self.entries[card_id] = card
+                self.entries.move_to_end(card_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return cards
+
+    def get_many(self, ids):
+        generation = self.generation
+        found, missing = self.cached(ids)
+        if missing:
+            found.update(self.fill(self.db.session.execute(self.select(missing)),
+                                   generation))
+        return found
+
+    def get(self, card_id):
+        return self.get_many((card_id,)).get(card_id)
+
+    def invalidate(self, *ids):
+        with self.lock:
+            self.generation += 1
+            for card_id in ids:
+                self.entries.pop(card_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
@@ -0,0 +1,465 @@
+"""Helpers shared by the venue, artist and show blueprints.
+
+Holds the services the views write through (page cache, search, card
+caches, facet counts) and the replica router, which ``init_app`` creates
+for each app, plus the show queries, keyset paging, page caching and the
+conditional JSON responses of the API.
+"""
+import gzip
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from functools import wraps
+from itertools import islice
+
+from flask import Response, abort, current_app, g, has_app_context, jsonify, request, session
+from werkzeug.local import LocalProxy
+
+from cache import ResponseCache
+from cards import CardCache
+from facets import Facets
+from models import Artist, ArtistShowStats, Show, Venue, VenueShowStats, db
+from replicas import ReplicaRouter
+from search import Search
+from show_stats import ShowStats
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Services:
+    """One app's page cache, search, card caches, facets and replica router.
+
+    Kept in ``app.extensions["fyyur"]``, so apps built in the same process
+    (tests, a second config) never share caches, indexes or replicas.
+    """
+
+    def __init__(self):
+        self.response_cache = ResponseCache()
+        self.venue_search = Search(db, Venue)
+        self.artist_search = Search(db, Artist)
+        self.venue_cards = CardCache(db, Venue)
+        self.artist_cards = CardCache(db, Artist)
+        self.venue_facets = Facets(db, Venue)
+        self.artist_facets = Facets(db, Artist)
+        self.replica_router = ReplicaRouter(db)
+
+    def init_app(self, app):
+        for service in vars(self).values():
+            service.init_app(app)
+        app.extensions["fyyur"] = self
+
+
+def service(name):
+    # The current app's instance of a service.
+    return LocalProxy(lambda: getattr(current_app.extensions["fyyur"], name))
+
+
+response_cache = service("response_cache")
+venue_search = service("venue_search")
+artist_search = service("artist_search")
+venue_cards = service("venue_cards")
+artist_cards = service("artist_cards")
+venue_facets = service("venue_facets")
+artist_facets = service("artist_facets")
+replica_router = service("replica_router")
+# The stats only hold the tables they write, so one pair serves every app.
+venue_stats = ShowStats(db, VenueShowStats, Show.venue_id)
+artist_stats = ShowStats(db, ArtistShowStats, Show.artist_id)
+
+
+def init_app(app):
+    Services().init_app(app)
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def round_time(value, granularity):
+    seconds = int((value - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % granularity)
+
+
+def current_time():
+    # The clock every route filters on. It is read once per request and
+    # rounded down to CLOCK_GRANULARITY seconds, so all queries in a request
+    # (and anything cached against the value) agree on what "upcoming" means.
+    # Tests can swap the clock through app.config["CLOCK"].
+    if has_app_context() and "now" in g:
+        return g.now
+
+    now = round_time(current_app.config.get("CLOCK", datetime.utcnow)(),
+                     current_app.config.get("CLOCK_GRANULARITY", 60))
+    if has_app_context():
+        g.now = now
+    return now
+
+#==========================================================================#
+# QUERIES
+#==========================================================================#
+
+UPCOMING_SHOWS_LIMIT = 50
+PAST_SHOWS_PER_PAGE = 12
+
+
+# The *_select helpers build statements without running them, so the async
+# server (asgi.py) can execute the same queries on its own engine.
+
+
+def refresh_show_stats(venue_ids=(), artist_ids=()):
+    # Called in the same transaction as the show writes it accounts for.
+    now = current_time()
+    venue_stats.refresh(venue_ids, now)
+    artist_stats.refresh(artist_ids, now)
+
+
+def upcoming_shows_count(stats_model):
+    return db.func.coalesce(stats_model.upcoming_shows_count, 0)
+
+
+def show_counts(owner_key, owner_id):
+    return db.session.execute(show_counts_select(owner_key, owner_id)).one()
+
+
+def show_counts_select(owner_key, owner_id):
+    # Upcoming and past totals in a single pass over the owner's shows.
+    return db.select(
+        db.func.count(db.case((Show.start_time > current_time(), Show.id))),
+        db.func.count(db.case((Show.start_time <= current_time(), Show.id)))
+    ).where(owner_key == owner_id)
+
+
+def show_rows(owner_key, owner_id, other_key, upcoming, after=None):
+    return db.session.execute(show_rows_select(
+        owner_key, owner_id, other_key, upcoming, after)).all()
+
+
+def show_rows_select(owner_key, owner_id, other_key, upcoming, after=None):
+    # (start_time, show id, other side's id) rows bounded by the index on
+    # (owner_key, start_time): the next upcoming shows, or a page of past
+    # shows, most recent first, resuming after the `after` cursor. Past pages
+    # take one row more than they show (see past_show_page). Names and images
+    # come from the card caches.
+    query = db.select(Show.start_time, Show.id, other_key).where(owner_key == owner_id)
+
+    if upcoming:
+        return query.where(Show.start_time > current_time()).order_by(
+            Show.start_time, Show.id).limit(UPCOMING_SHOWS_LIMIT)
+
+    query = query.where(Show.start_time <= current_time())
+    if after is not None:
+        # The plain bound is the one the index range can use; the OR only
+        # breaks ties between shows starting at the same time.
+        query = query.where(Show.start_time <= after[0], db.or_(
+            Show.start_time < after[0], db.and_(
+                Show.start_time == after[0], Show.id < after[1])))
+    return query.order_by(Show.start_time.desc(), Show.id.desc()).limit(
+        PAST_SHOWS_PER_PAGE + 1)
+
+
+def past_show_page(rows):
+    # The past show rows to list, and the cursor of the page after them
+    # (None on the last page).
+    if len(rows) <= PAST_SHOWS_PER_PAGE:
+        return rows, None
+    rows = rows[:PAST_SHOWS_PER_PAGE]
+    return rows, encode_cursor(rows[-1])
+
+
+class KeysetPage:
+    # One page of `query` ordered by the (sort key, id) pair in `columns`,
+    # which must also be the first two columns selected. `rows` is a
+    # generator so streamed pages render while rows are still being fetched;
+    # the cursors are filled in as it is consumed, which is why templates
+    # read them after the loop.
+
+    # `prefetch`, if given, receives each chunk of rows before their items
+    # are built, so lookups can be batched.
+
+    def __init__(self, query, columns, item, per_page, after=None, before=None,
+                 prefetch=None):
+        self.columns = columns
+        self.item = item
+        self.prefetch = prefetch
+        self.per_page = per_page
+        self.prev_cursor = None
+        self.next_cursor = None
+        if before is not None:
+            self.rows = self.backward(query, before)
+        else:
+            self.rows = self.forward(query, after)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def forward(self, query, after):
+        key, row_id = self.columns
+        if after is not None:
+            query = query.filter(db.or_(key > after[0], db.and_(
+                key == after[0], row_id > after[1])))
+        rows = iter(query.order_by(key, row_id).limit(
+            self.per_page + 1).yield_per(500))
+
+        last = None
+        count = 0
+        for chunk in iter(lambda: list(islice(rows, 500)), []):
+            if self.prefetch:
+                self.prefetch(chunk[:self.per_page - count])
+            for row in chunk:
+                if count == self.per_page:
+                    self.next_cursor = encode_cursor(last)
+                    return
+                if count == 0 and after is not None:
+                    self.prev_cursor = encode_cursor(row)
+                last = row
+                count += 1
+                yield self.item(row) if self.item else row
+
+    def backward(self, query, before):
+        key, row_id = self.columns
+        rows = query.filter(db.or_(key < before[0], db.and_(
+            key == before[0], row_id < before[1]))).order_by(
+            key.desc(), row_id.desc()).limit(self.per_page + 1).all()
+
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            self.prev_cursor = encode_cursor(rows[-1])
+        rows.reverse()
+        if rows:
+            self.next_cursor = encode_cursor(rows[-1])
+        if self.prefetch:
+            self.prefetch(rows)
+        for row in rows:
+            yield self.item(row) if self.item else row
+
+
+def encode_cursor(row):
+    key = row[0].isoformat() if isinstance(row[0], datetime) else row[0]
+    value = json.dumps([key, row[1]])
+    return urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, parse, parse_id=int):
+    if not cursor:
+        return None
+    try:
+        value = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        key, row_id = json.loads(value)
+        return parse(key), parse_id(row_id)
+    except (TypeError, ValueError):
+        abort(400)
+
+def search_response(backend, model, stats, search, page, version=None):
+    results = backend.search(search, page=page, version=version)
+    return {
+        "count": results.count,
+        "data": search_results(model, stats, results.ids),
+        "page": results.page,
+        "pages": results.pages,
+        "has_prev": results.has_prev,
+        "has_next": results.has_next
+    }
+
+
+def search_results(model, stats, ids):
+    # Counts for just the page of matches, returned in the order the search
+    # backend ranked them.
+    if not ids:
+        return []
+
+    rows = db.session.query(
+        model.id, model.name, upcoming_shows_count(stats.model)
+    ).outerjoin(stats.model, stats.owner == model.id).filter(model.id.in_(ids))
+    found = {row[0]: row for row in rows}
+
+    return [{
+        "id": found[record_id][0],
+        "name": found[record_id][1],
+        "num_upcoming_shows": found[record_id][2]
+    } for record_id in ids if record_id in found]
+
+#==========================================================================#
+# CACHING
+#==========================================================================#
+
+
+def cached(name):
+    # Cache the rendered page under `name` (formatted with the view's URL
+    # arguments). The variant keys on the query string and the rounded request
+    # clock, so time-dependent pages roll over with the clock bucket. Pages
+    # carrying flashed messages are rendered fresh and never stored, and pages
+    # read from a replica only once the replica must have the last write.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if session.get("_flashes"):
+                return view(**kwargs)
+
+            key = name.format(**kwargs)
+            variant = "{}|{}".format(request.query_string.decode(),
+                                     current_time().isoformat())
+            body, token = response_cache.get(key, variant)
+            if body is None:
+                body = view(**kwargs)
+                if isinstance(body, str):
+                    response_cache.set(key, body, token, variant,
+                                       min_age=replica_router.staleness())
+            return body
+        # Marks the view as cached for benchmarks/bench_routes.py.
+        wrapper.cached_as = name
+        return wrapper
+    return decorator
+
+
+def invalidate_venue(venue_id):
+    # A venue's name and image appear on its own page, the directory, the
+    # show listing and the pages of every artist that played there.
+    venue_cards.invalidate(venue_id)
+    artist_ids = db.session.query(Show.artist_id).filter(
+        Show.venue_id == venue_id).distinct()
+    response_cache.invalidate(
+        "venues", "shows", "venue:{}".format(venue_id),
+        *("artist:{}".format(artist_id) for artist_id, in artist_ids))
+
+
+def invalidate_artist(artist_id):
+    artist_cards.invalidate(artist_id)
+    venue_ids = db.session.query(Show.venue_id).filter(
+        Show.artist_id == artist_id).distinct()
+    response_cache.invalidate(
+        "artists", "shows", "artist:{}".format(artist_id),
+        *("venue:{}".format(venue_id) for venue_id, in venue_ids))
+
+
+def invalidate_show(venue_id, artist_id):
+    response_cache.invalidate(
+        "venues", "shows", "venue:{}".format(venue_id),
+        "artist:{}".format(artist_id))
+
+#==========================================================================#
+# JSON API
+#==========================================================================#
+
+
+def catalogue_version():
+    # (ETag parts, Last-Modified) for responses that may include any row:
+    # row counts and newest updated_at per table, the latest show that has
+    # moved from upcoming to past, and the last show stats refresh (the
+    # upcoming counts listings read). All in one round trip. There is no
+    # Last-Modified: deleting a row changes a count but no updated_at, so a
+    # date alone would answer If-Modified-Since with a stale 304.
+    now = current_time()
+    row = db.session.query(
+        db.select(db.func.count(Venue.id)).scalar_subquery(),
+        db.select(db.func.max(Venue.updated_at)).scalar_subquery(),
+        db.select(db.func.count(Artist.id)).scalar_subquery(),
+        db.select(db.func.max(Artist.updated_at)).scalar_subquery(),
+        db.select(db.func.count(Show.id)).scalar_subquery(),
+        db.select(db.func.max(Show.updated_at)).scalar_subquery(),
+        db.select(db.func.max(Show.start_time)).where(
+            Show.start_time <= now).scalar_subquery(),
+        db.select(db.func.max(VenueShowStats.refreshed_at)).scalar_subquery(),
+        db.select(db.func.max(ArtistShowStats.refreshed_at)).scalar_subquery()
+    ).one()
+    return tuple(row), None
+
+
+def entity_version(record, show_key, other, other_key):
+    row = db.session.execute(entity_version_select(
+        record.id, show_key, other, other_key)).one()
+    return entity_validators(record.updated_at, row)
+
+
+def entity_version_select(record_id, show_key, other, other_key):
+    # A detail page shows the record, its shows and the name and image of
+    # the venue or artist on the other side of each show, and the record's
+    # show stats row is refreshed as its shows start.
+    now = current_time()
+    stats = STATS_MODELS[show_key.key]
+    refreshed_at = db.select(stats.refreshed_at).where(
+        list(stats.__table__.primary_key.columns)[0] == record_id)
+    return db.select(
+        db.func.count(Show.id), db.func.max(Show.updated_at),
+        db.func.max(other.updated_at),
+        db.func.max(db.case((Show.start_time <= now, Show.start_time))),
+        refreshed_at.scalar_subquery()
+    ).join(other, other.id == other_key).where(show_key == record_id)
+
+
+STATS_MODELS = {"venue_id": VenueShowStats, "artist_id": ArtistShowStats}
+
+
+def entity_validators(updated_at, row):
+    return ((updated_at,) + tuple(row),
+            latest(updated_at, row[1], row[2], row[3], row[4]))
+
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def conditional_json(build, validators, last_modified):
+    # The body is only built (and its queries run) when the client's cached
+    # copy is stale; otherwise the validators alone produce a 304. They
+    # already move when a show passes from upcoming to past, so the ETag
+    # holds across clock buckets.
+    etag = hashlib.sha1(repr((validators, request.full_path)).encode()).hexdigest()
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        since = request.if_modified_since.replace(tzinfo=None)
+        not_modified = last_modified.replace(microsecond=0) <= since
+    else:
+        not_modified = False
+
+    if not_modified:
+        response = Response(status=304)
+    else:
+        response = Response(json.dumps(build(), default=json_default),
+                            mimetype="application/json")
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return compress(response)
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def api_error(status):
+    return jsonify({"error": status}), status
+
+
+COMPRESS_MIN_SIZE = 500
+
+
+def compress(response):
+    response.vary.add("Accept-Encoding")
+    if response.status_code != 200:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encodings = request.accept_encodings
+    choices = [(encodings["gzip"], "gzip")]
+    if brotli is not None:
+        choices.append((encodings["br"], "br"))
+    quality, encoding = max(choices)
+    if not quality:
+        return response
+
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.content_encoding = encoding
+    return response
@@ -6,5 +6,148 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 # Enable debug mode.
 DEBUG = True
 
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_url(url):
+    # SQLAlchemy no longer accepts the "postgres://" scheme Heroku hands out.
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
 # Connect to the database
-SQLALCHEMY_DATABASE_URI = 'postgres://marcjaramillo@localhost:5432/fyyur'
+SQLALCHEMY_DATABASE_URI = database_url(os.environ.get(
+    'DATABASE_URL', 'postgresql://marcjaramillo@localhost:5432/fyyur'))
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Read replicas of that database, comma separated. Read-only views run their
+# queries on one of them, picked per request: "round_robin" in turn,
+# "least_loaded" by fewest requests in flight in this worker. A replica
+# more than REPLICA_MAX_LAG seconds behind (checked every
+# REPLICA_LAG_CHECK_INTERVAL seconds, with REPLICA_LAG_QUERY if set) is
+# skipped, and reads fall back to the primary when none is usable. After a
+# write, the client reads from the primary for as long as a replica may
+# still be missing it.
+REPLICA_URLS = [database_url(url.strip()) for url in
+                os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+REPLICA_BINDS = ['replica{}'.format(number)
+                 for number in range(1, len(REPLICA_URLS) + 1)]
+SQLALCHEMY_BINDS = dict(zip(REPLICA_BINDS, REPLICA_URLS))
+REPLICA_SELECTION = os.environ.get('REPLICA_SELECTION', 'round_robin')
+REPLICA_MAX_LAG = env_int('REPLICA_MAX_LAG', 5)
+REPLICA_LAG_CHECK_INTERVAL = env_int('REPLICA_LAG_CHECK_INTERVAL', 2)
+REPLICA_LAG_QUERY = os.environ.get('REPLICA_LAG_QUERY')
+
+# Connection pool, per worker process. Size it so that
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays under max_connections.
+DB_POOL_SIZE = env_int('DB_POOL_SIZE', 5)
+DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 5)
+DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 10)
+DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)
+DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+# Milliseconds; 0 disables the server-side statement timeout.
+DB_STATEMENT_TIMEOUT = env_int('DB_STATEMENT_TIMEOUT', 30000)
+# Running behind PgBouncer in transaction mode: never use prepared
+# statements and don't send startup options PgBouncer would reject (set the
+# statement timeout on the database role instead).
+DB_PGBOUNCER = env_bool('DB_PGBOUNCER')
+
+SQLALCHEMY_ENGINE_OPTIONS = {}
+if SQLALCHEMY_DATABASE_URI.startswith('postgresql'):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+        'connect_args': {},
+    }
+    connect_args = SQLALCHEMY_ENGINE_OPTIONS['connect_args']
+    if DB_PGBOUNCER:
+        if SQLALCHEMY_DATABASE_URI.startswith('postgresql+psycopg:'):
+            connect_args['prepare_threshold'] = None
+        elif SQLALCHEMY_DATABASE_URI.startswith('postgresql+asyncpg:'):
+            connect_args['statement_cache_size'] = 0
+    elif DB_STATEMENT_TIMEOUT:
+        connect_args['options'] = '-c statement_timeout={}'.format(
+            DB_STATEMENT_TIMEOUT)
+
+# Async driver for the read endpoints served by asgi.py; the Flask app keeps
+# using the sync driver for everything else.
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+dialect = SQLALCHEMY_DATABASE_URI.split('://')[0].split('+')[0]
+ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+if not ASYNC_DATABASE_URI and dialect in ASYNC_DRIVERS:
+    ASYNC_DATABASE_URI = '{}+{}://{}'.format(
+        dialect, ASYNC_DRIVERS[dialect], SQLALCHEMY_DATABASE_URI.split('://', 1)[1])
+# Statements one async request runs at once, each on its own pooled
+# connection. With the default pool (5 + 5 overflow) and 2 per request, five
+# detail requests run concurrently before the rest wait for a connection.
+ASYNC_QUERY_PARALLELISM = env_int('ASYNC_QUERY_PARALLELISM', 2)
+ASYNC_ENGINE_OPTIONS = {}
+if (ASYNC_DATABASE_URI or '').startswith('postgresql+asyncpg'):
+    ASYNC_ENGINE_OPTIONS = dict(SQLALCHEMY_ENGINE_OPTIONS, connect_args={})
+    if DB_PGBOUNCER:
+        ASYNC_ENGINE_OPTIONS['connect_args']['statement_cache_size'] = 0
+    elif DB_STATEMENT_TIMEOUT:
+        ASYNC_ENGINE_OPTIONS['connect_args']['server_settings'] = {
+            'statement_timeout': str(DB_STATEMENT_TIMEOUT)}
+
+# Venue/artist search backend: "trigram" uses the pg_trgm indexes in Postgres,
+# "index" keeps an in-process n-gram index (for SQLite and other databases).
+SEARCH_BACKEND = os.environ.get(
+    'SEARCH_BACKEND',
+    'trigram' if SQLALCHEMY_DATABASE_URI.startswith('postgresql') else 'index')
+# Seconds between the "index" backend's reads of the rows other workers
+# have changed.
+SEARCH_REFRESH_INTERVAL = 10
+
+# Seconds the request clock is rounded down to when deciding whether a show is
+# upcoming or past.
+CLOCK_GRANULARITY = 60
+
+# Page cache: "lru" keeps pages in each worker, "redis" shares them through
+# CACHE_REDIS_URL, "local" runs the shared code path against an in-memory
+# fake (useful in tests) and "null" caches nothing.
+CACHE_BACKEND = 'lru'
+CACHE_DEFAULT_TIMEOUT = 300
+CACHE_MAX_ENTRIES = 1024
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+# Per-process caches of the venue and artist names and images that show
+# listings render; CARD_CACHE_TIMEOUT bounds how stale a card edited in
+# another worker can get.
+CARD_CACHE_MAX_ENTRIES = 10000
+CARD_CACHE_TIMEOUT = 60
+
+# Genre/state/city facet counts come from a bitmap index in each worker;
+# every FACET_REFRESH_INTERVAL seconds it reads in the venues and artists
+# other workers have changed since.
+FACET_REFRESH_INTERVAL = 10
+
+# Compiled templates: "filesystem" caches bytecode in
+# TEMPLATE_BYTECODE_CACHE_DIR (Jinja's per-user temp directory if unset),
+# "redis" in CACHE_REDIS_URL, "" disables it. TEMPLATE_WARM_UP loads every
+# template at startup so no request pays for compiling one.
+TEMPLATE_BYTECODE_CACHE = os.environ.get('TEMPLATE_BYTECODE_CACHE', 'filesystem')
+TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')
+TEMPLATE_WARM_UP = env_bool('TEMPLATE_WARM_UP', True)
+
+# Count the queries each request runs and report them in a Server-Timing
+# header; requests repeating one statement QUERY_REPEAT_THRESHOLD times or
+# more are logged as likely N+1 queries.
+QUERY_INSTRUMENTATION = env_bool('QUERY_INSTRUMENTATION', True)
+QUERY_REPEAT_THRESHOLD = env_int('QUERY_REPEAT_THRESHOLD', 3)
+QUERY_SLOW_LIMIT = 5
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+# Rows fetched per round trip from the server-side cursor.
+FETCH_SIZE = 1000
+# Rows per block in the columnar format.
+ROW_GROUP_SIZE = 10000
+
+
+def export_rows(db, model, since=None):
+    """Stream a table's rows as tuples, in id order.
+
+    With ``since`` only rows whose ``updated_at`` is later are returned,
+    ordered by ``(updated_at, id)`` so an export can be resumed from the
+    last timestamp it saw.
+    """
+    table = model.__table__
+    columns = list(table.columns)
+    query = db.session.query(*columns)
+    if since is not None:
+        if "updated_at" not in table.columns:
+            raise ValueError("{} has no updated_at column".format(table.name))
+        query = query.filter(table.c.updated_at > since).order_by(
+            table.c.updated_at, table.c.id)
+    else:
+        query = query.order_by(table.c.id)
+
+    rows = query.execution_options(stream_results=True).yield_per(FETCH_SIZE)
+    return [column.name for column in columns], (tuple(row) for row in rows)
+
+
+def plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        # Arrays use the same separator the importer reads back.
+        writer.writerow([";".join(value) if isinstance(value, list) else plain(value)
+                         for value in row])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_jsonl(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, map(plain, row)))) + "\n"
+
+
+def write_columnar(columns, rows):
+    # One JSON line per row group holding a value array per column: column
+    # names are written once per group rather than once per row, and the
+    # output can be consumed (or appended to) a group at a time.
+    def group(chunk):
+        return json.dumps({
+            "columns": columns,
+            "rows": len(chunk),
+            "data": [[plain(row[i]) for row in chunk]
+                     for i in range(len(columns))]
+        }) + "\n"
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == ROW_GROUP_SIZE:
+            yield group(chunk)
+            chunk = []
+    if chunk:
+        yield group(chunk)
+
+
+FORMATS = {
+    "csv": (write_csv, "text/csv"),
+    "jsonl": (write_jsonl, "application/x-ndjson"),
+    "columnar": (write_columnar, "application/x-ndjson"),
+}
+
+
+def export(db, model, format, since=None):
+    writer, _ = FORMATS[format]
+    columns, rows = export_rows(db, model, since)
+    return writer(columns, rows)
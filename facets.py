@@ -0,0 +1,259 @@
+from threading import Lock
+
+import sqlalchemy as sa
+
+from table_index import TableIndex
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(value):
+        return bin(value).count("1")
+
+
+def bitmap(positions, size):
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+
+class FacetFilters:
+    """The genres (all required), state and city a listing is narrowed to."""
+
+    MAX_GENRES = 10
+
+    def __init__(self, genres=(), state=None, city=None):
+        self.genres = tuple(sorted(set(genres)))[:self.MAX_GENRES]
+        self.state = state or None
+        # A city is only meaningful within its state.
+        self.city = (city or None) if self.state else None
+
+    @classmethod
+    def from_args(cls, args):
+        return cls([genre for genre in args.getlist("genre") if genre],
+                   args.get("state", "").strip(), args.get("city", "").strip())
+
+    def __bool__(self):
+        return bool(self.genres or self.state)
+
+    def apply(self, query, model):
+        if self.genres:
+            query = query.filter(contains_genres(query.session, model.genres,
+                                                 self.genres))
+        if self.state:
+            query = query.filter(model.state == self.state)
+        if self.city:
+            query = query.filter(model.city == self.city)
+        return query
+
+    def args(self, **changes):
+        # Query arguments for a link to these filters with `changes` applied.
+        values = {"genre": list(self.genres), "state": self.state, "city": self.city}
+        values.update(changes)
+        if values["state"] != self.state:
+            values["city"] = changes.get("city")
+        return {name: value for name, value in values.items() if value}
+
+    def toggle(self, genre):
+        genres = set(self.genres) ^ {genre}
+        return self.args(genre=sorted(genres))
+
+
+def contains_genres(session, column, genres):
+    # `column @> genres` on Postgres. SQLite keeps the genres as a JSON list,
+    # so each genre is looked up among the list's elements instead.
+    if session.get_bind().dialect.name != "sqlite":
+        return column.contains(list(genres))
+    elements = sa.func.json_each(column).table_valued("value")
+    return sa.and_(*(sa.exists().where(elements.c.value == genre)
+                     for genre in genres))
+
+
+class FacetIndex:
+    """In-memory bitmap index of genres, states and cities.
+
+    Every document gets a bit position. Each genre and state has a bitmap
+    (a Python int) of the positions carrying it, so narrowing to any mix of
+    genres and a state is a few ANDs and each count a popcount. Loading
+    lays the positions out by state and city, which makes every city a
+    contiguous range of bits instead of one more bitmap. Documents added
+    later take new positions at the end, listed per city, until there are
+    enough of them to lay the index out again.
+    """
+
+    # Added documents that trigger a new layout: this many, or a quarter of
+    # the documents laid out, whichever is more.
+    RELAYOUT_MIN = 1000
+
+    def __init__(self):
+        self.lock = Lock()
+        self.clear()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def clear(self):
+        self.positions = {}
+        self.documents = []
+        self.laid_out = 0
+        self.everything = 0
+        self.genres = {}
+        self.states = {}
+        self.ranges = {}
+        self.added = {}
+
+    def load(self, rows):
+        # (id, genres, state, city) rows.
+        with self.lock:
+            self._load([(doc_id, tuple(sorted(set(genres or ()))), state, city)
+                        for doc_id, genres, state, city in rows])
+
+    def _load(self, documents):
+        self.clear()
+        documents.sort(key=lambda document: (document[2] or "", document[3] or ""))
+        genres, states = {}, {}
+        for position, (doc_id, doc_genres, state, city) in enumerate(documents):
+            self.positions[doc_id] = position
+            for genre in doc_genres:
+                genres.setdefault(genre, []).append(position)
+            states.setdefault(state, []).append(position)
+            cities = self.ranges.setdefault(state, {})
+            cities[city] = (cities.get(city, (position,))[0], position + 1)
+        # Bitmaps are built once from the position lists rather than by
+        # OR-ing in one bit at a time.
+        size = self.laid_out = len(documents)
+        self.documents = documents
+        self.everything = (1 << size) - 1
+        self.genres = {genre: bitmap(positions, size)
+                       for genre, positions in genres.items()}
+        self.states = {state: bitmap(positions, size)
+                       for state, positions in states.items()}
+
+    def add(self, doc_id, genres, state, city):
+        genres = tuple(sorted(set(genres or ())))
+        with self.lock:
+            if doc_id in self.positions and self.documents[
+                    self.positions[doc_id]] == (doc_id, genres, state, city):
+                return
+            self._discard(doc_id)
+            position = len(self.documents)
+            self.positions[doc_id] = position
+            self.documents.append((doc_id, genres, state, city))
+            bit = 1 << position
+            self.everything |= bit
+            for genre in genres:
+                self.genres[genre] = self.genres.get(genre, 0) | bit
+            self.states[state] = self.states.get(state, 0) | bit
+            self.added.setdefault(state, {}).setdefault(city, set()).add(position)
+            if position - self.laid_out >= max(self.RELAYOUT_MIN, self.laid_out // 4):
+                self._load([document for document in self.documents if document])
+
+    def remove(self, doc_id):
+        with self.lock:
+            self._discard(doc_id)
+
+    def _discard(self, doc_id):
+        # The position is left empty; a laid out city keeps its range.
+        position = self.positions.pop(doc_id, None)
+        if position is None:
+            return
+        _, genres, state, city = self.documents[position]
+        self.documents[position] = None
+        bit = ~(1 << position)
+        self.everything &= bit
+        for genre in genres:
+            self.genres[genre] &= bit
+        self.states[state] &= bit
+        if position >= self.laid_out:
+            self.added[state][city].discard(position)
+
+    def city_bitmap(self, state, city):
+        start, stop = self.ranges.get(state, {}).get(city, (0, 0))
+        bits = ((1 << (stop - start)) - 1) << start
+        added = self.added.get(state, {}).get(city)
+        if added:
+            bits |= bitmap(added, len(self.documents))
+        return bits
+
+    def counts(self, filters):
+        """Matches and per-option counts for `filters`.
+
+        Each option is counted against the other facets' filters: a genre
+        by how many matches would also have it, a state or city by how
+        many of the genre matches are there.
+        """
+        with self.lock:
+            by_genre = self.everything
+            for genre in filters.genres:
+                by_genre &= self.genres.get(genre, 0)
+            matches = by_genre
+
+            cities = []
+            if filters.state:
+                matches &= self.states.get(filters.state, 0)
+                names = set(self.ranges.get(filters.state, ()))
+                names.update(self.added.get(filters.state, ()))
+                cities = [(city, popcount(matches & self.city_bitmap(filters.state, city)))
+                          for city in names]
+                if filters.city:
+                    matches &= self.city_bitmap(filters.state, filters.city)
+
+            return {
+                "count": popcount(matches),
+                "genres": options(((genre, popcount(matches & bits))
+                                   for genre, bits in self.genres.items()),
+                                  filters.genres),
+                "states": options(((state, popcount(by_genre & bits))
+                                   for state, bits in self.states.items()),
+                                  (filters.state,)),
+                "cities": options(cities, (filters.city,)),
+            }
+
+
+def options(counts, selected=()):
+    # Options with no matches are left out, unless selected, so a filter
+    # can always be taken off again.
+    return sorted(((name, count) for name, count in counts
+                   if name and (count or name in selected)),
+                  key=lambda option: option[0])
+
+
+class Facets(TableIndex):
+    """Genre, state and city facet counts for `model`, per worker.
+
+    A FacetIndex that TableIndex keeps in step with the table, reading back
+    other workers' changes every FACET_REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self, db, model):
+        super().__init__(db, model)
+        self.index = FacetIndex()
+
+    def init_app(self, app):
+        self.refresh_interval = app.config.get("FACET_REFRESH_INTERVAL",
+                                               self.refresh_interval)
+        self.reset()
+
+    def columns(self):
+        model = self.model
+        return model.id, model.genres, model.state, model.city
+
+    def fill(self, rows):
+        self.index.load(rows)
+
+    def add(self, row):
+        self.index.add(*row)
+
+    def discard(self, record_id):
+        self.index.remove(record_id)
+
+    def clear(self):
+        self.index = FacetIndex()
+
+    def size(self):
+        return len(self.index)
+
+    def counts(self, filters, version=None):
+        self.refresh(version)
+        return self.index.counts(filters)
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# Babel and dateutil are imported on first use: they are slow to import and
+# only the pages that render dates need them.
+
+# Named formats used by the templates, as Babel patterns.
+DATETIME_FORMATS = {
+    "full": "EEEE, MMMM d, y 'at' h:mma",
+    "medium": "EE, MM dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def compiled_pattern(format, locale):
+    # Babel parses the pattern and resolves the locale on every
+    # format_datetime call; do both once per (format, locale).
+    import babel.dates
+    return babel.dates.parse_pattern(format), babel.Locale.parse(locale)
+
+
+@lru_cache(maxsize=8192)
+def format_cached(value, format, locale):
+    if format in ("short", "long"):
+        import babel.dates
+        return babel.dates.format_datetime(value, format, locale=locale)
+    pattern, parsed_locale = compiled_pattern(format, locale)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return pattern.apply(value, parsed_locale)
+
+
+def format_datetime(value, format="medium", locale=None):
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    if locale is None:
+        import babel.dates
+        locale = babel.dates.LC_TIME
+    return format_cached(value, DATETIME_FORMATS.get(format, format), locale)
@@ -1,21 +1,29 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, AnyOf, URL, NumberRange, Optional
+
+from scheduling import MAX_DURATION, START_TIME_FORMATS
 
 
 class ShowForm(Form):
-    artist_id = StringField(
-        'artist_id'
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired()]
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[DataRequired()]
     )
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
+        format=list(START_TIME_FORMATS),
         default=datetime.today()
     )
+    # Minutes; shows without one are booked for the default length.
+    duration = IntegerField(
+        'duration', validators=[
+            Optional(), NumberRange(min=1, max=MAX_DURATION // timedelta(minutes=1))]
+    )
 
 
 class VenueForm(Form):
@@ -0,0 +1,275 @@
+import csv
+import json
+import os
+
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+
+# Separators accepted between genres in a CSV cell.
+GENRE_SEPARATORS = (";", "|")
+
+
+def read_csv(stream):
+    reader = csv.DictReader(stream)
+    for record in reader:
+        genres = record.get("genres")
+        if genres is not None:
+            for separator in GENRE_SEPARATORS:
+                genres = genres.replace(separator, ",")
+            record["genres"] = [genre.strip() for genre in genres.split(",")
+                                if genre.strip()]
+        # DictReader's line_num counts physical lines, header included.
+        yield reader.line_num, record
+
+
+def read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, record
+
+
+READERS = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+}
+
+
+def read_records(stream, format):
+    try:
+        reader = READERS[format]
+    except KeyError:
+        raise ValueError("Unknown import format: {}".format(format))
+    return reader(stream)
+
+
+def format_from_filename(filename, default="jsonl"):
+    extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    if extension == "json":
+        return "jsonl"
+    return extension if extension in READERS else default
+
+
+class Checkpoint:
+    """Last committed line of an import, persisted so a rerun can resume."""
+
+    def __init__(self, path=None, line=0):
+        self.path = path
+        self.line = line
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.line = json.load(f).get("line", 0)
+
+    def save(self, line, **summary):
+        self.line = line
+        if self.path:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(dict(summary, line=line), f)
+            os.replace(tmp, self.path)
+
+
+class ImportResult:
+    def __init__(self, max_errors=1000, on_error=None):
+        self.inserted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+        self.line = 0
+        self.max_errors = max_errors
+        self.on_error = on_error
+
+    def report(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "errors": errors})
+        if self.on_error is not None:
+            self.on_error(line, errors)
+
+    def to_dict(self):
+        return {
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "line": self.line,
+            "errors": self.errors
+        }
+
+
+class Importer:
+    """Validates records with a model's WTForms form and bulk inserts them.
+
+    Rows that pass validation are buffered and written ``batch_size`` at a
+    time with a single executemany INSERT and commit; after each commit the
+    checkpoint records the last line handled. Rows that fail are reported
+    with their line number and form errors and never abort the import.
+    ``references`` maps foreign key columns to the models they point at so
+    dangling ids are reported per row instead of failing a whole batch. A
+    batch the database rejects (a constraint another writer's rows now
+    violate) is retried row by row, and only the rows it still rejects
+    are reported.
+    """
+
+    def __init__(self, db, model, form_class, references=None,
+                 batch_size=1000, max_errors=1000):
+        self.db = db
+        self.model = model
+        self.form_class = form_class
+        self.references = references or {}
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.columns = {column.name: column for column in model.__table__.columns
+                        if not column.primary_key}
+
+    def validate(self, record):
+        if not isinstance(record, dict):
+            return None, {"record": [str(record) if isinstance(record, Exception)
+                                     else "Expected an object."]}
+
+        formdata = MultiDict()
+        for key, value in record.items():
+            if isinstance(value, list):
+                formdata.setlist(key, [str(item) for item in value])
+            elif isinstance(value, bool):
+                formdata[key] = "y" if value else ""
+            elif value is not None:
+                formdata[key] = str(value)
+
+        form = self.form_class(formdata=formdata, meta={"csrf": False})
+        form.validate()
+
+        errors = {}
+        for field in form:
+            if field.name not in self.columns:
+                continue
+            column = self.columns[field.name]
+            blank = not formdata.get(field.name, "").strip()
+            if blank and column.nullable:
+                continue
+            if field.name not in formdata and not column.nullable:
+                errors[field.name] = ["This field is required."]
+            elif field.errors:
+                errors[field.name] = list(field.errors)
+        if errors:
+            return None, errors
+
+        row = {name: form[name].data for name in self.columns if name in form}
+        for name in self.references:
+            try:
+                row[name] = int(row[name])
+            except (TypeError, ValueError):
+                errors[name] = ["Not a valid id."]
+        return (None, errors) if errors else (row, None)
+
+    def missing_references(self, rows):
+        missing = {}
+        for name, model in self.references.items():
+            ids = {row[name] for _, row in rows}
+            found = {row_id for row_id, in self.db.session.query(model.id).filter(
+                model.id.in_(ids))}
+            missing[name] = ids - found
+        return missing
+
+    def check(self, batch, result):
+        if not self.references:
+            return batch
+        missing = self.missing_references(batch)
+        rows = []
+        for line, row in batch:
+            errors = {name: ["No such id: {}.".format(row[name])]
+                      for name, ids in missing.items() if row[name] in ids}
+            if errors:
+                result.report(line, errors)
+            else:
+                rows.append((line, row))
+        return rows
+
+    def insert(self, rows, result):
+        session, insert = self.db.session, self.model.__table__.insert()
+        try:
+            session.execute(insert, [row for _, row in rows])
+            return rows
+        except IntegrityError:
+            session.rollback()
+
+        inserted = []
+        for line, row in rows:
+            try:
+                with session.begin_nested():
+                    session.execute(insert, [row])
+            except IntegrityError as e:
+                result.report(line, self.rejected(e))
+            else:
+                inserted.append((line, row))
+        return inserted
+
+    def rejected(self, error):
+        return {"record": [str(error.orig).splitlines()[0]]}
+
+    def flush(self, batch, result, checkpoint, on_insert=None):
+        rows = self.check(batch, result)
+        if rows:
+            rows = self.insert(rows, result)
+        self.db.session.commit()
+        result.inserted += len(rows)
+        if rows and on_insert is not None:
+            on_insert([row for _, row in rows])
+        # Every line up to here is now either committed or reported.
+        if result.line > checkpoint.line:
+            checkpoint.save(result.line, inserted=result.inserted,
+                            failed=result.failed)
+
+    def run(self, records, checkpoint=None, on_error=None, on_insert=None):
+        checkpoint = checkpoint or Checkpoint()
+        result = ImportResult(self.max_errors, on_error)
+        result.line = checkpoint.line
+        batch = []
+        try:
+            for line, record in records:
+                if line <= checkpoint.line:
+                    result.skipped += 1
+                    continue
+                result.line = line
+                row, errors = self.validate(record)
+                if errors:
+                    result.report(line, errors)
+                    continue
+                batch.append((line, row))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch, result, checkpoint, on_insert)
+                    batch = []
+            self.flush(batch, result, checkpoint, on_insert)
+        except Exception:
+            self.db.session.rollback()
+            raise
+        return result
+
+
+class ShowImporter(Importer):
+    """Imports shows through a scheduling.Scheduler.
+
+    Rows are validated by the scheduler, and each batch is booked against
+    the stored shows and the batch's earlier rows, so a double booking is
+    reported on its line rather than inserted (or, where the database's
+    exclusion constraints catch it, failing the whole batch).
+    """
+
+    def __init__(self, db, scheduler, batch_size=1000, max_errors=1000):
+        super().__init__(db, scheduler.show, None, batch_size=batch_size,
+                         max_errors=max_errors)
+        self.scheduler = scheduler
+
+    def validate(self, record):
+        return self.scheduler.validate(record)
+
+    def check(self, batch, result):
+        return self.scheduler.book(
+            batch, lambda line, errors, conflict=False: result.report(line, errors))
+
+    def rejected(self, error):
+        return {"show": ["A venue or artist was booked by another request."]}
@@ -0,0 +1,150 @@
+import heapq
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Collectors currently recording. Nested collectors all see every query, so
+# a test-level budget still counts the queries of the requests it makes.
+active_collectors = ContextVar("active_collectors", default=())
+
+
+class QueryStats:
+    """Queries executed while this collector was active."""
+
+    def __init__(self, slow_limit=5):
+        self.count = 0
+        self.total_time = 0.0
+        self.slow_limit = slow_limit
+        self.slowest = []
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+        item = (duration, statement)
+        if len(self.slowest) < self.slow_limit:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+    def slowest_statements(self):
+        return sorted(self.slowest, reverse=True)
+
+    def repeated(self, threshold=3):
+        # The same SQL text run again and again in one request is the
+        # signature of a lazy load inside a loop.
+        return [(statement, count) for statement, count
+                in self.statements.most_common() if count >= threshold]
+
+    def report(self, threshold=3):
+        lines = ["{} queries in {:.1f} ms".format(self.count, self.total_time * 1000)]
+        for statement, count in self.repeated(threshold):
+            lines.append("  repeated x{}: {}".format(count, " ".join(statement.split())))
+        return "\n".join(lines)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if active_collectors.get():
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = active_collectors.get()
+    if not collectors or not conn.info.get("query_start"):
+        return
+    duration = perf_counter() - conn.info["query_start"].pop()
+    for collector in collectors:
+        collector.record(statement, duration)
+
+
+@contextmanager
+def count_queries(slow_limit=5):
+    stats = QueryStats(slow_limit)
+    token = active_collectors.set(active_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        active_collectors.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(limit):
+    """Fail if the block runs more than ``limit`` queries.
+
+        with query_budget(4):
+            client.get("/venues/1")
+    """
+    with count_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        raise QueryBudgetExceeded("Query budget of {} exceeded: {}".format(
+            limit, stats.report()))
+
+
+def init_app(app):
+    """Record queries per request and report them in a Server-Timing header.
+
+    Requests that repeat a statement QUERY_REPEAT_THRESHOLD times or more
+    are logged as N+1 candidates along with their slowest statements.
+    """
+    threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 3)
+    slow_limit = app.config.get("QUERY_SLOW_LIMIT", 5)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats(slow_limit)
+        g.query_stats_token = active_collectors.set(
+            active_collectors.get() + (g.query_stats,))
+        g.request_start = perf_counter()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+        elapsed = perf_counter() - g.request_start
+        response.headers.add("Server-Timing", 'db;dur={:.2f};desc="{} queries"'.format(
+            stats.total_time * 1000, stats.count))
+        response.headers.add("Server-Timing", "app;dur={:.2f}".format(elapsed * 1000))
+
+        if stats.repeated(threshold):
+            slowest = "\n".join("  {:.1f} ms: {}".format(duration * 1000, " ".join(statement.split()))
+                                for duration, statement in stats.slowest_statements())
+            app.logger.warning("Possible N+1 in %s %s: %s\nslowest:\n%s",
+                               request.method, request.path, stats.report(threshold), slowest)
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exception=None):
+        token = g.pop("query_stats_token", None)
+        if token is not None:
+            active_collectors.reset(token)
+
+
+# Only offer the fixture when running under pytest; importing pytest here
+# would add its import time to every worker.
+pytest = sys.modules.get("pytest")
+
+if pytest is not None:
+    @pytest.fixture
+    def query_budget_fixture():
+        """Enable with ``pytest_plugins = ["instrumentation"]``, then::
+
+            def test_venue_page(client, query_budget_fixture):
+                with query_budget_fixture(4):
+                    client.get("/venues/1")
+        """
+        return query_budget
@@ -0,0 +1,120 @@
+import os
+from threading import Lock
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class PoolStats:
+    """Connection pool counters for this worker process."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds, overflow, timed_out=False):
+        with self.lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if overflow:
+                self.overflow_checkouts += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+pool_stats = PoolStats()
+
+# A preloaded master's counts mean nothing to the workers forked from it.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pool_stats.reset)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            pool_stats.record_wait(perf_counter() - start, False, timed_out=True)
+            raise
+        pool_stats.record_wait(perf_counter() - start, self.overflow() > 0)
+        return connection
+
+
+@event.listens_for(Pool, "checkout")
+def on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.increment("checkouts")
+
+
+@event.listens_for(Pool, "checkin")
+def on_checkin(dbapi_connection, connection_record):
+    pool_stats.increment("checkins")
+
+
+@event.listens_for(Pool, "connect")
+def on_connect(dbapi_connection, connection_record):
+    pool_stats.increment("connects")
+
+
+@event.listens_for(Pool, "invalidate")
+def on_invalidate(dbapi_connection, connection_record, exception):
+    pool_stats.increment("invalidations")
+
+
+def render_metrics(pool=None, extra=None):
+    """Prometheus text exposition of the pool counters for this worker."""
+    labels = '{{pid="{}"}}'.format(os.getpid())
+    metrics = [
+        ("fyyur_db_pool_checkouts_total", "counter",
+         "Connections checked out of the pool.", pool_stats.checkouts),
+        ("fyyur_db_pool_checkins_total", "counter",
+         "Connections returned to the pool.", pool_stats.checkins),
+        ("fyyur_db_pool_connects_total", "counter",
+         "New database connections opened.", pool_stats.connects),
+        ("fyyur_db_pool_invalidations_total", "counter",
+         "Connections discarded as broken.", pool_stats.invalidations),
+        ("fyyur_db_pool_overflow_checkouts_total", "counter",
+         "Checkouts served while the pool was over its base size.",
+         pool_stats.overflow_checkouts),
+        ("fyyur_db_pool_timeouts_total", "counter",
+         "Checkouts that gave up waiting for a connection.", pool_stats.timeouts),
+        ("fyyur_db_pool_wait_seconds_total", "counter",
+         "Time spent waiting for a connection.", pool_stats.wait_seconds),
+        ("fyyur_db_pool_wait_seconds_max", "gauge",
+         "Longest single wait for a connection.", pool_stats.max_wait_seconds),
+    ]
+    if isinstance(pool, QueuePool):
+        metrics += [
+            ("fyyur_db_pool_size", "gauge", "Configured pool size.", pool.size()),
+            ("fyyur_db_pool_checked_out", "gauge",
+             "Connections currently checked out.", pool.checkedout()),
+            ("fyyur_db_pool_overflow", "gauge",
+             "Connections currently open beyond the pool size.",
+             max(pool.overflow(), 0)),
+        ]
+    metrics += extra or []
+
+    lines = []
+    for name, kind, help_text, value in metrics:
+        lines.append("# HELP {} {}".format(name, help_text))
+        lines.append("# TYPE {} {}".format(name, kind))
+        lines.append("{}{} {}".format(name, labels, value))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,47 @@
+"""add trigram search indexes
+
+Revision ID: 8c41d2a7f3b9
+Revises: 6ea9c1edffee
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d2a7f3b9'
+down_revision = '6ea9c1edffee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # array_to_string is only STABLE, so wrap it to make genres indexable.
+    op.execute(
+        "CREATE OR REPLACE FUNCTION fyyur_genres_text(varchar[]) "
+        "RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE AS "
+        "$$ SELECT array_to_string($1, ' ') $$"
+    )
+    for table in ('venues', 'artists'):
+        for column in ('name', 'city', 'state'):
+            op.create_index(
+                'ix_{}_{}_trgm'.format(table, column), table, [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'}
+            )
+        op.create_index(
+            'ix_{}_genres_trgm'.format(table), table,
+            [sa.text('fyyur_genres_text(genres) gin_trgm_ops')],
+            postgresql_using='gin'
+        )
+
+
+def downgrade():
+    for table in ('venues', 'artists'):
+        op.drop_index('ix_{}_genres_trgm'.format(table), table_name=table)
+        for column in ('name', 'city', 'state'):
+            op.drop_index('ix_{}_{}_trgm'.format(table, column),
+                          table_name=table)
+    op.execute('DROP FUNCTION IF EXISTS fyyur_genres_text(varchar[])')
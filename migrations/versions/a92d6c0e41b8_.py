@@ -0,0 +1,50 @@
+"""add show end times and forbid overlapping bookings
+
+Revision ID: a92d6c0e41b8
+Revises: f3a81c5d29e4
+Create Date: 2026-10-17 14:41:09.274415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a92d6c0e41b8'
+down_revision = 'f3a81c5d29e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('shows', sa.Column('end_time', sa.DateTime(), nullable=True))
+    # Existing shows get the default two hours, cut short where the venue or
+    # artist already has a later show, so legacy data satisfies the
+    # constraints below (same-time duplicates become empty ranges).
+    op.execute(
+        "UPDATE shows SET end_time = LEAST(shows.start_time + interval '2 hours', "
+        "next.venue_next, next.artist_next) FROM ("
+        "SELECT id, "
+        "lead(start_time) OVER (PARTITION BY venue_id ORDER BY start_time, id) "
+        "AS venue_next, "
+        "lead(start_time) OVER (PARTITION BY artist_id ORDER BY start_time, id) "
+        "AS artist_next FROM shows) AS next WHERE next.id = shows.id"
+    )
+    op.alter_column('shows', 'end_time', nullable=False)
+    op.create_check_constraint('ck_shows_end_after_start', 'shows',
+                               'end_time >= start_time')
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for owner in ('venue', 'artist'):
+        op.execute(
+            'ALTER TABLE shows ADD CONSTRAINT ex_shows_{0}_overlap EXCLUDE '
+            'USING gist ({0}_id WITH =, tsrange(start_time, end_time) WITH &&)'
+            .format(owner)
+        )
+
+
+def downgrade():
+    for owner in ('venue', 'artist'):
+        op.drop_constraint('ex_shows_{}_overlap'.format(owner), 'shows')
+    op.drop_constraint('ck_shows_end_after_start', 'shows', type_='check')
+    op.drop_column('shows', 'end_time')
@@ -0,0 +1,40 @@
+"""add show, location and genre indexes
+
+Revision ID: b7e2f94c1a06
+Revises: 8c41d2a7f3b9
+Create Date: 2026-10-17 10:03:51.902417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2f94c1a06'
+down_revision = '8c41d2a7f3b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_venue_id_start_time', 'shows',
+                    ['venue_id', 'start_time'])
+    op.create_index('ix_shows_artist_id_start_time', 'shows',
+                    ['artist_id', 'start_time'])
+    op.create_index('ix_shows_start_time', 'shows', ['start_time'])
+    op.create_index('ix_venues_city_state', 'venues', ['city', 'state'])
+    op.create_index('ix_artists_city_state', 'artists', ['city', 'state'])
+    op.create_index('ix_venues_genres', 'venues', ['genres'],
+                    postgresql_using='gin')
+    op.create_index('ix_artists_genres', 'artists', ['genres'],
+                    postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_artists_genres', table_name='artists')
+    op.drop_index('ix_venues_genres', table_name='venues')
+    op.drop_index('ix_artists_city_state', table_name='artists')
+    op.drop_index('ix_venues_city_state', table_name='venues')
+    op.drop_index('ix_shows_start_time', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
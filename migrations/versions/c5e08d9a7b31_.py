@@ -0,0 +1,25 @@
+"""index the case-insensitive artist listing order
+
+Revision ID: c5e08d9a7b31
+Revises: a92d6c0e41b8
+Create Date: 2026-10-17 18:12:40.518326
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e08d9a7b31'
+down_revision = 'a92d6c0e41b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_artists_lower_name_id', 'artists',
+                    [sa.text('lower(name)'), 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_artists_lower_name_id', table_name='artists')
@@ -0,0 +1,57 @@
+"""maintain updated_at on venues, artists and shows
+
+Revision ID: d41f6e83b2c7
+Revises: b7e2f94c1a06
+Create Date: 2026-10-17 11:20:16.557093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41f6e83b2c7'
+down_revision = 'b7e2f94c1a06'
+branch_labels = None
+depends_on = None
+
+UTC_NOW = "timezone('utc', now())"
+
+
+def upgrade():
+    op.add_column('shows', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('shows', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute(
+        'UPDATE shows SET created_at = {0}, updated_at = {0}'.format(UTC_NOW))
+    for column in ('created_at', 'updated_at'):
+        op.alter_column('shows', column, nullable=False)
+
+    # Writes that bypass the ORM (bulk loads, manual fixes) still get
+    # timestamps, and every UPDATE bumps updated_at.
+    for table in ('venues', 'artists', 'shows'):
+        for column in ('created_at', 'updated_at'):
+            op.alter_column(table, column, server_default=sa.text(UTC_NOW))
+        op.create_index('ix_{}_updated_at'.format(table), table, ['updated_at'])
+
+    op.execute(
+        "CREATE OR REPLACE FUNCTION fyyur_touch_updated_at() RETURNS trigger "
+        "LANGUAGE plpgsql AS $$ BEGIN "
+        "NEW.updated_at = {}; RETURN NEW; END $$".format(UTC_NOW)
+    )
+    for table in ('venues', 'artists', 'shows'):
+        op.execute(
+            'CREATE TRIGGER {0}_touch_updated_at BEFORE UPDATE ON {0} '
+            'FOR EACH ROW EXECUTE PROCEDURE fyyur_touch_updated_at()'.format(table)
+        )
+
+
+def downgrade():
+    for table in ('venues', 'artists', 'shows'):
+        op.execute('DROP TRIGGER IF EXISTS {0}_touch_updated_at ON {0}'.format(table))
+    op.execute('DROP FUNCTION IF EXISTS fyyur_touch_updated_at()')
+    for table in ('venues', 'artists', 'shows'):
+        op.drop_index('ix_{}_updated_at'.format(table), table_name=table)
+        for column in ('created_at', 'updated_at'):
+            op.alter_column(table, column, server_default=None)
+    op.drop_column('shows', 'updated_at')
+    op.drop_column('shows', 'created_at')
@@ -0,0 +1,34 @@
+"""record deletes for the change feed
+
+Revision ID: e6b14c2f9d57
+Revises: c5e08d9a7b31
+Create Date: 2026-10-17 19:03:27.840192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b14c2f9d57'
+down_revision = 'c5e08d9a7b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_deletions_deleted_at_kind_record_id', 'deletions',
+                    ['deleted_at', 'kind', 'record_id'])
+
+
+def downgrade():
+    op.drop_index('ix_deletions_deleted_at_kind_record_id', table_name='deletions')
+    op.drop_table('deletions')
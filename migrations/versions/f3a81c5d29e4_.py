@@ -0,0 +1,54 @@
+"""add venue and artist show stats tables
+
+Revision ID: f3a81c5d29e4
+Revises: d41f6e83b2c7
+Create Date: 2026-10-17 13:05:42.318806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a81c5d29e4'
+down_revision = 'd41f6e83b2c7'
+branch_labels = None
+depends_on = None
+
+UTC_NOW = "timezone('utc', now())"
+OWNERS = (('venue_show_stats', 'venue_id', 'venues'),
+          ('artist_show_stats', 'artist_id', 'artists'))
+
+
+def upgrade():
+    for table, owner, parent in OWNERS:
+        op.create_table(
+            table,
+            sa.Column(owner, sa.Integer(), nullable=False),
+            sa.Column('upcoming_shows_count', sa.Integer(), nullable=False),
+            sa.Column('past_shows_count', sa.Integer(), nullable=False),
+            sa.Column('next_show_time', sa.DateTime(), nullable=True),
+            sa.Column('last_show_time', sa.DateTime(), nullable=True),
+            sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint([owner], ['{}.id'.format(parent)],
+                                    ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint(owner)
+        )
+        op.create_index('ix_{}_next_show_time'.format(table), table,
+                        ['next_show_time'])
+        op.execute(
+            'INSERT INTO {table} ({owner}, upcoming_shows_count, '
+            'past_shows_count, next_show_time, last_show_time, refreshed_at) '
+            'SELECT {owner}, '
+            'count(CASE WHEN start_time > {now} THEN id END), '
+            'count(CASE WHEN start_time <= {now} THEN id END), '
+            'min(CASE WHEN start_time > {now} THEN start_time END), '
+            'max(CASE WHEN start_time <= {now} THEN start_time END), '
+            '{now} FROM shows GROUP BY {owner}'.format(
+                table=table, owner=owner, now=UTC_NOW))
+
+
+def downgrade():
+    for table, _, _ in OWNERS:
+        op.drop_index('ix_{}_next_show_time'.format(table), table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+def trigram_indexes(table, genres):
+    # The pg_trgm indexes TrigramSearchBackend searches through, as created
+    # by migration 8c41d2a7f3b9. Postgres only: SQLite has neither GIN nor
+    # fyyur_genres_text().
+    indexes = [db.Index("ix_{}_{}_trgm".format(table, column), column,
+                        postgresql_using="gin",
+                        postgresql_ops={column: "gin_trgm_ops"})
+               for column in ("name", "city", "state")]
+    indexes.append(db.Index("ix_{}_genres_trgm".format(table),
+                            db.func.fyyur_genres_text(genres).label("genres_text"),
+                            postgresql_using="gin",
+                            postgresql_ops={"genres_text": "gin_trgm_ops"}))
+    return tuple(index.ddl_if(dialect="postgresql") for index in indexes)
+
+
+class Venue(db.Model):
+    __tablename__ = "venues"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    address = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    # A JSON list on SQLite, which has no arrays, for local runs and tests.
+    genres = db.Column(db.ARRAY(db.String(120)).with_variant(db.JSON, "sqlite"),
+                       nullable=False)
+    website = db.Column(db.String(120))
+    seeking_talent = db.Column(db.Boolean)
+    seeking_description = db.Column(db.String())
+    created_at = db.Column(
+        db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, server_onupdate=db.FetchedValue(),
+        nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index("ix_venues_city_state", "city", "state"),
+        db.Index("ix_venues_genres", "genres", postgresql_using="gin"),
+    ) + trigram_indexes("venues", genres)
+
+
+class Artist(db.Model):
+    __tablename__ = "artists"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(120), nullable=False)
+    genres = db.Column(db.ARRAY(db.String(120)).with_variant(db.JSON, "sqlite"),
+                       nullable=False)
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String(120))
+    seeking_venue = db.Column(db.Boolean)
+    seeking_description = db.Column(db.String())
+    created_at = db.Column(
+        db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, server_onupdate=db.FetchedValue(),
+        nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index("ix_artists_city_state", "city", "state"),
+        db.Index("ix_artists_genres", "genres", postgresql_using="gin"),
+        db.Index("ix_artists_lower_name_id", db.func.lower(name), "id"),
+    ) + trigram_indexes("artists", genres)
+
+
+SHOW_DURATION = timedelta(hours=2)
+
+
+def default_end_time(context):
+    return context.get_current_parameters()["start_time"] + SHOW_DURATION
+
+
+class Show(db.Model):
+    __tablename__ = "shows"
+    id = db.Column(db.Integer, primary_key=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        "venues.id"), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        "artists.id"), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    # Bookings are [start_time, end_time); Postgres enforces that a venue or
+    # artist never has two overlapping bookings (see the migration).
+    end_time = db.Column(db.DateTime, nullable=False, default=default_end_time)
+    created_at = db.Column(
+        db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, server_onupdate=db.FetchedValue(),
+        nullable=False, index=True)
+    # Listings select the foreign keys and take names and images from the
+    # card caches, so loading a show never joins its venue and artist.
+    venue = db.relationship("Venue", backref="shows")
+    artist = db.relationship("Artist", backref="shows")
+
+    __table_args__ = (
+        db.Index("ix_shows_venue_id_start_time", "venue_id", "start_time"),
+        db.Index("ix_shows_artist_id_start_time", "artist_id", "start_time"),
+        db.Index("ix_shows_start_time", "start_time"),
+    )
+
+
+class VenueShowStats(db.Model):
+    __tablename__ = "venue_show_stats"
+
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        "venues.id", ondelete="CASCADE"), primary_key=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime, index=True)
+    last_show_time = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+
+class ArtistShowStats(db.Model):
+    __tablename__ = "artist_show_stats"
+
+    artist_id = db.Column(db.Integer, db.ForeignKey(
+        "artists.id", ondelete="CASCADE"), primary_key=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_time = db.Column(db.DateTime, index=True)
+    last_show_time = db.Column(db.DateTime)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+
+class Deletion(db.Model):
+    # Tombstones for the change feed: one row per deleted venue, artist or
+    # show, written in the transaction that deletes it.
+    __tablename__ = "deletions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_deletions_deleted_at_kind_record_id",
+                 "deleted_at", "kind", "record_id"),
+    )
+
+
+def record_deletion(kind):
+    def after_delete(mapper, connection, target):
+        connection.execute(Deletion.__table__.insert().values(
+            kind=kind, record_id=target.id, deleted_at=datetime.utcnow()))
+    return after_delete
+
+
+# Postgres bumps updated_at with the fyyur_touch_updated_at trigger (see
+# migration d41f6e83b2c7) and the ORM re-reads it after an UPDATE; this is
+# the same trigger for SQLite schemas made by create_all.
+TOUCH_UPDATED_AT = db.DDL(
+    "CREATE TRIGGER %(table)s_touch_updated_at AFTER UPDATE ON %(table)s "
+    "FOR EACH ROW BEGIN UPDATE %(table)s SET updated_at = "
+    "strftime('%%Y-%%m-%%d %%H:%%M:%%f000', 'now') WHERE id = NEW.id; END")
+
+for kind, model in (("venue", Venue), ("artist", Artist), ("show", Show)):
+    event.listen(model, "after_delete", record_deletion(kind))
+    event.listen(model.__table__, "after_create",
+                 TOUCH_UPDATED_AT.execute_if(dialect="sqlite"))
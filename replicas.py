@@ -0,0 +1,167 @@
+"""Routing of read-only requests to database replicas.
+
+Replicas are ordinary Flask-SQLAlchemy binds listed in REPLICA_BINDS. Views
+decorated with ``read_replica`` run their queries on one replica, picked
+once per request; everything else, and every flush or DML statement, uses
+the primary. A replica found more than REPLICA_MAX_LAG seconds behind the
+primary is skipped until its next check, and a client that has just
+written is kept on the primary for as long as a replica may still be
+missing the write.
+"""
+from collections import Counter
+from functools import wraps
+from itertools import count
+from threading import Lock
+from time import monotonic, time
+
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+
+# Seconds the replica is behind, 0 when it has replayed everything it has
+# received (an idle primary would otherwise look like growing lag).
+LAG_QUERIES = {
+    "postgresql": """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery()
+                OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM
+                now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """,
+}
+
+SELECTIONS = ("round_robin", "least_loaded")
+
+# Session key holding the time until which the client reads from the primary.
+PRIMARY_UNTIL = "_primary_until"
+
+
+def read_replica(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    wrapper.read_replica = True
+    return wrapper
+
+
+class RoutingSession(Session):
+    """db.session: reads in ``read_replica`` views go to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, sa.UpdateBase):
+                g.db_wrote = True
+            elif g.get("db_read_only"):
+                router = current_app.extensions.get("replicas")
+                engine = router.engine() if router else None
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Picks the replica for each read-only request in this worker.
+
+    "round_robin" takes the usable replicas in turn; "least_loaded" the one
+    with the fewest requests in flight, in turn among equals.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.names = []
+        self.lock = Lock()
+        self.turn = count()
+        self.in_flight = {}
+        self.lags = {}
+        self.reads = Counter()
+        self.pinned = 0
+        self.fallbacks = 0
+
+    def init_app(self, app):
+        self.names = list(app.config.get("REPLICA_BINDS", []))
+        self.selection = app.config.get("REPLICA_SELECTION", "round_robin")
+        if self.selection not in SELECTIONS:
+            raise ValueError("Unknown replica selection: {}".format(self.selection))
+        self.max_lag = app.config.get("REPLICA_MAX_LAG", 5)
+        self.check_interval = app.config.get("REPLICA_LAG_CHECK_INTERVAL", 2)
+        self.lag_query = app.config.get("REPLICA_LAG_QUERY")
+        self.in_flight = dict.fromkeys(self.names, 0)
+        self.lags.clear()
+        app.extensions["replicas"] = self
+        app.after_request(self.pin_writers)
+        app.teardown_request(self.release)
+
+    @property
+    def window(self):
+        # How far behind the primary a replica in use can be: the tolerated
+        # lag plus the time until a replica falling further behind is checked.
+        return self.max_lag + self.check_interval
+
+    def engine(self):
+        if "db_replica" not in g:
+            g.db_replica = self.choose()
+        if g.db_replica is None:
+            return None
+        return self.db.engines[g.db_replica]
+
+    def choose(self):
+        if not self.names:
+            return None
+        if session.get(PRIMARY_UNTIL, 0) > time():
+            self.pinned += 1
+            return None
+        usable = [name for name in self.names if self.usable(name)]
+        if not usable:
+            self.fallbacks += 1
+            return None
+
+        with self.lock:
+            start = next(self.turn) % len(usable)
+            usable = usable[start:] + usable[:start]
+            if self.selection == "least_loaded":
+                name = min(usable, key=self.in_flight.get)
+            else:
+                name = usable[0]
+            self.in_flight[name] += 1
+            self.reads[name] += 1
+        return name
+
+    def usable(self, name):
+        checked_at, lag = self.lags.get(name, (None, None))
+        if checked_at is None or monotonic() - checked_at >= self.check_interval:
+            lag = self.measure_lag(name)
+            self.lags[name] = (monotonic(), lag)
+        return lag is not None and lag <= self.max_lag
+
+    def measure_lag(self, name):
+        # None when the replica can't be reached. Databases with no way of
+        # reporting lag (SQLite copies) count as caught up unless
+        # REPLICA_LAG_QUERY says otherwise.
+        engine = self.db.engines[name]
+        query = self.lag_query or LAG_QUERIES.get(engine.dialect.name, "SELECT 0")
+        try:
+            with engine.connect() as connection:
+                return float(connection.execute(sa.text(query)).scalar() or 0)
+        except sa.exc.SQLAlchemyError as error:
+            current_app.logger.warning("Replica %s unavailable: %s", name, error)
+            return None
+
+    def pin_writers(self, response):
+        # Read-your-writes: the redirect after an edit, and whatever the
+        # client opens next, read from the primary until every replica in
+        # use has the write.
+        if self.names and g.get("db_wrote"):
+            session[PRIMARY_UNTIL] = time() + self.window
+        return response
+
+    def release(self, exception=None):
+        name = g.pop("db_replica", None)
+        if name is not None:
+            with self.lock:
+                self.in_flight[name] -= 1
+
+    def staleness(self):
+        # How old the data read in this request may be.
+        return self.window if g.get("db_replica") else 0
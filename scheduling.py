@@ -0,0 +1,239 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+# Longest booking a show may have; bounds how far back an overlapping show
+# can start, so existing bookings are found with an index range scan.
+MAX_DURATION = timedelta(hours=24)
+START_TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S",
+                      "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M")
+
+
+class IntervalIndex:
+    """Bookings on one timeline (a venue or an artist) as disjoint blocks.
+
+    Blocks are half-open [start, end) and kept sorted by start, so the
+    bookings overlapping a new interval are found with one binary search
+    plus a step per block that actually overlaps. Overlapping bookings
+    (legacy rows) are merged into one block that keeps all their labels.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.labels = []
+
+    def first_after(self, start):
+        # Position of the first block that ends after `start`.
+        position = bisect_right(self.starts, start) - 1
+        if position < 0 or self.ends[position] <= start:
+            position += 1
+        return position
+
+    def overlapping(self, start, end):
+        if start >= end:
+            return []
+        first = self.first_after(start)
+        found = []
+        last = first
+        while last < len(self.starts) and self.starts[last] < end:
+            found.extend(self.labels[last])
+            last += 1
+        return found
+
+    def add(self, start, end, label):
+        if start >= end:
+            return
+        first = self.first_after(start)
+        last = first
+        labels = []
+        while last < len(self.starts) and self.starts[last] < end:
+            start = min(start, self.starts[last])
+            end = max(end, self.ends[last])
+            labels.extend(self.labels[last])
+            last += 1
+        labels.append(label)
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+        self.labels[first:last] = [labels]
+
+
+def parse_start_time(value):
+    for format in START_TIME_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+
+def parse_field(item, name, parse, message, errors, required=True):
+    value = item.get(name)
+    value = "" if value is None else str(value).strip()
+    if not value:
+        if required:
+            errors[name] = ["This field is required."]
+        return None
+    try:
+        return parse(value)
+    except ValueError:
+        errors[name] = [message]
+        return None
+
+
+class ScheduleResult:
+    def __init__(self):
+        self.inserted = 0
+        self.conflicts = 0
+        self.errors = []
+        self.rows = []
+
+    def report(self, index, errors, conflict=False):
+        self.conflicts += conflict
+        self.errors.append({"index": index, "errors": errors})
+
+    def to_dict(self):
+        return {
+            "inserted": self.inserted,
+            "conflicts": self.conflicts,
+            "errors": self.errors
+        }
+
+
+class Scheduler:
+    """Validates a batch of shows and inserts it only if nothing clashes.
+
+    Items are checked field by field as ShowForm would, and their venue and
+    artist must exist. Items are then booked one by one against per-venue
+    and per-artist interval indexes, loaded with the existing shows in the
+    batch's time window, so an item is rejected if it overlaps a stored
+    show or an earlier item of the same batch. Any error rejects the whole
+    batch; otherwise every show is inserted with one executemany INSERT and
+    left for the caller to commit. ``book`` runs the same checks for
+    callers (such as the show importer) that keep the items that pass.
+    """
+
+    def __init__(self, db, show_model, venue_model, artist_model,
+                 default_duration=timedelta(hours=2)):
+        self.db = db
+        self.show = show_model
+        self.venue = venue_model
+        self.artist = artist_model
+        self.default_duration = default_duration
+
+    def validate(self, item):
+        # ShowForm's checks without building a form per item, which
+        # dominated the time taken by large batches.
+        if not isinstance(item, dict):
+            return None, {"show": [str(item) if isinstance(item, Exception)
+                                   else "Expected an object."]}
+        errors = {}
+        venue_id = parse_field(item, "venue_id", int, "Not a valid integer value.",
+                               errors)
+        artist_id = parse_field(item, "artist_id", int, "Not a valid integer value.",
+                                errors)
+        start_time = parse_field(item, "start_time", parse_start_time,
+                                 "Not a valid datetime value.", errors)
+        duration = parse_field(item, "duration", int, "Not a valid integer value.",
+                               errors, required=False)
+        longest = MAX_DURATION // timedelta(minutes=1)
+        if duration is not None and not 1 <= duration <= longest:
+            errors["duration"] = ["Number must be between 1 and {}.".format(longest)]
+        if errors:
+            return None, errors
+        duration = timedelta(minutes=duration) if duration else self.default_duration
+        return {
+            "venue_id": venue_id,
+            "artist_id": artist_id,
+            "start_time": start_time,
+            "end_time": start_time + duration
+        }, None
+
+    def missing(self, model, ids):
+        found = {row_id for row_id, in self.db.session.query(model.id).filter(
+            model.id.in_(ids))}
+        return ids - found
+
+    def load(self, rows):
+        # Existing shows for the batch's venues and artists that could
+        # overlap any item, one index per venue and per artist.
+        venue_ids = {row["venue_id"] for _, row in rows}
+        artist_ids = {row["artist_id"] for _, row in rows}
+        window_start = min(row["start_time"] for _, row in rows)
+        window_end = max(row["end_time"] for _, row in rows)
+
+        show = self.show
+        venues = {venue_id: IntervalIndex() for venue_id in venue_ids}
+        artists = {artist_id: IntervalIndex() for artist_id in artist_ids}
+        existing = self.db.session.query(
+            show.id, show.venue_id, show.artist_id, show.start_time, show.end_time
+        ).filter(
+            self.db.or_(show.venue_id.in_(venue_ids), show.artist_id.in_(artist_ids)),
+            show.start_time > window_start - MAX_DURATION,
+            show.start_time < window_end,
+            show.end_time > window_start)
+        for show_id, venue_id, artist_id, start, end in existing:
+            label = "show {}".format(show_id)
+            if venue_id in venues:
+                venues[venue_id].add(start, end, label)
+            if artist_id in artists:
+                artists[artist_id].add(start, end, label)
+        return venues, artists
+
+    def check(self, rows, report):
+        venues, artists = self.load(rows)
+        booked = []
+        for index, row in rows:
+            start, end = row["start_time"], row["end_time"]
+            errors = {}
+            for name, indexes, kind in (("venue_id", venues, "Venue"),
+                                        ("artist_id", artists, "Artist")):
+                clashes = indexes[row[name]].overlapping(start, end)
+                if clashes:
+                    errors[name] = ["{} {} is already booked by {}.".format(
+                        kind, row[name], ", ".join(clashes))]
+            if errors:
+                report(index, errors, conflict=True)
+                continue
+            label = "item {}".format(index)
+            venues[row["venue_id"]].add(start, end, label)
+            artists[row["artist_id"]].add(start, end, label)
+            booked.append((index, row))
+        return booked
+
+    def book(self, rows, report):
+        # The (index, row) pairs from validate that name an existing venue
+        # and artist and clash with nothing; the rest go to `report`.
+        if not rows:
+            return []
+        missing = {name: self.missing(model, {row[name] for _, row in rows})
+                   for name, model in (("venue_id", self.venue),
+                                       ("artist_id", self.artist))}
+        known = []
+        for index, row in rows:
+            errors = {name: ["No such id: {}.".format(row[name])]
+                      for name, ids in missing.items() if row[name] in ids}
+            if errors:
+                report(index, errors)
+            else:
+                known.append((index, row))
+        return self.check(known, report) if known else []
+
+    def run(self, items):
+        result = ScheduleResult()
+        rows = []
+        for index, item in enumerate(items):
+            row, errors = self.validate(item)
+            if errors:
+                result.report(index, errors)
+            else:
+                rows.append((index, row))
+        self.book(rows, result.report)
+
+        if result.errors or not rows:
+            result.errors.sort(key=lambda error: error["index"])
+            return result
+
+        result.rows = [row for _, row in rows]
+        self.db.session.execute(self.show.__table__.insert(), result.rows)
+        result.inserted = len(result.rows)
+        return result
@@ -0,0 +1,252 @@
+from threading import Lock
+
+from table_index import TableIndex
+
+# Fields covered by venue and artist search, with the weight a match in each
+# field contributes to the result's rank.
+SEARCH_FIELDS = (("name", 4.0), ("city", 2.0), ("state", 2.0), ("genres", 1.0))
+
+
+def ngrams(text, n=3):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def field_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(value).lower()
+    return str(value).lower()
+
+
+def match_score(term, text, weight):
+    position = text.find(term)
+    if position < 0:
+        return 0.0
+    score = weight
+    if position == 0:
+        score += weight / 2
+    if len(term) == len(text):
+        score += weight
+    return score
+
+
+class NgramIndex:
+    """In-memory inverted trigram index over the searchable fields.
+
+    Substring queries are answered by intersecting the posting lists of the
+    term's trigrams and verifying the survivors, so lookups only touch rows
+    that can match instead of scanning the whole table.
+    """
+
+    def __init__(self, fields=SEARCH_FIELDS):
+        self.fields = fields
+        self.documents = {}
+        self.postings = {}
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id, **values):
+        with self.lock:
+            self._discard(doc_id)
+            texts = tuple(field_text(values.get(field))
+                          for field, _ in self.fields)
+            self.documents[doc_id] = texts
+            for gram in set().union(*(ngrams(text) for text in texts)):
+                self.postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        with self.lock:
+            self._discard(doc_id)
+
+    def clear(self):
+        with self.lock:
+            self.documents.clear()
+            self.postings.clear()
+
+    def _discard(self, doc_id):
+        texts = self.documents.pop(doc_id, None)
+        if texts is None:
+            return
+        for gram in set().union(*(ngrams(text) for text in texts)):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self.postings[gram]
+
+    def candidates(self, term):
+        grams = ngrams(term)
+        if not grams:
+            # Terms shorter than a trigram can't use the postings.
+            return list(self.documents)
+        postings = sorted((self.postings.get(gram, ()) for gram in grams),
+                          key=len)
+        if not postings[0]:
+            return []
+        return set(postings[0]).intersection(*postings[1:])
+
+    def search(self, term):
+        term = term.strip().lower()
+        with self.lock:
+            if not term:
+                ranked = [(0.0, doc_id) for doc_id in self.documents]
+            else:
+                ranked = []
+                for doc_id in self.candidates(term):
+                    texts = self.documents[doc_id]
+                    score = sum(match_score(term, text, weight)
+                                for text, (_, weight) in zip(texts, self.fields))
+                    if score:
+                        ranked.append((score, doc_id))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return [doc_id for _, doc_id in ranked]
+
+
+class SearchPage:
+    def __init__(self, ids, count, page, per_page):
+        self.ids = ids
+        self.count = count
+        self.page = page
+        self.per_page = per_page
+
+    @property
+    def pages(self):
+        return max(1, -(-self.count // self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+
+class IndexSearchBackend(TableIndex):
+    """Search backend for databases without trigram support (e.g. SQLite).
+
+    Keeps an NgramIndex of the searchable fields in each worker; see
+    TableIndex for how it follows the table.
+    """
+
+    def __init__(self, db, model, refresh_interval=10):
+        super().__init__(db, model, refresh_interval)
+        self.index = NgramIndex()
+
+    def columns(self):
+        return [self.model.id] + [getattr(self.model, field)
+                                  for field, _ in SEARCH_FIELDS]
+
+    def fill(self, rows):
+        self.index.clear()
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        self.index.add(row[0], **dict(zip(
+            (field for field, _ in SEARCH_FIELDS), row[1:])))
+
+    def discard(self, record_id):
+        self.index.remove(record_id)
+
+    def clear(self):
+        self.index.clear()
+
+    def size(self):
+        return len(self.index)
+
+    def search(self, term, page=1, per_page=20, version=None):
+        self.refresh(version)
+        ids = self.index.search(term)
+        start = (page - 1) * per_page
+        return SearchPage(ids[start:start + per_page], len(ids), page, per_page)
+
+
+class TrigramSearchBackend:
+    """Search backend for Postgres backed by the pg_trgm GIN indexes.
+
+    ``ILIKE '%term%'`` keeps the original substring semantics and is served by
+    the trigram indexes; rows are ranked by trigram similarity.
+    """
+
+    def __init__(self, db, model):
+        self.db = db
+        self.model = model
+
+    def update(self, record):
+        pass
+
+    def remove(self, record_id):
+        pass
+
+    def reset(self):
+        pass
+
+    def expressions(self):
+        func = self.db.func
+        for field, weight in SEARCH_FIELDS:
+            column = getattr(self.model, field)
+            if field == "genres":
+                column = func.fyyur_genres_text(column)
+            yield column, weight
+
+    def search(self, term, page=1, per_page=20, version=None):
+        term = term.strip()
+        func = self.db.func
+        pattern = "%{}%".format(
+            term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_"))
+        expressions = list(self.expressions())
+        condition = self.db.or_(*(column.ilike(pattern)
+                                  for column, _ in expressions))
+        rank = sum(func.similarity(column, term) * weight
+                   for column, weight in expressions)
+
+        query = self.db.session.query(self.model.id).filter(condition)
+        count = query.order_by(None).count()
+        ids = [row[0] for row in query.order_by(
+            rank.desc(), self.model.id).limit(per_page).offset(
+            (page - 1) * per_page)]
+        return SearchPage(ids, count, page, per_page)
+
+
+def make_search_backend(db, model, backend, refresh_interval=10):
+    if backend == "trigram":
+        return TrigramSearchBackend(db, model)
+    if backend == "index":
+        return IndexSearchBackend(db, model, refresh_interval)
+    raise ValueError("Unknown search backend: {}".format(backend))
+
+
+class Search:
+    """Search over `model` through the backend named by SEARCH_BACKEND.
+
+    Created with the models; ``init_app`` picks the backend once the app's
+    config is known.
+    """
+
+    def __init__(self, db, model):
+        self.db = db
+        self.model = model
+        self.backend = None
+
+    def init_app(self, app):
+        self.backend = make_search_backend(
+            self.db, self.model, app.config["SEARCH_BACKEND"],
+            app.config.get("SEARCH_REFRESH_INTERVAL", 10))
+
+    def update(self, record):
+        self.backend.update(record)
+
+    def remove(self, record_id):
+        self.backend.remove(record_id)
+
+    def reset(self):
+        self.backend.reset()
+
+    def search(self, term, page=1, per_page=20, version=None):
+        # `version`: see TableIndex.refresh.
+        return self.backend.search(term, page=page, per_page=per_page,
+                                   version=version)
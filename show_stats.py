@@ -0,0 +1,75 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+class ShowStats:
+    """Upcoming/past show totals per venue or artist, kept in a summary table.
+
+    ``model`` has one row per owner with shows: the two counts, the next
+    upcoming and the last past start time, and the clock value they were
+    computed at. Writes refresh just the owners they touch; the counts then
+    hold until an owner's ``next_show_time`` passes, which ``refresh_due``
+    picks up through the index on that column.
+    """
+
+    def __init__(self, db, model, show_key):
+        self.db = db
+        self.model = model
+        self.show_key = show_key
+        self.table = model.__table__
+        self.owner = list(self.table.primary_key.columns)[0]
+        # The venues or artists column the owner key refers to.
+        self.owner_id = list(self.owner.foreign_keys)[0].column
+
+    def refresh(self, owner_ids=None, now=None):
+        # Recompute the given owners (all of them when owner_ids is None) in
+        # one grouped INSERT ... SELECT that overwrites their rows, so two
+        # writers refreshing the same owner can't both insert it. Owners
+        # left without shows are deleted after. The caller commits.
+
+        # Each writer first locks the owners' venue or artist rows, so one
+        # that booked a show for the same owner recounts only after the
+        # other commits, and its count includes that show too. FOR NO KEY
+        # UPDATE doesn't wait on the key share locks inserting a show takes.
+        db, show = self.db, self.show_key.table.c
+        columns = ["upcoming_shows_count", "past_shows_count", "next_show_time",
+                   "last_show_time", "refreshed_at"]
+        # SQLite needs a WHERE clause to tell the SELECT from the ON CONFLICT.
+        query = db.select(
+            self.show_key,
+            db.func.count(db.case((show.start_time > now, show.id))),
+            db.func.count(db.case((show.start_time <= now, show.id))),
+            db.func.min(db.case((show.start_time > now, show.start_time))),
+            db.func.max(db.case((show.start_time <= now, show.start_time))),
+            db.literal(now, db.DateTime)
+        ).where(db.true()).group_by(self.show_key)
+        delete = self.table.delete().where(~db.exists().where(
+            self.show_key == self.owner))
+        lock = db.select(self.owner_id)
+
+        if owner_ids is not None:
+            owner_ids = sorted({int(owner_id) for owner_id in owner_ids})
+            if not owner_ids:
+                return 0
+            query = query.where(self.show_key.in_(owner_ids))
+            delete = delete.where(self.owner.in_(owner_ids))
+            lock = lock.where(self.owner_id.in_(owner_ids))
+
+        self.db.session.execute(lock.order_by(self.owner_id).with_for_update(
+            key_share=True))
+        insert = self.insert().from_select([self.owner.name] + columns, query)
+        self.db.session.execute(insert.on_conflict_do_update(
+            index_elements=[self.owner],
+            set_={name: insert.excluded[name] for name in columns}))
+        self.db.session.execute(delete)
+        return len(owner_ids) if owner_ids is not None else None
+
+    def insert(self):
+        if self.db.session.get_bind().dialect.name == "sqlite":
+            return sqlite.insert(self.table)
+        return postgresql.insert(self.table)
+
+    def refresh_due(self, now):
+        # Owners with a show that has started since their row was computed.
+        due = [owner_id for owner_id, in self.db.session.query(self.owner).filter(
+            self.model.next_show_time <= now)]
+        return self.refresh(due, now)
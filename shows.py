@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta
+
+from flask import (Blueprint, Response, abort, flash, jsonify, render_template,
+                   request, stream_template, stream_with_context)
+from sqlalchemy.exc import IntegrityError
+
+from common import (KeysetPage, api_error, artist_cards, cached, catalogue_version,
+                    conditional_json, current_time, decode_cursor,
+                    refresh_show_stats, response_cache, venue_cards)
+from models import SHOW_DURATION, Artist, Show, Venue, db
+from replicas import read_replica
+from scheduling import Scheduler
+
+bp = Blueprint("shows", __name__)
+
+#  ----------------------------------------------------------------
+#  Shows
+#  ----------------------------------------------------------------
+
+
+@bp.route("/shows")
+@read_replica
+@cached("shows")
+def index():
+    stream = request.args.get("stream", type=int) == 1
+    page, filters = show_listing(request.args, stream)
+
+    if stream:
+        return Response(stream_with_context(stream_template(
+            "pages/shows.html", shows=page, filters=filters)))
+
+    page.rows = list(page.rows)
+    return render_template("pages/shows.html", shows=page, filters=filters)
+
+
+def show_listing(args, stream=False):
+    max_per_page = SHOWS_STREAM_MAX_PER_PAGE if stream else SHOWS_MAX_PER_PAGE
+    per_page = min(max(args.get("per_page", SHOWS_PER_PAGE, type=int), 1),
+                   max_per_page)
+    window = args.get("window", "all")
+    start = parse_date(args.get("from"))
+    end = parse_date(args.get("to"))
+    after = decode_cursor(args.get("after"), datetime.fromisoformat)
+    before = decode_cursor(args.get("before"), datetime.fromisoformat)
+
+    page = KeysetPage(show_listing_query(window, start, end),
+                      (Show.start_time, Show.id), show_item, per_page,
+                      after=after, before=before, prefetch=show_cards)
+    filters = {
+        "window": window,
+        "from": args.get("from", ""),
+        "to": args.get("to", ""),
+        "per_page": per_page
+    }
+    if stream:
+        filters["stream"] = 1
+
+    return page, filters
+
+
+def show_listing_query(window="all", start=None, end=None):
+    query = db.session.query(
+        Show.start_time, Show.id, Show.venue_id, Show.artist_id)
+
+    if window == "upcoming":
+        query = query.filter(Show.start_time > current_time())
+    elif window == "past":
+        query = query.filter(Show.start_time <= current_time())
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end + timedelta(days=1))
+    return query
+
+
+SHOWS_PER_PAGE = 30
+SHOWS_MAX_PER_PAGE = 100
+SHOWS_STREAM_MAX_PER_PAGE = 5000
+
+
+def show_cards(rows):
+    # Load every card a chunk of listing rows needs in one query per side.
+    venue_cards.get_many({row[2] for row in rows})
+    artist_cards.get_many({row[3] for row in rows})
+
+
+def show_item(row):
+    start_time, show_id, venue_id, artist_id = row
+    venue = venue_cards.get(venue_id)
+    artist = artist_cards.get(artist_id)
+    return {
+        "id": show_id,
+        "venue_id": venue_id,
+        "venue_name": venue.name if venue else None,
+        "artist_id": artist_id,
+        "artist_name": artist.name if artist else None,
+        "artist_image_link": artist.image_link if artist else None,
+        "start_time": start_time
+    }
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        abort(400)
+
+#  ----------------------------------------------------------------
+#  Create Show
+#  ----------------------------------------------------------------
+
+
+@bp.route("/shows/create")
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template("forms/new_show.html", form=form)
+
+
+@bp.route("/shows/create", methods=["POST"])
+def create_show_submission():
+    try:
+        result = schedule_shows([request.form.to_dict()])
+        if result.inserted:
+            flash("Show was successfully listed!")
+        else:
+            flash("Show could not be listed: " + "; ".join(
+                message for error in result.errors
+                for messages in error["errors"].values() for message in messages))
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        flash("Show could not be listed.")
+    finally:
+        db.session.close()
+
+    return render_template("pages/home.html")
+
+
+def show_scheduler():
+    return Scheduler(db, Show, Venue, Artist, default_duration=SHOW_DURATION)
+
+
+def schedule_shows(items):
+    # All or nothing: the shows, and the stats rows they change, are
+    # committed together only if no item is invalid or double-booked.
+    result = show_scheduler().run(items)
+    if not result.inserted:
+        db.session.rollback()
+        return result
+
+    venue_ids = {row["venue_id"] for row in result.rows}
+    artist_ids = {row["artist_id"] for row in result.rows}
+    try:
+        refresh_show_stats(venue_ids, artist_ids)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent booking won the race; the exclusion constraints
+        # caught what the in-memory check could not see.
+        db.session.rollback()
+        result.inserted = 0
+        result.conflicts += 1
+        result.errors.append({"index": None, "errors": {
+            "show": ["A venue or artist was booked by another request."]}})
+        return result
+
+    response_cache.invalidate("venues", "shows", *(
+        ["venue:{}".format(venue_id) for venue_id in venue_ids] +
+        ["artist:{}".format(artist_id) for artist_id in artist_ids]))
+    return result
+
+
+@bp.route("/api/v1/shows/batch", methods=["POST"])
+def api_schedule_shows():
+    items = request.get_json(silent=True)
+    if isinstance(items, dict):
+        items = items.get("shows")
+    if not isinstance(items, list):
+        return api_error(400)
+
+    try:
+        result = schedule_shows(items)
+    finally:
+        db.session.close()
+    if result.inserted:
+        return jsonify(result.to_dict()), 201
+    return jsonify(result.to_dict()), 409 if result.conflicts else 422
+
+#  ----------------------------------------------------------------
+#  JSON API
+#  ----------------------------------------------------------------
+
+
+@bp.route("/api/v1/shows")
+@read_replica
+def api_shows():
+    def build():
+        page, _ = show_listing(request.args)
+        data = list(page)
+        return {"data": data, "prev": page.prev_cursor, "next": page.next_cursor}
+
+    return conditional_json(build, *catalogue_version())
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from time import monotonic
+
+
+class TableIndex:
+    """An in-memory index of `model`'s rows, one per worker.
+
+    Built from the table on first use. Writes in this worker reach it
+    through ``update``/``remove``; rows other workers change are read back
+    from ``updated_at`` every ``refresh_interval`` seconds, and a row count
+    that no longer matches (a delete elsewhere) reloads it. Subclasses say
+    which ``columns`` they index and how to ``fill`` (from every row),
+    ``add``, ``discard`` and ``clear`` the index, and its ``size``.
+    """
+
+    # Rows written this long before the last sync are read again, for
+    # transactions that committed after it with an earlier updated_at.
+    SYNC_OVERLAP = timedelta(minutes=1)
+
+    def __init__(self, db, model, refresh_interval=10):
+        self.db = db
+        self.model = model
+        self.refresh_interval = refresh_interval
+        self.loaded = False
+        self.synced_at = None
+        self.checked_at = None
+        self.version = None
+
+    def columns(self):
+        raise NotImplementedError
+
+    def fill(self, rows):
+        raise NotImplementedError
+
+    def add(self, row):
+        raise NotImplementedError
+
+    def discard(self, record_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self):
+        raise NotImplementedError
+
+    def load(self):
+        self.checked_at = monotonic()
+        self.synced_at = datetime.utcnow()
+        self.fill(self.db.session.query(*self.columns()).yield_per(1000))
+        self.loaded = True
+
+    def sync(self):
+        self.checked_at = monotonic()
+        started = datetime.utcnow()
+        rows = self.db.session.query(*self.columns()).filter(
+            self.model.updated_at >= self.synced_at - self.SYNC_OVERLAP)
+        for row in rows:
+            self.add(row)
+        self.synced_at = started
+        if self.db.session.query(self.db.func.count(self.model.id)).scalar() != self.size():
+            self.load()
+
+    def refresh(self, version=None):
+        # Called before each read. `version`, the cache validators of an API
+        # response, catches the index up at once when the tables have moved
+        # on since it last saw them, so the body never lags its ETag.
+        if not self.loaded:
+            self.load()
+        elif (monotonic() - self.checked_at >= self.refresh_interval
+              or version is not None and version != self.version):
+            self.sync()
+        if version is not None:
+            self.version = version
+
+    def update(self, record):
+        if self.loaded:
+            self.add(tuple(getattr(record, column.key) for column in self.columns()))
+
+    def remove(self, record_id):
+        if self.loaded:
+            self.discard(int(record_id))
+
+    def reset(self):
+        # Bulk writes don't report ids; rebuild from the table on next use.
+        self.loaded = False
+        self.clear()
@@ -0,0 +1,56 @@
+import os
+from time import perf_counter
+
+from jinja2 import FileSystemBytecodeCache, MemcachedBytecodeCache
+
+
+class RedisBytecodeClient:
+    """The client interface MemcachedBytecodeCache expects, on redis-py."""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def get(self, key):
+        return self.redis.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.redis.set(key, value, ex=timeout)
+
+
+def make_bytecode_cache(config):
+    # "filesystem" shares compiled templates between the workers of a host
+    # and across restarts; "redis" between hosts. Both are keyed by a
+    # checksum of the template source, so edits are never served stale.
+    backend = config.get("TEMPLATE_BYTECODE_CACHE", "filesystem")
+    if not backend:
+        return None
+    if backend == "filesystem":
+        directory = config.get("TEMPLATE_BYTECODE_CACHE_DIR")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return FileSystemBytecodeCache(directory)
+    if backend == "redis":
+        import redis
+        return MemcachedBytecodeCache(
+            RedisBytecodeClient(redis.Redis.from_url(config["CACHE_REDIS_URL"])),
+            prefix="fyyur:jinja:")
+    raise ValueError("Unknown template bytecode cache: {}".format(backend))
+
+
+def html_template(name):
+    return name.endswith(".html")
+
+
+def warm_up(env, filter_func=html_template):
+    """Load every template into the environment's cache.
+
+    Templates come from the bytecode cache when it has them and are
+    compiled (and stored there) otherwise. Returns (name, seconds) per
+    template.
+    """
+    timings = []
+    for name in env.list_templates(filter_func=filter_func):
+        started = perf_counter()
+        env.get_template(name)
+        timings.append((name, perf_counter() - started))
+    return timings
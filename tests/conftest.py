@@ -0,0 +1,95 @@
+"""Fixtures: an app per test on a fresh database.
+
+Tests run on a SQLite file in the test's temporary directory, or on the
+database TEST_DATABASE_URL points to (a scratch Postgres database, which
+the migrations are applied to and rolled back from around each test):
+
+    TEST_DATABASE_URL=postgresql:///fyyur_test python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config as base_config  # noqa: E402
+from app import create_app  # noqa: E402
+from models import Venue, db  # noqa: E402
+
+# The query_budget_fixture the N+1 tests use.
+pytest_plugins = ["instrumentation"]
+
+
+def make_config(**overrides):
+    settings = {name: getattr(base_config, name)
+                for name in dir(base_config) if name.isupper()}
+    settings.update(TESTING=True, DEBUG=True, SQLALCHEMY_BINDS={},
+                    REPLICA_BINDS=[], SQLALCHEMY_ENGINE_OPTIONS={},
+                    TEMPLATE_WARM_UP=False)
+    settings["SEARCH_BACKEND"] = "trigram" if overrides[
+        "SQLALCHEMY_DATABASE_URI"].startswith("postgresql") else "index"
+    settings.update(overrides)
+    return type("TestConfig", (), settings)
+
+
+def create_schema(app):
+    with app.app_context():
+        if db.engine.dialect.name == "postgresql":
+            # pg_trgm, the genre text function and the exclusion
+            # constraints only exist in the migrations.
+            from flask_migrate import Migrate, upgrade
+            Migrate(app, db, directory=os.path.join(ROOT, "migrations"))
+            upgrade()
+        else:
+            db.create_all(bind_key=None)
+
+
+def drop_schema(app):
+    with app.app_context():
+        db.session.remove()
+        if db.engine.dialect.name == "postgresql":
+            from flask_migrate import downgrade
+            downgrade(revision="base")
+        else:
+            db.drop_all(bind_key=None)
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def add_venue(name, genres=("Jazz",), city="San Francisco", state="CA"):
+    venue = Venue(name=name, city=city, state=state, address="1 Main St",
+                  phone="123-123-1234", genres=list(genres))
+    db.session.add(venue)
+    db.session.commit()
+    return venue.id
+
+
+# Form posts for the create and edit views.
+VENUE_FORM = {"name": "The Musical Hop", "city": "San Francisco", "state": "CA",
+              "address": "1015 Folsom Street", "phone": "123-123-1234",
+              "genres": ["Jazz"], "image_link": "", "facebook_link": "",
+              "website": "", "seeking_description": ""}
+ARTIST_FORM = {"name": "Guns N Petals", "city": "San Francisco", "state": "CA",
+               "phone": "326-123-5000", "genres": ["Rock n Roll"], "image_link": "",
+               "facebook_link": "", "website": "", "seeking_description": ""}
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return os.environ.get("TEST_DATABASE_URL") or "sqlite:///{}".format(
+        tmp_path / "fyyur.db")
+
+
+@pytest.fixture
+def app(database_url):
+    app = create_app(make_config(SQLALCHEMY_DATABASE_URI=database_url))
+    create_schema(app)
+    yield app
+    drop_schema(app)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
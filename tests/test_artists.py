@@ -0,0 +1,48 @@
+import pytest
+
+from models import Artist, db
+
+NAMES = ["Alice Coltrane", "art blakey", "Bob Dylan", "dj shadow", "Daft Punk",
+         "DJ Premier", "Etta James", "Zz Top"]
+
+
+@pytest.fixture
+def artists(app):
+    with app.app_context():
+        db.session.add_all(Artist(name=name, city="San Francisco", state="CA",
+                                  phone="326-123-5000", genres=["Jazz"])
+                           for name in NAMES)
+        db.session.commit()
+
+
+def listing(client, **query):
+    response = client.get("/api/v1/artists", query_string=query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def names(page):
+    return [artist["name"] for artist in page["data"]]
+
+
+def test_a_letter_jump_starts_at_its_count(client, artists):
+    page = client.get("/artists").get_data(as_text=True)
+    assert 'title="3 artists">D' in page
+
+    assert names(listing(client, letter="D", per_page=3)) == [
+        "Daft Punk", "DJ Premier", "dj shadow"]
+    assert names(listing(client, letter="z")) == ["Zz Top"]
+
+
+def test_pages_run_across_letters_in_name_order(client, artists):
+    seen, cursor = [], None
+    while True:
+        page = listing(client, per_page=3, **({"after": cursor} if cursor else {}))
+        seen += names(page)
+        cursor = page["next"]
+        if not cursor:
+            break
+    assert seen == sorted(NAMES, key=str.lower)
+
+    back = names(listing(client, per_page=3, before=page["prev"]))
+    assert back == seen[-5:-2]
@@ -0,0 +1,35 @@
+from cache import LRUCache, ResponseCache
+from common import artist_cards
+from models import Artist, db
+
+
+def test_pages_rendered_before_an_invalidation_are_not_stored():
+    cache = ResponseCache(LRUCache(), timeout=60)
+    page, token = cache.get("venues")
+    assert page is None
+
+    cache.invalidate("venues")
+    cache.set("venues", "OLD PAGE", token)
+    assert cache.get("venues")[0] is None
+
+    page, token = cache.get("venues")
+    cache.set("venues", "NEW PAGE", token)
+    assert cache.get("venues")[0] == "NEW PAGE"
+
+
+def test_cards_loaded_before_an_invalidation_are_not_kept(app):
+    with app.app_context():
+        artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                        phone="326-123-5000", genres=["Rock n Roll"])
+        db.session.add(artist)
+        db.session.commit()
+
+        generation = artist_cards.generation
+        _, missing = artist_cards.cached({artist.id})
+        rows = db.session.execute(artist_cards.select(missing)).all()
+        artist.name = "Guns N Roses"
+        db.session.commit()
+        artist_cards.invalidate(artist.id)
+        artist_cards.fill(rows, generation)
+
+        assert artist_cards.get(artist.id).name == "Guns N Roses"
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import VENUE_FORM, add_venue
+from common import cached, response_cache
+from models import Artist, Show, db
+
+
+@pytest.fixture
+def ids(app):
+    with app.app_context():
+        venue_id = add_venue("The Musical Hop")
+        artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                        phone="326-123-5000", genres=["Rock n Roll"])
+        db.session.add(artist)
+        db.session.flush()
+        db.session.add(Show(venue_id=venue_id, artist_id=artist.id,
+                            start_time=datetime(2035, 5, 21, 21, 30)))
+        db.session.commit()
+        return {"venue": venue_id, "artist": artist.id}
+
+
+def page(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def test_creating_a_venue_refreshes_the_directory(client, ids):
+    assert "Park Square Live" not in page(client, "/venues")
+    client.post("/venues/create", data=dict(VENUE_FORM, name="Park Square Live"))
+    assert "Park Square Live" in page(client, "/venues")
+
+
+def test_editing_a_venue_refreshes_every_page_showing_it(client, ids):
+    paths = ["/venues", "/shows", "/venues/{venue}".format(**ids),
+             "/artists/{artist}".format(**ids)]
+    for path in paths:
+        assert "The Musical Hop" in page(client, path)
+
+    client.post("/venues/{venue}/edit".format(**ids),
+                data=dict(VENUE_FORM, name="The Dueling Pianos Bar"))
+    for path in paths:
+        html = page(client, path)
+        assert "The Dueling Pianos Bar" in html and "The Musical Hop" not in html
+
+
+def test_deleting_a_venue_refreshes_the_directory(app, client, ids):
+    with app.app_context():
+        venue_id = add_venue("Park Square Live")
+    assert "Park Square Live" in page(client, "/venues")
+    client.delete("/venues/{}".format(venue_id))
+    assert "Park Square Live" not in page(client, "/venues")
+
+
+def test_booking_a_show_refreshes_the_listings(client, ids):
+    paths = ["/shows", "/venues/{venue}".format(**ids),
+             "/artists/{artist}".format(**ids)]
+    for path in paths:
+        assert "June 15, 2035" not in page(client, path)
+
+    client.post("/shows/create", data={"venue_id": ids["venue"],
+                                       "artist_id": ids["artist"],
+                                       "start_time": "2035-06-15 20:00:00"})
+    for path in paths:
+        assert "June 15, 2035" in page(client, path)
+
+
+def test_pages_with_flashes_are_not_stored(client, ids):
+    with client.session_transaction() as session:
+        session["_flashes"] = [("message", "Venue The Musical Hop was listed!")]
+    assert "was listed!" in page(client, "/venues")
+    assert "was listed!" not in page(client, "/venues")
+
+
+def test_a_write_during_rendering_is_not_hidden_by_the_cache(app, client):
+    # The first render reads the old data, then a write invalidates the
+    # group before the page is stored.
+    renders = []
+
+    @app.route("/cached")
+    @cached("venues")
+    def render():
+        renders.append(len(renders))
+        if len(renders) == 1:
+            response_cache.invalidate("venues")
+        return "render {}".format(len(renders))
+
+    assert page(client, "/cached") == "render 1"
+    assert page(client, "/cached") == "render 2"
+    assert page(client, "/cached") == "render 2"
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import ARTIST_FORM, VENUE_FORM, add_venue
+from models import Artist, Show, db
+
+
+@pytest.fixture
+def ids(app):
+    with app.app_context():
+        venue_id = add_venue("The Musical Hop")
+        artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                        phone="326-123-5000", genres=["Rock n Roll"],
+                        image_link="https://example.com/petals.jpg")
+        db.session.add(artist)
+        db.session.flush()
+        db.session.add(Show(venue_id=venue_id, artist_id=artist.id,
+                            start_time=datetime(2035, 5, 21, 21, 30)))
+        db.session.commit()
+        return {"venue": venue_id, "artist": artist.id}
+
+
+def page(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def test_editing_a_venue_refreshes_its_cards(client, ids):
+    paths = ["/shows", "/artists/{artist}".format(**ids)]
+    for path in paths:
+        assert "The Musical Hop" in page(client, path)
+
+    client.post("/venues/{venue}/edit".format(**ids),
+                data=dict(VENUE_FORM, name="The Dueling Pianos Bar"))
+    for path in paths:
+        html = page(client, path)
+        assert "The Dueling Pianos Bar" in html and "The Musical Hop" not in html
+
+
+def test_editing_an_artist_refreshes_its_cards(client, ids):
+    paths = ["/shows", "/venues/{venue}".format(**ids)]
+    for path in paths:
+        assert "petals.jpg" in page(client, path)
+
+    client.post("/artists/{artist}/edit".format(**ids),
+                data=dict(ARTIST_FORM, name="The Wild Sax Band",
+                          image_link="https://example.com/sax.jpg"))
+    for path in paths:
+        html = page(client, path)
+        assert "The Wild Sax Band" in html and "Guns N Petals" not in html
+        assert "sax.jpg" in html and "petals.jpg" not in html
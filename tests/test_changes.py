@@ -0,0 +1,71 @@
+import time
+from datetime import datetime
+
+from conftest import add_venue
+from models import Artist, Show, Venue, db
+
+
+def feed(client, since="2000-01-01"):
+    seen, cursor = [], None
+    while True:
+        query = {"since": since, "limit": 2}
+        if cursor:
+            query["after"] = cursor
+        page = client.get("/api/v1/changes", query_string=query).get_json()
+        seen += [(change["type"], change["id"], change["deleted"])
+                 for change in page["data"]]
+        cursor = page["next"]
+        if not cursor:
+            break
+    return seen
+
+
+def test_the_feed_pages_through_every_change(app, client):
+    with app.app_context():
+        venue_ids = [add_venue("Venue {}".format(number)) for number in range(5)]
+
+    assert feed(client) == [("venue", venue_id, False) for venue_id in venue_ids]
+
+
+def test_deletes_are_reported(app, client):
+    with app.app_context():
+        venue_ids = [add_venue("Venue {}".format(number)) for number in range(3)]
+        artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                        phone="326-123-5000", genres=["Rock n Roll"])
+        db.session.add(artist)
+        db.session.flush()
+        show = Show(venue_id=venue_ids[0], artist_id=artist.id,
+                    start_time=datetime(2035, 5, 21, 21, 30))
+        db.session.add(show)
+        db.session.commit()
+        since = datetime.utcnow().isoformat()
+        db.session.delete(show)
+        db.session.commit()
+        show_id, artist_id = show.id, artist.id
+
+    client.delete("/venues/{}".format(venue_ids[1]))
+    client.delete("/artists/{}".format(artist_id))
+
+    assert feed(client, since) == [("show", show_id, True),
+                                   ("venue", venue_ids[1], True),
+                                   ("artist", artist_id, True)]
+    assert [change[:2] for change in feed(client)] == [
+        ("venue", venue_ids[0]), ("venue", venue_ids[2]),
+        ("show", show_id), ("venue", venue_ids[1]), ("artist", artist_id)]
+
+
+def test_edits_read_back_the_new_updated_at(app):
+    with app.app_context():
+        venue = db.session.get(Venue, add_venue("The Musical Hop"))
+        created = venue.updated_at
+        time.sleep(0.01)
+        venue.name = "The Dueling Pianos Bar"
+        db.session.commit()
+        assert venue.updated_at > created
+
+
+def test_bad_cursors_are_rejected(client):
+    for cursor in ("not a cursor", "WyIyMDMwLTAxLTAxIiwgMV0"):
+        response = client.get("/api/v1/changes", query_string={
+            "since": "2000-01-01", "after": cursor})
+        assert response.status_code == 400
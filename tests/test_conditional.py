@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import add_venue, make_config
+from app import create_app
+from models import Artist, Show, db
+
+NOW = datetime(2030, 6, 1, 20, 0)
+
+
+@pytest.fixture
+def catalogue(app):
+    app.config["CLOCK"] = lambda: NOW
+    with app.app_context():
+        venue_id = add_venue("The Musical Hop")
+        artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                        phone="326-123-5000", genres=["Rock n Roll"])
+        db.session.add(artist)
+        db.session.flush()
+        db.session.add(Show(venue_id=venue_id, artist_id=artist.id,
+                            start_time=NOW + timedelta(minutes=30)))
+        db.session.commit()
+    return app
+
+
+def revalidate(client, path, etag):
+    return client.get(path, headers={"If-None-Match": etag})
+
+
+def test_etag_holds_across_clock_buckets(catalogue, client):
+    etag = client.get("/api/v1/venues").headers["ETag"]
+    catalogue.config["CLOCK"] = lambda: NOW + timedelta(minutes=5)
+    assert revalidate(client, "/api/v1/venues", etag).status_code == 304
+
+
+def test_etag_moves_when_a_show_starts(catalogue, client):
+    etag = client.get("/api/v1/venues/1").headers["ETag"]
+    catalogue.config["CLOCK"] = lambda: NOW + timedelta(hours=1)
+    response = revalidate(client, "/api/v1/venues/1", etag)
+    assert response.status_code == 200
+    assert response.get_json()["past_shows_count"] == 1
+
+
+def test_collections_revalidate_deletes(catalogue, client):
+    with catalogue.app_context():
+        venue_id = add_venue("Park Square Live Music & Coffee")
+    response = client.get("/api/v1/venues")
+    assert "Last-Modified" not in response.headers
+
+    client.delete("/venues/{}".format(venue_id))
+    response = revalidate(client, "/api/v1/venues", response.headers["ETag"])
+    assert response.status_code == 200
+    assert len(response.get_json()["areas"][0]["venues"]) == 1
+
+
+def test_facets_catch_up_with_other_workers(catalogue, database_url):
+    # Another app on the same database stands in for another worker.
+    client = catalogue.test_client()
+    assert client.get("/api/v1/venues/facets").get_json()["count"] == 1
+
+    other = create_app(make_config(SQLALCHEMY_DATABASE_URI=database_url))
+    with other.app_context():
+        add_venue("The Dueling Pianos Bar", genres=("Classical",))
+        db.session.remove()
+
+    counts = client.get("/api/v1/venues/facets").get_json()
+    assert counts["count"] == 2
+    assert ["Classical", 1] in counts["genres"]
+
+
+def test_etag_moves_when_show_stats_are_refreshed(catalogue, client):
+    # The listing's upcoming counts come from the stats table, which only
+    # catches up when refresh-show-stats runs after a show has started.
+    runner = catalogue.test_cli_runner()
+    assert runner.invoke(args=["refresh-show-stats", "--full"]).exit_code == 0
+    catalogue.config["CLOCK"] = lambda: NOW + timedelta(hours=1)
+    response = client.get("/api/v1/venues")
+    assert response.get_json()["areas"][0]["venues"][0]["num_upcoming_shows"] == 1
+
+    assert runner.invoke(args=["refresh-show-stats"]).exit_code == 0
+    response = revalidate(client, "/api/v1/venues", response.headers["ETag"])
+    assert response.status_code == 200
+    assert response.get_json()["areas"][0]["venues"][0]["num_upcoming_shows"] == 0
@@ -0,0 +1,27 @@
+import re
+
+from models import Artist, db
+
+
+def add_artists(*rows):
+    db.session.add_all(Artist(name=name, city=city, state=state, phone="326-123-5000",
+                              genres=list(genres))
+                       for name, genres, city, state in rows)
+    db.session.commit()
+
+
+def letters(client, **args):
+    page = client.get("/artists", query_string=args).get_data(as_text=True)
+    return re.findall(r'title="(\d+) artists">(\w)', page)
+
+
+def test_letters_follow_the_filters(app, client):
+    with app.app_context():
+        add_artists(("Alice Coltrane", ["Jazz"], "Los Angeles", "CA"),
+                    ("Art Blakey", ["Jazz"], "Pittsburgh", "PA"),
+                    ("Bob Dylan", ["Folk"], "Duluth", "MN"))
+
+    assert letters(client) == [("2", "A"), ("1", "B")]
+    assert letters(client, genre="Jazz") == [("2", "A")]
+    assert letters(client, genre="Jazz", state="CA") == [("1", "A")]
+    assert letters(client, genre="Folk") == [("1", "B")]
@@ -0,0 +1,71 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from conftest import add_venue
+from models import Artist, Show, db
+
+SHOWS = """venue_id,artist_id,start_time,duration
+{venue},{artist},2030-06-01 20:00,30
+{venue},{artist},2030-06-01 20:15,
+{venue},{artist},2030-06-01 18:30,
+{venue},{artist},tomorrow,
+{venue},{artist},2030-06-02 20:00,
+"""
+
+
+@pytest.fixture
+def ids(app):
+    with app.app_context():
+        venue_id = add_venue("The Musical Hop")
+        artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                        phone="326-123-5000", genres=["Rock n Roll"])
+        db.session.add(artist)
+        db.session.flush()
+        db.session.add(Show(venue_id=venue_id, artist_id=artist.id,
+                            start_time=datetime(2030, 6, 1, 17)))
+        db.session.commit()
+        return {"venue": venue_id, "artist": artist.id}
+
+
+def import_shows(client, ids):
+    response = client.post("/import/shows?format=csv",
+                           data=io.BytesIO(SHOWS.format(**ids).encode()),
+                           content_type="text/csv")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_show_imports_are_checked_for_double_bookings(app, client, ids):
+    result = import_shows(client, ids)
+
+    assert result["inserted"] == 2
+    # Clashes with the first row of the batch, with a stored show, and a
+    # start time that doesn't parse.
+    errors = {error["line"]: error["errors"] for error in result["errors"]}
+    assert sorted(errors) == [3, 4, 5]
+    assert "venue_id" in errors[3] and "venue_id" in errors[4]
+    assert "start_time" in errors[5]
+    with app.app_context():
+        end_time = db.session.query(Show.end_time).filter(
+            Show.start_time == datetime(2030, 6, 1, 20)).scalar()
+    assert end_time == datetime(2030, 6, 1, 20, 30)
+
+
+def test_rows_the_database_rejects_are_reported(app, client, ids):
+    # A trigger stands in for Postgres' exclusion constraints catching a
+    # booking made by another request after the batch was checked.
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            pytest.skip("uses a SQLite trigger")
+        db.session.execute(db.text(
+            "CREATE TRIGGER booked BEFORE INSERT ON shows "
+            "WHEN NEW.start_time LIKE '2030-06-02%' "
+            "BEGIN SELECT RAISE(ABORT, 'booked'); END"))
+        db.session.commit()
+
+    result = import_shows(client, ids)
+    assert result["inserted"] == 1
+    assert result["errors"][-1] == {"line": 6, "errors": {
+        "show": ["A venue or artist was booked by another request."]}}
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import add_venue
+from common import PAST_SHOWS_PER_PAGE
+from models import Artist, Show, db
+
+NOW = datetime(2030, 6, 1, 20, 0)
+
+
+@pytest.fixture
+def venue_id(app):
+    # A page and a half of past shows, two of them starting at the same
+    # time, and one show that is about to start.
+    app.config["CLOCK"] = lambda: NOW
+    with app.app_context():
+        venue_id = add_venue("The Musical Hop")
+        artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                        phone="326-123-5000", genres=["Rock n Roll"])
+        db.session.add(artist)
+        db.session.flush()
+        starts = [NOW - timedelta(days=day) for day in range(1, PAST_SHOWS_PER_PAGE + 6)]
+        starts += [starts[PAST_SHOWS_PER_PAGE - 1], NOW + timedelta(minutes=30)]
+        db.session.add_all([Show(venue_id=venue_id, artist_id=artist.id, start_time=start)
+                            for start in starts])
+        db.session.commit()
+    return venue_id
+
+
+def past_start_times(shows):
+    return [datetime.fromisoformat(show["start_time"]) for show in shows]
+
+
+def test_pages_follow_on_after_a_show_starts(app, client, venue_id):
+    venue = client.get("/api/v1/venues/{}".format(venue_id)).get_json()
+    first = past_start_times(venue["past_shows"])
+    assert len(first) == PAST_SHOWS_PER_PAGE
+
+    # The upcoming show starting before the next page is loaded must not
+    # shift a row already shown onto it.
+    app.config["CLOCK"] = lambda: NOW + timedelta(hours=1)
+    page = client.get("/api/v1/venues/{}/past_shows".format(venue_id),
+                      query_string={"after": venue["past_shows_next"]}).get_json()
+    second = past_start_times(page["data"])
+
+    assert page["next"] is None
+    assert len(first) + len(second) == PAST_SHOWS_PER_PAGE + 6
+    assert sorted(first + second, reverse=True) == first + second
+    assert not set(first) & set(second) - {first[-1]}
+
+
+def test_load_more_returns_the_next_cursor(client, venue_id):
+    html = client.get("/venues/{}".format(venue_id)).get_data(as_text=True)
+    assert "data-after=" in html
+
+    response = client.get("/api/v1/venues/{}".format(venue_id))
+    cursor = response.get_json()["past_shows_next"]
+    response = client.get("/venues/{}/past_shows".format(venue_id),
+                          query_string={"after": cursor})
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_bad_cursors_are_rejected(client, venue_id):
+    response = client.get("/api/v1/venues/{}/past_shows".format(venue_id),
+                          query_string={"after": "not a cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import create_schema, drop_schema, make_config
+from app import create_app
+from common import artist_cards, refresh_show_stats, venue_cards
+from models import Artist, Show, Venue, db
+
+NOW = datetime(2030, 6, 1, 20, 0)
+
+
+@pytest.fixture
+def app(database_url):
+    # The page cache would hide the queries being counted.
+    app = create_app(make_config(SQLALCHEMY_DATABASE_URI=database_url,
+                                 CACHE_BACKEND="null"))
+    app.config["CLOCK"] = lambda: NOW
+    create_schema(app)
+    yield app
+    drop_schema(app)
+
+
+def add_catalogue(count):
+    # `count` more venues and artists, each venue with a past and an
+    # upcoming show by a different artist, all booked at venue 1 too.
+    venues = [Venue(name="Venue {}".format(number), city="San Francisco", state="CA",
+                    address="1 Main St", phone="123-123-1234", genres=["Jazz"])
+              for number in range(count)]
+    artists = [Artist(name="Artist {}".format(number), city="San Francisco",
+                      state="CA", phone="123-123-1234", genres=["Jazz"])
+               for number in range(count)]
+    db.session.add_all(venues + artists)
+    db.session.flush()
+    first_venue = db.session.query(db.func.min(Venue.id)).scalar()
+    start = NOW + timedelta(days=db.session.query(db.func.count(Show.id)).scalar())
+    for number, (venue, artist) in enumerate(zip(venues, artists)):
+        for venue_id, days in ((venue.id, -1), (venue.id, 1), (first_venue, 2)):
+            db.session.add(Show(venue_id=venue_id, artist_id=artist.id,
+                                start_time=start + timedelta(days=days * (number + 1))))
+    db.session.commit()
+    refresh_show_stats(None, None)
+    db.session.commit()
+
+
+# Queries per page once the in-memory indexes are loaded.
+BUDGETS = {"/venues": 1, "/venues/1": 6, "/artists/1": 5, "/shows": 3,
+           "/shows?stream=1": 3}
+
+
+def query_counts(client, budget, cold):
+    counts = {}
+    for path, limit in BUDGETS.items():
+        assert client.get(path).status_code == 200
+        if cold:
+            # Every card is loaded by one IN query per side or not at all.
+            venue_cards.clear()
+            artist_cards.clear()
+        with budget(limit) as stats:
+            client.get(path).get_data()
+        counts[path] = stats.count
+    return counts
+
+
+@pytest.mark.parametrize("cold", [True, False], ids=["cold cards", "warm cards"])
+def test_listings_and_details_use_constant_queries(app, client, query_budget_fixture,
+                                                   cold):
+    with app.app_context():
+        add_catalogue(2)
+        small = query_counts(client, query_budget_fixture, cold)
+        add_catalogue(30)
+        large = query_counts(client, query_budget_fixture, cold)
+    assert small == large
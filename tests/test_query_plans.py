@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+import app as app_module
+from app import explain_hot_queries, is_sequential_scan
+from conftest import ROOT
+from models import db
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from generate_data import generate  # noqa: E402
+
+
+@pytest.fixture
+def catalogue(app):
+    # Big enough that a table scan costs more than an index lookup, so the
+    # planner's own choice is what gets checked.
+    with app.app_context():
+        generate(app_module, venues=300, artists=3000, shows=20000)
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+
+
+def test_hot_queries_use_an_index(app, catalogue):
+    with app.app_context():
+        plans = explain_hot_queries()
+
+    scans = {name: plan for name, plan in plans.items() if is_sequential_scan(plan)}
+    assert not scans, "\n\n".join(
+        "-- {}\n{}".format(name, plan) for name, plan in scans.items())
+
+
+def test_sequential_scans_are_detected():
+    assert is_sequential_scan("Seq Scan on shows  (cost=0.00..35.50 rows=10 width=12)")
+    assert is_sequential_scan("SCAN venues")
+    assert not is_sequential_scan(
+        "SEARCH shows USING INDEX ix_shows_venue_id_start_time (venue_id=?)")
+    assert not is_sequential_scan(
+        "Index Scan using ix_shows_start_time on shows  (cost=0.15..8.17 rows=1)")
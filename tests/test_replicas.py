@@ -0,0 +1,100 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import drop_schema, make_config
+from app import create_app
+from models import Venue, db
+
+VENUE_FORM = {"name": "The Musical Hop", "city": "San Francisco", "state": "CA",
+              "address": "1015 Folsom Street", "phone": "123-123-1234",
+              "genres": ["Jazz"], "image_link": "", "facebook_link": "",
+              "website": "", "seeking_description": ""}
+
+
+def rename_venue(path, name):
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE venues SET name = ?", (name,))
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {name: str(tmp_path / "{}.db".format(name))
+            for name in ("primary", "replica1", "replica2")}
+
+
+@pytest.fixture
+def make_app(paths):
+    # The primary with one venue, and two copies of it standing in for
+    # replicas. Each copy renames the venue, so a response tells which
+    # database served it.
+    apps = []
+
+    def make_app(**config):
+        app = create_app(make_config(
+            SQLALCHEMY_DATABASE_URI="sqlite:///" + paths["primary"],
+            SQLALCHEMY_BINDS={name: "sqlite:///" + paths[name]
+                              for name in ("replica1", "replica2")},
+            REPLICA_BINDS=["replica1", "replica2"], **config))
+        apps.append(app)
+        return app
+
+    app = make_app()
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add(Venue(**dict(VENUE_FORM, name="primary")))
+        db.session.commit()
+        for engine in db.engines.values():
+            engine.dispose()
+    for name in ("replica1", "replica2"):
+        shutil.copy(paths["primary"], paths[name])
+        rename_venue(paths[name], name)
+
+    yield make_app
+    for app in apps:
+        drop_schema(app)
+
+
+def venue_name(client):
+    return client.get("/api/v1/venues/1").get_json()["name"]
+
+
+def test_read_only_views_take_the_replicas_in_turn(make_app):
+    client = make_app().test_client()
+    assert [venue_name(client) for _ in range(4)] == [
+        "replica1", "replica2", "replica1", "replica2"]
+
+
+def test_least_loaded_spreads_sequential_reads(make_app):
+    client = make_app(REPLICA_SELECTION="least_loaded").test_client()
+    assert {venue_name(client) for _ in range(4)} == {"replica1", "replica2"}
+
+
+def test_other_views_use_the_primary(make_app):
+    client = make_app().test_client()
+    page = client.get("/venues/1/edit").get_data(as_text=True)
+    assert 'value="primary"' in page
+
+
+def test_lagging_replicas_are_skipped(make_app):
+    app = make_app(REPLICA_LAG_QUERY="SELECT 60")
+    assert venue_name(app.test_client()) == "primary"
+    assert app.extensions["replicas"].fallbacks == 1
+
+
+def test_writer_reads_its_writes(make_app):
+    app = make_app()
+    writer, other = app.test_client(), app.test_client()
+    writer.post("/venues/1/edit", data=dict(VENUE_FORM, name="edited"))
+
+    assert venue_name(writer) == "edited"
+    assert venue_name(other) in ("replica1", "replica2")
+    assert app.extensions["replicas"].pinned == 1
+
+
+def test_writer_goes_back_to_the_replicas(make_app):
+    app = make_app(REPLICA_MAX_LAG=0, REPLICA_LAG_CHECK_INTERVAL=0)
+    writer = app.test_client()
+    writer.post("/venues/1/edit", data=dict(VENUE_FORM, name="edited"))
+    assert venue_name(writer) in ("replica1", "replica2")
@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import add_venue, make_config
+from app import create_app
+from models import Venue, db
+
+
+@pytest.fixture
+def other_worker(database_url):
+    # A second app on the same database, with its own search index.
+    return create_app(make_config(SQLALCHEMY_DATABASE_URI=database_url))
+
+
+def api_search(client, term):
+    return client.get("/api/v1/venues/search", query_string={"q": term}).get_json()
+
+
+def test_api_search_sees_other_workers_writes(app, client, other_worker):
+    with app.app_context():
+        add_venue("The Musical Hop")
+    assert api_search(client, "hop")["count"] == 1
+
+    with other_worker.app_context():
+        add_venue("Hop Shop")
+        db.session.remove()
+    assert [venue["name"] for venue in api_search(client, "hop")["data"]] == [
+        "Hop Shop", "The Musical Hop"]
+
+    with other_worker.app_context():
+        db.session.delete(db.session.get(Venue, 1))
+        db.session.commit()
+        db.session.remove()
+    assert api_search(client, "hop")["count"] == 1
+
+
+def test_page_search_syncs_every_refresh_interval(app, client, other_worker):
+    app.extensions["fyyur"].venue_search.backend.refresh_interval = 0
+    with app.app_context():
+        add_venue("The Musical Hop")
+    client.post("/venues/search", data={"search_term": "hop"})
+
+    with other_worker.app_context():
+        add_venue("Hop Shop")
+        db.session.remove()
+    page = client.post("/venues/search", data={"search_term": "hop"})
+    assert "Hop Shop" in page.get_data(as_text=True)
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from conftest import add_venue
+from common import venue_stats
+from models import Artist, Show, VenueShowStats, db
+
+NOW = datetime(2030, 6, 1, 20, 0)
+
+
+def add_show(venue_id, start_time):
+    artist = Artist(name="Guns N Petals", city="San Francisco", state="CA",
+                    phone="326-123-5000", genres=["Rock n Roll"])
+    db.session.add(artist)
+    db.session.flush()
+    show = Show(venue_id=venue_id, artist_id=artist.id, start_time=start_time)
+    db.session.add(show)
+    db.session.flush()
+    return show
+
+
+def stats(venue_id):
+    row = db.session.get(VenueShowStats, venue_id)
+    return row and (row.upcoming_shows_count, row.past_shows_count)
+
+
+def test_refresh_overwrites_rows_in_place(app):
+    with app.app_context():
+        venue_id = add_venue("The Musical Hop")
+        add_show(venue_id, NOW + timedelta(hours=1))
+        venue_stats.refresh([venue_id], NOW)
+        assert stats(venue_id) == (1, 0)
+
+        # A row another writer has just put there is updated, not inserted
+        # again next to it.
+        venue_stats.refresh([venue_id], NOW + timedelta(hours=2))
+        venue_stats.refresh(None, NOW + timedelta(hours=2))
+        db.session.expire_all()
+        assert stats(venue_id) == (0, 1)
+
+
+def test_refresh_drops_owners_without_shows(app):
+    with app.app_context():
+        kept, emptied = add_venue("The Musical Hop"), add_venue("Park Square")
+        add_show(kept, NOW - timedelta(days=1))
+        show = add_show(emptied, NOW - timedelta(days=1))
+        venue_stats.refresh(None, NOW)
+
+        db.session.delete(show)
+        venue_stats.refresh([kept, emptied], NOW)
+        db.session.expire_all()
+        assert stats(kept) == (0, 1)
+        assert stats(emptied) is None
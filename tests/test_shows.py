@@ -0,0 +1,94 @@
+import re
+from datetime import datetime, timedelta
+from html import unescape
+
+import pytest
+
+from conftest import add_venue
+from models import Artist, Show, db
+
+NOW = datetime(2030, 6, 1, 20, 0)
+
+
+@pytest.fixture
+def shows(app):
+    # Three shows at each of three start times, one day apart: one past,
+    # one a minute from now, one the next day. Each slot uses a different
+    # venue and artist, so none of them double-books.
+    app.config["CLOCK"] = lambda: NOW
+    with app.app_context():
+        venue_ids = [add_venue("Venue {}".format(number)) for number in range(3)]
+        artists = [Artist(name="Artist {}".format(number), city="San Francisco",
+                          state="CA", phone="326-123-5000", genres=["Jazz"])
+                   for number in range(3)]
+        db.session.add_all(artists)
+        db.session.flush()
+        starts = [NOW - timedelta(days=1), NOW + timedelta(minutes=1),
+                  NOW + timedelta(days=1)]
+        shows = [Show(venue_id=venue_id, artist_id=artist.id, start_time=start)
+                 for start in starts
+                 for venue_id, artist in zip(venue_ids, artists)]
+        db.session.add_all(shows)
+        db.session.commit()
+        return sorted((show.start_time, show.id) for show in shows)
+
+
+def listing(client, **query):
+    response = client.get("/api/v1/shows", query_string=query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def keys(page):
+    return [(datetime.fromisoformat(show["start_time"]), show["venue_id"],
+             show["artist_id"], show["id"]) for show in page["data"]]
+
+
+def test_pages_walk_forward_and_back_across_tied_start_times(client, shows):
+    pages, cursor = [], None
+    while True:
+        page = listing(client, per_page=2, **({"after": cursor} if cursor else {}))
+        pages.append(keys(page))
+        cursor = page["next"]
+        if not cursor:
+            break
+    forward = [key for page_keys in pages for key in page_keys]
+    assert len(forward) == len(set(forward)) == len(shows)
+    assert [key[0] for key in forward] == [start for start, _ in shows]
+    assert [key[3] for key in forward] == [show_id for _, show_id in shows]
+
+    back, cursor = [], page["prev"]
+    while cursor:
+        page = listing(client, per_page=2, before=cursor)
+        back = keys(page) + back
+        cursor = page["prev"]
+    assert back + pages[-1] == forward
+
+
+@pytest.mark.parametrize("query, count", [
+    ({"window": "upcoming"}, 6),
+    ({"window": "past"}, 3),
+    ({"from": "2030-06-02"}, 3),
+    ({"to": "2030-06-01"}, 6),
+    ({"from": "2030-06-01", "to": "2030-06-01"}, 3),
+    ({"window": "past", "from": "2030-06-02"}, 0),
+])
+def test_window_and_date_filters(client, shows, query, count):
+    assert len(listing(client, **query)["data"]) == count
+
+
+def test_bad_dates_are_rejected(client, shows):
+    assert client.get("/shows", query_string={"from": "June"}).status_code == 400
+
+
+def test_streamed_pages_link_to_streamed_pages(client, shows):
+    response = client.get("/shows", query_string={"stream": 1, "per_page": 4})
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    assert html.count("tile-show") == 4
+
+    link = unescape(re.search(r'<li class="next"><a href="([^"]+)"', html).group(1))
+    assert "stream=1" in link and "per_page=4" in link
+    response = client.get(link)
+    assert response.is_streamed
+    assert response.get_data(as_text=True).count("tile-show") == 4
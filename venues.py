@@ -0,0 +1,359 @@
+from datetime import datetime
+from itertools import groupby
+
+from flask import (Blueprint, abort, flash, make_response, redirect,
+                   render_template, request, url_for)
+
+from common import (api_error, artist_cards, cached, catalogue_version,
+                    conditional_json, decode_cursor, entity_version,
+                    invalidate_venue, past_show_page, response_cache,
+                    search_response, show_counts, show_rows,
+                    upcoming_shows_count, venue_facets, venue_search,
+                    venue_stats)
+from facets import FacetFilters
+from models import Artist, Show, Venue, VenueShowStats, db
+from replicas import read_replica
+
+bp = Blueprint("venues", __name__)
+
+#  ----------------------------------------------------------------
+#  Venues
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues")
+@read_replica
+@cached("venues")
+def index():
+    filters = FacetFilters.from_args(request.args)
+    return render_template("pages/venues.html", areas=venue_areas(filters),
+                           filters=filters, facets=venue_facets.counts(filters))
+
+
+def venue_areas(filters=FacetFilters()):
+    rows = venue_areas_query(filters).all()
+    data = []
+    for (city, state), venues in groupby(rows, key=lambda row: (row[0], row[1])):
+        data.append({
+            "city": city,
+            "state": state,
+            "venues": [{
+                "id": venue_id,
+                "name": name,
+                "num_upcoming_shows": count
+            } for _, _, venue_id, name, count in venues]
+        })
+
+    return data
+
+
+def venue_areas_query(filters=FacetFilters()):
+    # One query: venues are sorted by area so they can be folded into the
+    # city/state groups the template expects, with upcoming counts read from
+    # the show stats table instead of aggregating shows.
+    query = db.session.query(
+        Venue.city, Venue.state, Venue.id, Venue.name,
+        upcoming_shows_count(VenueShowStats)
+    ).outerjoin(VenueShowStats, VenueShowStats.venue_id == Venue.id)
+    return filters.apply(query, Venue).order_by(
+        Venue.state, Venue.city, Venue.name, Venue.id)
+
+#  ----------------------------------------------------------------
+#  Venues Search
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues/search", methods=["POST"])
+@read_replica
+def search_venues():
+    search = request.form.get("search_term", "")
+    page = max(request.form.get("page", 1, type=int), 1)
+    response = search_response(venue_search, Venue, venue_stats, search, page)
+
+    return render_template("pages/search_venues.html", results=response, search_term=search)
+
+#  ----------------------------------------------------------------
+#  Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues/<int:venue_id>")
+@read_replica
+@cached("venue:{venue_id}")
+def show_venue(venue_id):
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        abort(404)
+
+    return render_template("pages/show_venue.html", venue=venue_detail(venue))
+
+
+def venue_detail(venue, counts=None, past_rows=None, upcoming_rows=None):
+    # The async server passes in the counts and show rows it has already
+    # fetched; otherwise they are queried here.
+    venue_id = venue.id
+    if counts is None:
+        counts = show_counts(Show.venue_id, venue_id)
+        past_rows = venue_show_rows(venue_id, upcoming=False)
+        upcoming_rows = venue_show_rows(venue_id, upcoming=True)
+    upcoming_shows_count, past_shows_count = counts
+    past_rows, past_shows_next = past_show_page(past_rows)
+
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genres,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "website": venue.website,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "past_shows": venue_show_items(past_rows),
+        "upcoming_shows": venue_show_items(upcoming_rows),
+        "past_shows_count": past_shows_count,
+        "upcoming_shows_count": upcoming_shows_count,
+        "past_shows_next": past_shows_next
+    }
+
+
+@bp.route("/venues/<int:venue_id>/past_shows")
+@read_replica
+def venue_past_shows(venue_id):
+    # The tiles for the "Load more" button, which reads the cursor of the
+    # page after them from X-Next-Cursor.
+    shows, next_cursor = venue_past_shows_page(venue_id, request.args.get("after"))
+    response = make_response(render_template("pages/venue_show_tiles.html",
+                                             shows=shows))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def venue_past_shows_page(venue_id, cursor):
+    after = decode_cursor(cursor, datetime.fromisoformat)
+    rows, next_cursor = past_show_page(venue_show_rows(venue_id, False, after))
+    return venue_show_items(rows), next_cursor
+
+
+def venue_show_rows(venue_id, upcoming, after=None):
+    return show_rows(Show.venue_id, venue_id, Show.artist_id, upcoming, after)
+
+
+def venue_show_items(rows):
+    cards = artist_cards.get_many({artist_id for _, _, artist_id in rows})
+    return [{
+        "id": show_id,
+        "artist_id": artist_id,
+        "artist_name": cards[artist_id].name,
+        "artist_image_link": cards[artist_id].image_link,
+        "start_time": start_time
+    } for start_time, show_id, artist_id in rows if artist_id in cards]
+
+#  ----------------------------------------------------------------
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues/create", methods=["GET"])
+def create_venue_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template("forms/new_venue.html", form=form)
+
+
+@bp.route("/venues/create", methods=["POST"])
+def create_venue_submission():
+    error = False
+    try:
+        name = request.form["name"]
+        city = request.form["city"]
+        state = request.form["state"]
+        address = request.form["address"]
+        phone = request.form["phone"]
+        genres = request.form.getlist("genres")
+        image_link = request.form["image_link"]
+        facebook_link = request.form["facebook_link"]
+        website = request.form["website"]
+        if "seeking_talent" in request.form:
+            seeking_talent = True
+        else:
+            seeking_talent = False
+        seeking_description = request.form["seeking_description"]
+        venue = Venue(name=name, city=city, state=state, address=address,
+                      phone=phone, genres=genres, image_link=image_link, facebook_link=facebook_link, website=website, seeking_talent=seeking_talent, seeking_description=seeking_description)
+        db.session.add(venue)
+        db.session.commit()
+        venue_search.update(venue)
+        venue_facets.update(venue)
+        response_cache.invalidate("venues")
+        flash("Venue " + request.form["name"] + " was successfully listed!")
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        error = True
+        flash("Venue could not be saved.")
+    finally:
+        db.session.close()
+
+    return render_template("pages/home.html")
+
+#  ----------------------------------------------------------------
+#  Edit Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues/<int:venue_id>/edit", methods=["GET"])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    venue_data = Venue.query.get(venue_id)
+    form = VenueForm(obj=venue_data)
+
+    venue = {
+        "id": venue_data.id,
+        "name": venue_data.name,
+        "address": venue_data.address,
+        "city": venue_data.city,
+        "state": venue_data.state,
+        "phone": venue_data.phone,
+        "genres": venue_data.genres,
+        "image_link": venue_data.image_link,
+        "facebook_link": venue_data.facebook_link,
+        "website": venue_data.website,
+        "seeking_talent": venue_data.seeking_talent,
+        "seeking_description": venue_data.seeking_description
+    }
+
+    return render_template("forms/edit_venue.html", form=form, venue=venue)
+
+
+@bp.route("/venues/<int:venue_id>/edit", methods=["POST"])
+def edit_venue_submission(venue_id):
+    error = False
+    try:
+        name = request.form["name"]
+        city = request.form["city"]
+        state = request.form["state"]
+        address = request.form["address"]
+        phone = request.form["phone"]
+        genres = request.form.getlist("genres")
+        image_link = request.form["image_link"]
+        facebook_link = request.form["facebook_link"]
+        website = request.form["website"]
+        if "seeking_talent" in request.form:
+            seeking_talent = True
+        else:
+            seeking_talent = False
+        seeking_description = request.form["seeking_description"]
+        venue = Venue.query.get(venue_id)
+        venue.name = name
+        venue.city = city
+        venue.state = state
+        venue.address = address
+        venue.phone = phone
+        venue.genres = genres
+        venue.image_link = image_link
+        venue.facebook_link = facebook_link
+        venue.website = website
+        venue.seeking_talent = seeking_talent
+        venue.seeking_description = seeking_description
+        db.session.commit()
+        venue_search.update(venue)
+        venue_facets.update(venue)
+        invalidate_venue(venue_id)
+        flash("Venue " + request.form["name"] + " was successfully updated!")
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        error = True
+        flash("Venue could not be updated.")
+    finally:
+        db.session.close()
+
+    return redirect(url_for("venues.show_venue", venue_id=venue_id))
+
+#  ----------------------------------------------------------------
+#  Delete Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route("/venues/<venue_id>", methods=["DELETE"])
+def delete_venue(venue_id):
+    error = False
+    try:
+        venue = Venue.query.get(venue_id)
+        db.session.delete(venue)
+        db.session.commit()
+        venue_search.remove(venue_id)
+        venue_facets.remove(venue_id)
+        invalidate_venue(int(venue_id))
+        flash("Venue successfully deleted.")
+    except Exception as e:
+        print(e)
+        db.session.rollback()
+        flash("Venue could not be deleted.")
+    finally:
+        db.session.close()
+
+    return render_template("pages/home.html")
+
+#  ----------------------------------------------------------------
+#  JSON API
+#  ----------------------------------------------------------------
+
+
+@bp.route("/api/v1/venues")
+@read_replica
+def api_venues():
+    filters = FacetFilters.from_args(request.args)
+    return conditional_json(lambda: {"areas": venue_areas(filters)},
+                            *catalogue_version())
+
+
+@bp.route("/api/v1/venues/facets")
+@read_replica
+def api_venue_facets():
+    filters = FacetFilters.from_args(request.args)
+    validators, last_modified = catalogue_version()
+    return conditional_json(lambda: venue_facets.counts(filters, validators),
+                            validators, last_modified)
+
+
+@bp.route("/api/v1/venues/search")
+@read_replica
+def api_search_venues():
+    search = request.args.get("q", "")
+    page = max(request.args.get("page", 1, type=int), 1)
+    validators, last_modified = catalogue_version()
+    return conditional_json(
+        lambda: search_response(venue_search, Venue, venue_stats, search, page, validators),
+        validators, last_modified)
+
+
+@bp.route("/api/v1/venues/<int:venue_id>")
+@read_replica
+def api_venue(venue_id):
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return api_error(404)
+    return conditional_json(lambda: venue_detail(venue),
+                            *entity_version(venue, Show.venue_id, Artist, Show.artist_id))
+
+
+@bp.route("/api/v1/venues/<int:venue_id>/past_shows")
+@read_replica
+def api_venue_past_shows(venue_id):
+    venue = Venue.query.get(venue_id)
+    if venue is None:
+        return api_error(404)
+    cursor = request.args.get("after")
+
+    def body():
+        shows, next_cursor = venue_past_shows_page(venue_id, cursor)
+        return {"data": shows, "next": next_cursor}
+
+    return conditional_json(body, *entity_version(venue, Show.venue_id, Artist,
+                                                  Show.artist_id))
+